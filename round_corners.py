@@ -49,6 +49,8 @@ Cases with insufficient space (180deg turn or too short segments/handles) are wa
 This extension is written for inkscape 1.0.1 and is compatible with inkscape 0.92.4 .
 The code is 100% new API, but we hook a minimalistic 0.92.4 compatibility layer.
 For use with 0.92.4 rename round_corners.092_inx to round_corners.inx and keep this python file as is.
+The path geometry itself is in round_corners_geom.py, which does not need inkex. This file adds the inkscape side:
+options, node selection and reading and writing the document.
 
 References:
  - https://inkscape.gitlab.io/extensions/documentation/authors/update1.2.html
@@ -62,7 +64,7 @@ References:
  - https://hansmuller-flex.blogspot.com/2011/10/more-about-approximating-circular-arcs.html
  - https://itc.ktu.lt/index.php/ITC/article/download/11812/6479         (Riskus' PDF)
 
-The algorithm of arc_bezier_handles() is based on the approach described in:
+The bezier handles of the arcs (arc_bezier_handles(), fillet_kernel_py()) follow the approach described in:
 A. Riškus, "Approximation of a Cubic Bezier Curve by Circular Arcs and Vice Versa,"
 Information Technology and Control, 35(4), 2006 pp. 371-378.
 """
@@ -70,11 +72,27 @@ Information Technology and Control, 35(4), 2006 pp. 371-378.
 # python2 compatibility:
 from __future__ import print_function
 
+import os, sys, math, time
+
+if __name__ == '__main__':
+  # Hand the job to a resident worker, if one is running (see round_corners_worker.py).
+  # That saves starting up inkex, so this comes before the import.
+  try:
+    import round_corners_worker
+  except ImportError:
+    round_corners_worker = None
+  status = round_corners_worker and round_corners_worker.forward(sys.argv[1:])
+  if status is not None:
+    sys.exit(status)
+
 import inkex
-import os, sys, math, pprint, copy
+from round_corners_geom import CornerRounder, NodeSelection, parse_radii, round_down, split_path_d, LazySuperPath, format_path_compact, arc_max_segments
+# Keep imports light, inkscape starts a new interpreter for each run and each live preview refresh.
+# Modules needed only for debugging or optional features are imported where they are used.
 
 __version__ = '1.5'             # Keep in sync with round_corners.inx line 16 and line 3
 debug = False                   # True: babble on controlling tty
+clamped_report_max = 20         # --auto-fit lists this many clamped nodes in the warnings. --timing has all of them.
 
 if not hasattr(inkex, 'EffectExtension'):       # START OF INKSCAPE 0.92.X COMPATIBILITY HACK
   """ OOPS, the code **after** this if conditional is meant for inkscape 1.0.1,
@@ -135,6 +153,8 @@ if not hasattr(inkex, 'EffectExtension'):       # START OF INKSCAPE 0.92.X COMPA
       self.element = el                       # original lxml.etree._Element; element.getroottree() has the svg document
       self.tag = el.tag.split('}')[-1]        # strip any namespace prefix. '{http://www.w3.org/2000/svg}path'
       self.id = self.element.attrib.get('id')
+      self.nsmap = el.nsmap                   # namespaces and attributes are shared with the lxml element.
+      self.attrib = el.attrib
       if self.tag == 'path':
         self.path = MySvgPath(el)
       else:
@@ -162,14 +182,33 @@ if not hasattr(inkex, 'EffectExtension'):       # START OF INKSCAPE 0.92.X COMPA
       self.NSS.pop(None)                      # My documents nsmap has cc,svg,inkscape,rdf,sodipodi, and None: http://www.w3.org/2000/svg
       if 'inx' not in self.NSS and 'inkscape' in self.NSS:
         self.NSS['inx'] = self.NSS['inkscape']
+      self.id_index = None                    # id -> lxml element. Built on first use by getElementById()
+      self.id_index_scans = 0                 # how often the document was scanned to (re)build id_index
+      self.id_index_hits = 0
+      self.id_index_misses = 0
 
     def getElementById(self, id):
+      """ Lookup via a dict that is built with a single document scan on the first call.
+          Rounding only modifies 'd' attributes, never ids. Elements that --radii adds with new ids
+          are entered with add_to_index(), so the index stays valid for the whole run.
+      """
       # print("MySvgDocumentElement.getElementById: svg=", self.tree, " svg.root=", self.root, " ID=", id, file=sys.stderr)
-      el_list = self.root.xpath('//*[@id="%s"]' % id, namespaces=self.NSS)
-      # print("el_list=", el_list, file=sys.stderr)
-      if len(el_list) < 1:
+      if self.id_index is None:
+        self.id_index = {}
+        for el in self.root.xpath('//*[@id]'):
+          self.id_index.setdefault(el.get('id'), el)  # the first one in document order wins, same as the old xpath lookup.
+        self.id_index_scans += 1
+      el = self.id_index.get(id)
+      if el is None:
+        self.id_index_misses += 1
         return None
-      return MySvgElement(el_list[0])         # Do we need more? document root is accessible via el_list[0].getroottree()
+      self.id_index_hits += 1
+      return MySvgElement(el)                 # Do we need more? document root is accessible via el.getroottree()
+
+    def add_to_index(self, el):
+      """ el (an lxml element) was added to the document with a new id. Not needed before the index is built. """
+      if self.id_index is not None:
+        self.id_index.setdefault(el.get('id'), el)
 
 
   def compat_add_argument(pars, *args, **kw):
@@ -194,6 +233,33 @@ if not hasattr(inkex, 'EffectExtension'):       # START OF INKSCAPE 0.92.X COMPA
     self.wrapped_effect()
 
 
+  def output_wrapper(self):
+    """ 0.92 writes the document in output(). We route that through a new style save(), so that the extension can hook in there.
+    """
+    self.save(sys.stdout)
+
+
+  def compat_save(self, stream):
+    """ Base class save(). The old api always writes to stdout. """
+    self.wrapped_output()
+
+
+  def compat_clean_up(self):
+    """ Base class clean_up(). Nothing to clean up in the old api. """
+    pass
+
+
+  def run_wrapper(self, args=None):
+    """ Like run() in 1.0.1: call clean_up() when done, also if something went wrong.
+    """
+    if args is None:
+      args = sys.argv[1:]
+    try:
+      self.affect(args)
+    finally:
+      self.clean_up()
+
+
   def init_wrapper(self):
     """ To backport the option parsing, we wrap the __init__ method and introduce a compatibility shim.
         we must call add_arguments(), that seems to be done by EffectExtension.__init__() which we don't have.
@@ -213,45 +279,186 @@ if not hasattr(inkex, 'EffectExtension'):       # START OF INKSCAPE 0.92.X COMPA
 
     # Now, as the new style add_argument() method is in place, we can run the add_arguments() initializer of the extension.
     self.add_arguments(self.OptionParser)
-    self.run = self.affect      # alias the extension entry point so that it works in both APs.
+    self.run = MethodType(run_wrapper, self)        # the extension entry point, so that it works in both APIs.
 
     # wrap our own effect() method. That is ugly, but self.document is not initialized any earlier.
     self.wrapped_effect = self.effect
     self.effect = MethodType(effect_wrapper, self)
 
+    # same for output(), so that a save() method of the extension is called.
+    self.wrapped_output = self.output
+    self.output = MethodType(output_wrapper, self)
+
 
   inkex.EffectExtension = inkex.Effect
   inkex.EffectExtension.wrapped_init = inkex.EffectExtension.__init__
   inkex.EffectExtension.__init__ = init_wrapper
+  inkex.EffectExtension.save = compat_save
+  inkex.EffectExtension.clean_up = compat_clean_up
 
 # END OF INKSCAPE 0.92.X COMPATIBILITY HACK
 
 
-max_trim_factor = 0.90          # 0.5: can cut half of a segment length or handle length away for rounding a corner
-max_trim_factor_single = 0.98   # 0.98: we can eat up almost everything, as there are no neighbouring trims to be expected.
+class ResultCache(object):
+  """ On-disk cache of rounded paths, for live preview, where inkscape runs us again and again on the same document.
+      An entry is keyed by a hash of everything that determines the result: the path data, the selected corners,
+      radius, method, trim factor, our version and the inkex version (0.92 parses and writes paths differently).
+      It holds the new path data and the counters of the run.
+
+      One small json file per entry. A hit touches the file, and trim() removes the least recently used files
+      until the total size is below max_bytes. Any trouble with the directory just disables the cache.
+  """
+  def __init__(self, directory, max_bytes):
+    self.dir = directory
+    self.max_bytes = max_bytes
+    self.hits = 0
+    self.misses = 0
+    self.stores = 0
+    self.evicted = 0
+    self.seconds_saved = 0.0          # compute time of the cached runs, minus the time to look them up.
+    try:
+      if not os.path.isdir(self.dir):
+        os.makedirs(self.dir)
+    except OSError:
+      self.dir = None
+
+  @staticmethod
+  def default_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'inkscape-round-corners')
+
+  def key(self, d, selection, rounder, precision):
+    """ selection is the canonical form of the selected nodes of the path, see NodeSelection.key() """
+    import hashlib
+
+    text = repr((__version__, getattr(inkex, '__version__', '0.92'), rounder.radius, rounder.cut, rounder.max_trim_factor, rounder.auto_fit,
+                 rounder.tolerance, rounder.exact, precision, selection, d))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+  def get(self, key):
+    """ the cached entry (a dict), or None """
+    import json
+
+    if self.dir is None:
+      return None
+    t = time.time()
+    filename = os.path.join(self.dir, key + '.json')
+    try:
+      with open(filename) as f:
+        entry = json.load(f)
+      os.utime(filename, None)        # most recently used
+    except (IOError, OSError, ValueError):
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.seconds_saved += entry.get('seconds', 0.0) - (time.time() - t)
+    return entry
+
+  def put(self, key, entry):
+    import json
+
+    if self.dir is None:
+      return
+    filename = os.path.join(self.dir, key + '.json')
+    tmp = "%s.%d.tmp" % (filename, os.getpid())
+    try:
+      with open(tmp, 'w') as f:
+        json.dump(entry, f)
+      os.rename(tmp, filename)          # atomic, a concurrent reader never sees a partial entry.
+      self.stores += 1
+    except (IOError, OSError):
+      try:
+        os.unlink(tmp)
+      except OSError:
+        pass
+
+  def trim(self):
+    """ evict least recently used entries until the total size fits max_bytes """
+    if self.dir is None or not self.stores:
+      return
+    try:
+      entries = []
+      for name in os.listdir(self.dir):
+        if name.endswith('.json'):
+          st = os.stat(os.path.join(self.dir, name))
+          entries.append((st.st_mtime, st.st_size, name))
+      total = sum(e[1] for e in entries)
+      entries.sort()
+      for mtime, size, name in entries:
+        if total <= self.max_bytes:
+          break
+        os.unlink(os.path.join(self.dir, name))
+        total -= size
+        self.evicted += 1
+    except OSError:
+      pass
+
+  def report(self):
+    lookups = self.hits + self.misses
+    return { 'dir': self.dir, 'hits': self.hits, 'misses': self.misses, 'stores': self.stores, 'evicted': self.evicted,
+             'hit_rate': float(self.hits) / lookups if lookups else 0.0, 'seconds_saved': self.seconds_saved }
+
 
 class RoundedCorners(inkex.EffectExtension):
 
     def add_arguments(self, pars):              # an __init__ in disguise ...
-      try:
-        self.tty = open("/dev/tty", 'w')
-      except:
-        try:
-          self.tty = open("CON:", 'w')        # windows. Does this work???
-        except:
-          self.tty = open(os.devnull, 'w')  # '/dev/null' for POSIX, 'nul' for Windows.
+      self._tty = None                  # opened on first use of self.tty
       if debug: print("RoundedCorners ...", file=self.tty)
-      self.nodes_inserted = {}
-      self.eps = 0.00001                # avoid division by zero
       self.radius = None
-      self.max_trim_factor = max_trim_factor
 
-      self.skipped_degenerated = 0      # not a useful corner (e.g. 180deg corner)
-      self.skipped_small_count = 0      # not enough room for arc
-      self.skipped_small_len = 1e99     # record the shortest handle (or segment) when skipping.
+      self.phase_times = {}             # phase name -> seconds. See timed()
+      self.path_stats = []              # one dict per path, for --timing
+      self.rounder = CornerRounder(times=self.phase_times)    # the geometry engine. It also keeps the counters.
+      self.cache = None                 # ResultCache, see --cache-mb
+      self.analysis = []                # one dict per corner, see --analyze
+      self.clamped = []                 # one dict per corner that got a smaller radius, see --auto-fit
+      self.selection = None             # NodeSelection of the nodes to round, built in effect()
+      self.used_ids = None              # ids in the document and the ones unique_id() handed out. Built on first use.
 
       pars.add_argument("--radius", type=float, default=2.0, help="Radius [mm] to round selected vertices. Default: 2")
       pars.add_argument("--method", type=str, default="arc", help="operation: one of 'arc' (default), 'arc+cross', 'line'")
+      pars.add_argument("--auto-fit", "--auto_fit", type=getattr(inkex, 'Boolean', bool), default=False, help="round corners that have not enough room with the largest radius that fits, instead of skipping them. Default: False")
+      pars.add_argument("--tolerance", type=float, default=0.0, help="largest deviation of an arc from the circle [mm]. Each arc gets as few bezier segments as that allows. 0: one segment up to a quarter circle, two above. Default: 0")
+      pars.add_argument("--exact", type=getattr(inkex, 'Boolean', bool), default=False, help="fit the arc to curved segments, instead of trimming them along their tangents. The curves keep their shape. Default: False")
+      pars.add_argument("--analyze", type=getattr(inkex, 'Boolean', bool), default=False, help="only report the largest radius that fits each selected corner, and all of them. The document is not changed. Default: False")
+      pars.add_argument("--timing", type=str, default="", help="write time spent per phase and per path counts as JSON to this file. '-' for stderr. Default: off")
+      pars.add_argument("--cache-mb", "--cache_mb", type=float, default=0.0, help="size limit of the result cache for live preview [MB]. Only worth it while live preview reruns the same paths. 0 disables the cache. Default: 0")
+      pars.add_argument("--radii", type=str, default="", help="round with each of these radii, e.g. '0.5,1,2' or '0.5:3:0.5' (start:stop:step). The results go on a new layer per radius, the original paths stay as they are. Default: off, use --radius")
+      pars.add_argument("--selected-nodes-file", type=str, default="", help="read more selected nodes from this file, one per line: path_id, path_id:subpath:index, path_id:subpath:* or path_id:subpath:first-last. Default: none")
+      pars.add_argument("--precision", type=int, default=-1, help="write the rounded path data with this many decimals, relative coordinates where shorter, and straight segments as lines. -1 writes all digits, as inkscape does. Default: -1")
+      pars.add_argument("--cache-dir", type=str, default="", help="directory of the result cache. Default: inkscape-round-corners in the user cache directory")
+
+
+    @property
+    def tty(self):
+      """ The debug output stream. Opened on first use, so that normal runs never touch the terminal.
+      """
+      if self._tty is None:
+        try:
+          self._tty = open("/dev/tty", 'w')
+        except:
+          try:
+            self._tty = open("CON:", 'w')       # windows. Does this work???
+          except:
+            self._tty = open(os.devnull, 'w')   # '/dev/null' for POSIX, 'nul' for Windows.
+      return self._tty
+
+
+    # counters of the geometry engine
+    clamped_count = property(lambda self: self.rounder.stats['clamped'])                           # rounded with a smaller radius
+    rounded_count = property(lambda self: self.rounder.stats['rounded'])                           # corners actually rounded
+    skipped_degenerated = property(lambda self: self.rounder.stats['skipped_degenerated'])         # not a useful corner (e.g. 180deg corner)
+    skipped_small_count = property(lambda self: self.rounder.stats['skipped_small_count'])         # not enough room for arc
+    skipped_small_len = property(lambda self: self.rounder.stats['skipped_small_len'])             # the shortest handle (or segment) when skipping.
+
+
+    def timed(self, phase, t0):
+      """ add the time elapsed since t0 to the given phase. Returns the current time, so that phases can be chained:
+          t = self.timed('parse', t)
+      """
+      t = time.time()
+      self.phase_times[phase] = self.phase_times.get(phase, 0.0) + t - t0
+      return t
 
 
     def effect(self):
@@ -260,109 +467,151 @@ class RoundedCorners(inkex.EffectExtension):
           print(self.options.selected_nodes, file=self.tty)
 
         self.radius = math.fabs(self.options.radius)
-        self.cut = False
-        if self.options.method in ('line'):
-          self.cut = True
-        if len(self.options.selected_nodes) < 1:
-          # find selected objects and construct a list of selected_nodes for them...
+        self.rounder.radius = self.radius
+        self.rounder.cut = self.options.method in ('line',)
+        self.rounder.auto_fit = self.options.auto_fit
+        self.rounder.tolerance = self.options.tolerance if self.options.tolerance > 0 else None
+        self.rounder.exact = self.options.exact
+        if debug:
+          self.rounder.log = self.tty
+        # The selected nodes, grouped by path and subpath, as integers and ranges. Each path is parsed and written back only once.
+        t = time.time()
+        self.selection = NodeSelection()
+        for node_id in self.options.selected_nodes:
+          try:
+            self.selection.add_node_id(node_id)
+          except ValueError:
+            raise inkex.AbortExtension("Selected node %r is not of the form path_id:subpath:index" % node_id)
+        if self.options.selected_nodes_file:
+          try:
+            with open(self.options.selected_nodes_file) as f:
+              self.selection.add_node_ids(f)
+          except (IOError, OSError) as e:
+            raise inkex.AbortExtension("Cannot read %s: %s" % (self.options.selected_nodes_file, e))
+          except ValueError as e:
+            raise inkex.AbortExtension("%s: %s" % (self.options.selected_nodes_file, e))
+        if not self.selection.paths:
+          # find selected objects and select all their nodes...
           for p in self.options.ids:
-            self.options.selected_nodes.extend(self.find_roundable_nodes(p))
-          if len(self.options.selected_nodes) < 1:
+            self.find_roundable_nodes(p, self.selection)
+          if not self.selection.paths:
             raise inkex.AbortExtension("Could not find nodes inside a path. No path objects selected?")
+        self.timed('select', t)
 
-        if len(self.options.selected_nodes) == 1:
-          # when we only trim one node, we can eat up almost everything,
-          # no need to leave room for rounding neighbour nodes.
-          self.max_trim_factor = max_trim_factor_single
+        if self.options.cache_mb > 0:
+          self.cache = ResultCache(self.options.cache_dir or ResultCache.default_dir(), self.options.cache_mb * 1024 * 1024)
 
-        for node in sorted(self.options.selected_nodes):
-          ## we walk through the list sorted, so that node indices are processed within a subpath in ascending numeric order.
-          ## that makes adjusting index offsets after node inserts easier.
-          ss = self.round_corner(node)
+        path_ids = []
+        for path_id in self.selection.path_ids():
+          elem = self.svg.getElementById(path_id)
+          if elem is not None and not self.is_path(elem):
+            print("%s is not a path, skipped" % path_id, file=sys.stderr)
+          else:
+            path_ids.append(path_id)
 
+        if self.options.analyze:
+          self.analyze(path_ids)
+          return                # the document is unchanged, inkex then writes nothing.
 
-    def find_roundable_nodes(self, path_id):
-      """ select all nodes of all (sub)paths. except for
+        if self.options.radii:
+          try:
+            radii = parse_radii(self.options.radii)
+          except ValueError as e:
+            raise inkex.AbortExtension(str(e))
+          self.sweep(radii, path_ids)
+          return
+
+        for path_id in path_ids:
+          self.round_path(path_id)
+
+
+    def find_roundable_nodes(self, path_id, selection):
+      """ add all nodes of all (sub)paths of path_id to the NodeSelection selection. except for
           - the last (one or two) nodes of a closed path (which coindide with the first node)
           - the first and last node of an open path (which cannot be smoothed)
+          The path is not parsed here, this is a range that NodeSelection.subpaths() resolves later, see roundable_span().
       """
-      ret = []
       elem = self.svg.getElementById(path_id)
-      if elem.tag != '{'+elem.nsmap['svg']+'}path':
-        return ret      # ellipse never works.
-      try:
-        csp = elem.path.to_superpath()
-      except:
-        return ret
-
-      for sp_idx in range(0, len(csp)):
-        sp = csp[sp_idx]
-        if len(sp) < 3:
-          continue      # subpaths of 2 or less nodes are ignored
-        if self.very_close(sp[0], sp[-1]):
-          idx_s = 0     # closed paths count from 0 to either n-1 or n-2
-          idx_e = len(sp) - 1
-          if self.very_close_xy(sp[-2][1], sp[-1][1]):
-            idx_e = len(sp) - 2
-        else:
-          idx_s = 1     # open paths count from 1 to either n-1
-          idx_e = len(sp) - 1
-        for idx in range(idx_s, idx_e):
-          ret.append("%s:%d:%d" % (path_id, sp_idx, idx))
-
-        if debug:
-          print("find_roundable_nodes: ", self.options.selected_nodes, file=sys.stderr)
-      return ret
-
-
-    def very_close(self, n1, n2):
-      "deep compare. all elements in sub arrays are compared for (very close) numerical equality"
-      return self.very_close_xy(n1[0], n2[0]) and self.very_close_xy(n1[1], n2[1]) and self.very_close_xy(n1[2], n2[2])
+      if not self.is_path(elem):
+        return          # ellipse never works.
+      selection.add_range(path_id)
+      if debug:
+        print("find_roundable_nodes: ", path_id, file=sys.stderr)
 
 
-    def very_close_xy(self, p1, p2):
-      "one 2 element array is compared for (very close) numerical equality"
-      eps = 1e-9
-      return abs(p1[0]-p2[0]) < eps and abs(p1[1]-p2[1]) < eps
+    def is_path(self, elem):
+      el = getattr(elem, 'element', elem)     # the lxml element, also with the 0.92 compatibility layer
+      return el.tag == inkex.addNS('path', 'svg')   # not el.nsmap['svg'], a document may only declare the default namespace.
 
 
-    def round_corner(self, node_id):
-      """ round the corner at (adjusted) node_idx of subpath
-          Side_effect: store (or increment) in self.inserted["pathname:subpath"] how many points were inserted in that subpath.
-          the adjusted node_idx is computed by adding that number (if exists) to the value of the node_id before doing any manipulation
+    def round_path(self, path_id):
+      """ round all selected corners of the path path_id, see NodeSelection.subpaths().
+          The path is parsed into a superpath only once, all corners of a subpath are rounded there in one go,
+          and the result is written back once. This keeps the run time linear in the size of the path.
+          All indices refer to the original (unmodified) path.
       """
-      s = node_id.split(":")
-      path_id = s[0]
-      subpath_idx = int(s[1])
-      subpath_id = s[0] + ':' + s[1]
-      idx_adjust = self.nodes_inserted.get(subpath_id, 0)
-      node_idx = int(s[2]) + idx_adjust
-
       elem = self.svg.getElementById(path_id)
       if elem is None:
-        print("selected_node %s not found in svg document" % node_id, file=sys.stderr)
+        for node_id in self.selection.node_ids(path_id):
+          print("selected_node %s not found in svg document" % node_id, file=sys.stderr)
         return None
 
+      t_path = t = time.time()
+      stats = self.rounder.stats
+      before = dict(stats)
       elem.apply_transform()       # modifies path inplace? -- We save later back to the same element. Maybe we should not?
-      path = elem.path
-      s = path.to_superpath()
-      sp = s[subpath_idx]
-
-      ## call the actual path manipulator, record how many nodes were inserted.
-      orig_len = len(sp)
-      sp = self.subpath_round_corner(sp, node_idx)
-      idx_adjust += len(sp) - orig_len
-
-      # convert the superpath back to a normal path
-      s[subpath_idx] = sp
-      elem.set_path(s.to_path(curves_only=False))
-      self.nodes_inserted[subpath_id] = idx_adjust
 
+      key = entry = None
+      if self.cache:
+        key = self.cache.key(elem.attrib.get('d'), self.selection.key(path_id), self.rounder, self.options.precision)
+        entry = self.cache.get(key)
+        t = self.timed('cache', t)
+
+      if entry:
+        # same path, same corners, same options: we know the result already.
+        elem.attrib['d'] = entry['d']
+        for name in ('rounded', 'skipped_degenerated', 'skipped_small_count', 'clamped', 'tolerance_missed'):
+          stats[name] += entry.get(name, 0)
+        stats['skipped_small_len'] = min(stats['skipped_small_len'], entry['skipped_small_len'])
+        nodes = entry['nodes']
+        n_subpaths = entry['subpaths']
+        parsed = 0
+        selected = entry['selected']
+        clamped = entry['clamped_nodes']
+      else:
+        s = self.superpath(elem)
+        n_subpaths = len(s)
+        subpaths = self.selection.subpaths(path_id, s)
+        for sp_idx in subpaths:
+          s[sp_idx]                     # a LazySuperPath parses the selected subpaths now, so that it counts as parse time.
+        t = self.timed('parse', t)
+        selected = sum(len(idxs) for idxs in subpaths.values())
+        self.rounder.clamped = clamped = []
+        self.rounder.round_superpath(s, subpaths)
+        parsed, nodes = self.parsed_count(s)
+
+        # convert the changed subpaths back to path data, the others keep their text.
+        t = time.time()
+        elem.attrib['d'] = self.path_data(s)
+        t = self.timed('serialize', t)
+        if key:
+          self.cache.put(key, { 'd': elem.attrib.get('d'), 'nodes': nodes, 'subpaths': n_subpaths, 'selected': selected, 'seconds': t - t_path,
+                                'rounded': stats['rounded'] - before['rounded'],
+                                'skipped_degenerated': stats['skipped_degenerated'] - before['skipped_degenerated'],
+                                'skipped_small_count': stats['skipped_small_count'] - before['skipped_small_count'],
+                                'clamped': stats['clamped'] - before['clamped'], 'clamped_nodes': clamped,
+                                'tolerance_missed': stats['tolerance_missed'] - before['tolerance_missed'],
+                                'skipped_small_len': stats['skipped_small_len'] if stats['skipped_small_len'] < before['skipped_small_len'] else 1e99 })
+          t = self.timed('cache', t)
+
+      self.path_stats.append({ 'id': path_id, 'subpaths': n_subpaths, 'parsed': parsed, 'nodes': nodes, 'selected': selected,
+                               'rounded': stats['rounded'] - before['rounded'], 'clamped': len(clamped),
+                               'seconds': t - t_path, 'cached': bool(entry) })
+      self.note_clamped(path_id, clamped, self.rounder.radius)
 
       # If we picked up the 'd' attribute of a non-path (e.g. star), we must make sure the object now becomes a path.
       # Otherwise inkscape uses the sodipodi data and ignores our changed 'd' attribute.
-      if '{'+elem.nsmap['sodipodi']+'}type' in elem.attrib:
-        del(elem.attrib['{'+elem.nsmap['sodipodi']+'}type'])
+      elem.attrib.pop(inkex.addNS('type', 'sodipodi'), None)
 
       # Debugging is no longer available or not yet implemented? This explodes, although it is
       # documented in https://inkscape.gitlab.io/extensions/documentation/inkex.command.html
@@ -371,305 +620,258 @@ class RoundedCorners(inkex.EffectExtension):
       # But hey, we can always resort to good old ET.dump(self.document) ...
 
 
-    def super_node(self, sp, node_idx):
-      """ In case of node_idx 0, we need to use either the last, the second-last or the third last node as a previous node.
-          For a closed subpath, the last node and the first node are identical. Then, the second last node may be still at the
-          same location if it has a handle. If so, we take the third last instead. Gah. It has a certain logic...
-
-          In case of the node_idx being the last node, we already know that the subpath is not closed,
-          we use 0 as the next node.
-
-          The direction sn.prev.dir does not really point to the coordinate of the previous node, but to the end of the
-          next-handle of the prvious node. This is the same when there are straight lines. The absence of handles is
-          denoted by having the same coordinates for handle and node.
-          Same for next.dir, it points to the next.prev handle.
-
-          The exact implementation here is:
-          - sn.next.handle is set to a relative vector that is the tangent of the curve towards the next point.
-            we implement four cases:
-            - if neither node nor next have handles, the connection is a straight line, and next.handle points
-              in the direction of the next node itself.
-            - if the curve between node and next is defined by two handles, then sn.next.handle is in the direction of the
-              nodes own handle,
-            - if the curve between node and next is defined one handle at the node itself, then sn.next.handle is in the
-              direction of the nodes own handle,
-            - if the curve between node and next is defined one handle at the next node, then sn.next.handle is in the
-              direction from the node to the end of that other handle.
-          - when trimming back later, we move along that tangent, instead of following the curve.
-            That is an approximation when the segment is curved, and exact when it is straight.
-            (Finding exact candidate points on curved lines that have tangents with the desired circle
-            is beyond me today. Multiple candidates may exist. Any volunteers?)
+    def sweep(self, radii, path_ids):
+      """ --radii: round copies of the selected paths once per radius, and put them on a new top level layer per radius.
+          The original paths stay as they are. Each path is parsed once, and the radius independent corner data
+          (see CornerRounder.corner_tables()) is computed once, for all radii.
       """
-
-      prev_idx = node_idx - 1
-      sp_node_idx_ = copy.deepcopy(sp[node_idx])        # if this wraps around, at node_idx=0, we may need to tweak the prev handle
-      if node_idx == 0:
-        prev_idx = len(sp) - 1
-        if self.very_close(sp_node_idx_, sp[prev_idx]):
-          prev_idx = prev_idx - 1       # skip one node, it is the 'close marker'
-          if self.very_close_xy(sp_node_idx_[1], sp[prev_idx][1]):
-            # still no distance, skip more. Needed for https://github.com/jnweiger/inkscape-round-corners/issues/2
-            sp_node_idx_[0] = sp[prev_idx][0]       # this sp_node_idx_ must acts as if its prev handle is that one.
-            prev_idx = prev_idx - 1
-        else:
-          self.skipped_degenerated += 1         # path ends here.
-          return None, None
-
-      # if debug: pprint.pprint({'node_idx': node_idx, 'len(sp)':len(sp), 'sp': sp}, stream=self.tty)
-      if node_idx == len(sp)-1:
-        self.skipped_degenerated += 1           # path ends here. On a closed loop, we can never select the last point.
-        return None, None
-
-      next_idx = node_idx + 1
-      if next_idx >= len(sp): next_idx = 0
-      t = sp_node_idx_
-      p = sp[prev_idx]
-      n = sp[next_idx]
-      dir1 = [ p[2][0] - t[1][0], p[2][1] - t[1][1] ]           # direction to the previous node (rel coords)
-      dir2 = [ n[0][0] - t[1][0], n[0][1] - t[1][1] ]           # direction to the next node (rel coords)
-      dist1 = math.sqrt(dir1[0]*dir1[0] + dir1[1]*dir1[1])      # distance to the previous node
-      dist2 = math.sqrt(dir2[0]*dir2[0] + dir2[1]*dir2[1])      # distance to the next node
-      handle1 = [ t[0][0] - t[1][0], t[0][1] - t[1][1] ]        # handle towards previous node (rel coords)
-      handle2 = [ t[2][0] - t[1][0], t[2][1] - t[1][1] ]        # handle towards next node (rel coords)
-      if self.very_close_xy(handle1, [ 0, 0 ]): handle1 = dir1
-      if self.very_close_xy(handle2, [ 0, 0 ]): handle2 = dir2
-
-      prev = { 'idx': prev_idx, 'dir':dir1, 'handle':handle1 }
-      next = { 'idx': next_idx, 'dir':dir2, 'handle':handle2 }
-      sn = { 'idx': node_idx, 'prev': prev, 'next': next, 'x': t[1][0], 'y': t[1][1] }
-
-      if dist1 < self.radius:
-        if debug:
-          print("subpath node_idx=%d, dist to prev(%d) is smaller than radius: %g < %g" %
-                (node_idx, prev_idx, dist1, self.radius), file=sys.stderr)
-          pprint.pprint(sn, stream=sys.stderr)
-        if self.skipped_small_len > dist1: self.skipped_small_len = dist1
-        self.skipped_small_count += 1
-        return None, None
-
-      if dist2 < self.radius:
-        if debug:
-          print("subpath node_idx=%d, dist to next(%d) is smaller than radius: %g < %g" %
-                (node_idx, next_idx, dist2, self.radius), file=sys.stderr)
-          pprint.pprint(sn, stream=sys.stderr)
-        if self.skipped_small_len > dist2: self.skipped_small_len = dist2
-        self.skipped_small_count += 1
-        return None, None
-
-      len_h1 = math.sqrt(handle1[0]*handle1[0] + handle1[1]*handle1[1])
-      len_h2 = math.sqrt(handle2[0]*handle2[0] + handle2[1]*handle2[1])
-      prev['hlen'] = len_h1
-      next['hlen'] = len_h2
-
-      if len_h1 < self.radius:
-        if debug:
-          print("subpath node_idx=%d, handle to prev(%d) is shorter than radius: %g < %g" %
-                (node_idx, prev_idx, len_h1, self.radius), file=sys.stderr)
-          pprint.pprint(sn, stream=sys.stderr)
-        if self.skipped_small_len > len_h1: self.skipped_small_len = len_h1
-        self.skipped_small_count += 1
-        return None, None
-      if len_h2 < self.radius:
-        if debug:
-          print("subpath node_idx=%d, handle to next(%d) is shorter than radius: %g < %g" %
-                (node_idx, next_idx, len_h2, self.radius), file=sys.stderr)
-          pprint.pprint(sn, stream=sys.stderr)
-        if self.skipped_small_len > len_h2: self.skipped_small_len = len_h2
-        self.skipped_small_count += 1
-        return None, None
-
-      if len_h1 > dist1: # shorten that handle to dist1, avoid overshooting the point
-        handle1[0] = handle1[0] * dist1 / len_h1
-        handle1[1] = handle1[1] * dist1 / len_h1
-        prev['hlen'] = dist1
-      if len_h2 > dist2: # shorten that handle to dist2, avoid overshooting the point
-        handle2[0] = handle2[0] * dist2 / len_h2
-        handle2[1] = handle2[1] * dist2 / len_h2
-        next['hlen'] = dist2
-
-      return sn, sp_node_idx_
-
-
-    def arc_c_m_from_super_node(self, s):
+      import copy
+
+      root = self.svg.root
+      svg_ns = root.nsmap.get('svg') or root.nsmap.get(None)
+      inkscape_ns = 'http://www.inkscape.org/namespaces/inkscape'
+      layers = []
+      for radius in radii:
+        layer = root.makeelement('{%s}g' % svg_ns, { 'id': self.unique_id('round_corners_r' + ('%g' % radius).replace('.', '_')),
+                                                     '{%s}groupmode' % inkscape_ns: 'layer',
+                                                     '{%s}label' % inkscape_ns: 'r=%g' % radius })
+        root.append(layer)
+        layers.append(layer)
+        self.add_to_index(layer)
+
+      for path_id in path_ids:
+        elem = self.svg.getElementById(path_id)
+        if elem is None:
+          for node_id in self.selection.node_ids(path_id):
+            print("selected_node %s not found in svg document" % node_id, file=sys.stderr)
+          continue
+        t_path = t = time.time()
+        el = getattr(elem, 'element', elem)     # the lxml element, also with the 0.92 compatibility layer
+        # the copies go to the top level, they take the transforms of all the groups above the original along.
+        transform = " ".join(a.attrib['transform'] for a in reversed(list(el.iterancestors())) if 'transform' in a.attrib)
+        base = self.transformed_superpath(elem)
+        corners = self.selection.subpaths(path_id, base)
+        for sp_idx in corners:
+          base[sp_idx]                  # a LazySuperPath parses the selected subpaths now, so that it counts as parse time.
+        t = self.timed('parse', t)
+        selected = sum(len(idxs) for idxs in corners.values())
+        tables = self.rounder.corner_tables(base, corners)
+        parsed, nodes = self.parsed_count(base)
+        orig = None if isinstance(base, LazySuperPath) else list(base)
+        for radius, layer in zip(radii, layers):
+          rounded = self.rounder.stats['rounded']
+          self.rounder.radius = radius
+          self.rounder.clamped = []
+          if orig is None:
+            s = base.copy()
+          else:
+            s = base
+            s[:] = orig
+          self.rounder.round_superpath(s, corners, tables)
+          self.note_clamped(path_id, self.rounder.clamped, radius)
+          t = time.time()
+          variant = copy.deepcopy(el)
+          variant.attrib.pop('transform', None)
+          variant.attrib['id'] = self.unique_id("%s-r%s" % (path_id, ('%g' % radius).replace('.', '_')))
+          variant.attrib['d'] = self.path_data(s)
+          if transform:
+            variant.attrib['transform'] = transform
+          variant.attrib.pop(inkex.addNS('type', 'sodipodi'), None)
+          layer.append(variant)
+          self.add_to_index(variant)
+          t = self.timed('serialize', t)
+          self.path_stats.append({ 'id': path_id, 'radius': radius, 'subpaths': len(base), 'parsed': parsed, 'nodes': nodes,
+                                   'selected': selected, 'rounded': self.rounder.stats['rounded'] - rounded,
+                                   'clamped': len(self.rounder.clamped),
+                                   'seconds': t - t_path })
+          t_path = t
+
+
+    def note_clamped(self, path_id, clamped, radius):
+      """ remember the corners of path_id that got a smaller radius than the requested radius, for the report in clean_up().
+          clamped is a list of (subpath_idx, node_idx, radius), see CornerRounder.clamped
       """
-      Given the supernode s and the radius self.radius, we compute and return two points:
-      c, the center of the arc and m, the midpoint of the arc.
-
-      Method used:
-      - construct the ray c_m_vec that runs though the original point p=[x,y] through c and m.
-      - next.trim_pt, [x,y] and c form a rectangular triangle. Thus we can
-        compute cdist as the length of the hypothenuses under trim and radius.
-      - c is then cdist away from [x,y] along the vector c_m_vec.
-      - m is closer to [x,y] than c by exactly radius.
-      """
-
-      a = [ s['prev']['trim_pt'][0] - s['x'], s['prev']['trim_pt'][1] - s['y'] ]
-      b = [ s['next']['trim_pt'][0] - s['x'], s['next']['trim_pt'][1] - s['y'] ]
+      for sp_idx, node_idx, r in clamped:
+        self.clamped.append({ 'node': "%s:%d:%d" % (path_id, sp_idx, node_idx), 'radius': r, 'requested': radius })
 
-      c_m_vec = [ a[0] + b[0],
-                  a[1] + b[1] ]
-      l = math.sqrt( c_m_vec[0]*c_m_vec[0] + c_m_vec[1]*c_m_vec[1] )
 
-      cdist = math.sqrt( self.radius*self.radius + s['trim']*s['trim'] )    # distance [x,y] to circle center c.
-
-      c = [ s['x'] + cdist * c_m_vec[0] / l,                      # circle center
-            s['y'] + cdist * c_m_vec[1] / l ]
-
-      m = [ s['x'] + (cdist-self.radius) * c_m_vec[0] / l,        # spline midpoint
-            s['y'] + (cdist-self.radius) * c_m_vec[1] / l ]
-
-      return (c, m)
-
-
-    def arc_bezier_handles(self, p1, p4, c):
+    def superpath(self, elem):
+      """ the superpath of elem. A LazySuperPath, which parses only the subpaths that are used, if the path data can be
+          split into subpaths (see split_path_d()). Else all of it is parsed now.
       """
-      Compute the control points p2 and p3 between points p1 and p4, so that the cubic bezier spline
-      defined by p1,p2,p3,p2 approximates an arc around center c
-
-      Algorithm based on Aleksas Riškus and Hans Muller. Sorry Pomax, saw your works too, but did not use any.
+      parts = split_path_d(elem.attrib.get('d') or '')
+      if parts is None:
+        return elem.path.to_superpath()
+      if hasattr(inkex, 'CubicSuperPath'):
+        return LazySuperPath(parts, lambda text: inkex.CubicSuperPath(text)[0])
+      # 0.92 continues a relative moveto from the end point as written, not from the last node. That point is only
+      # known after the subpath is parsed up to there, so all of it is parsed at once.
+      s = elem.path.to_superpath()
+      return LazySuperPath(parts, parsed=s) if len(s) == len(parts) else s
+
+
+    def path_data(self, s):
+      """ path data of the rounded superpath s. Of a LazySuperPath, only the subpaths that round_superpath() has
+          replaced are converted, all others keep their text. With --precision, in the short form of format_path_compact().
       """
-      x1,y1 = p1
-      x4,y4 = p4
-      xc,yc = c
-
-      ax = x1 - xc
-      ay = y1 - yc
-      bx = x4 - xc
-      by = y4 - yc
-      q1 = ax * ax + ay * ay
-      q2 = q1 + ax * bx + ay * by
-      k2 = 4./3. * (math.sqrt(2 * q1 * q2) - q2) / (ax * by - ay * bx)
-
-      x2 = xc + ax - k2 * ay
-      y2 = yc + ay + k2 * ax
-      x3 = xc + bx + k2 * by
-      y3 = yc + by - k2 * bx
-
-      return ([x2, y2], [x3, y3])
-
-
-    def subpath_round_corner(self, sp, node_idx):
-      sn, sp_node_idx_ = self.super_node(sp, node_idx)
-      if sn is None: return sp          # do nothing. stderr messages are already printed.
-
-      # The angle to be rounded is now between the vectors a and b
-      #
-      a = sn['prev']['handle']
-      b = sn['next']['handle']
-      a_len = sn['prev']['hlen']
-      b_len = sn['next']['hlen']
-      try:
-        # From https://de.wikipedia.org/wiki/Schnittwinkel_(Geometrie)
-        # Wikipedia has an abs() in the formula, which extracts the smaller of the two angles.
-        # We don't want that. We need to distinguish betwenn spitzwingklig and stumpfwinklig.
-        #
-        alpha = math.acos( (a[0]*b[0]+a[1]*b[1]) / ( math.sqrt(a[0]*a[0]+a[1]*a[1]) * math.sqrt(b[0]*b[0]+b[1]*b[1]) ) )
-      except:
-        # Division by 0 error means path folds back on itself here. No space to apply a radius between the segments.
-        self.skipped_degenerated += 1
-        return sp
-
-      sn['alpha'] = math.degrees(alpha)
-
-      # find the amount to trim back both sides so that a circle of radius self.radius would perfectly fit.
-      if alpha < self.eps:
-        # path folds back on itself here. No space to apply a radius between the segments.
-        self.skipped_degenerated += 1
-        return sp
-      if abs(alpha - math.pi) < self.eps:
-        # stretched. radius won't be visible, that is just fine. No need to warn about that.
-        return sp
-      trim = self.radius / math.tan(0.5 * alpha)
-      sn['trim'] = trim
-      if trim < 0.0:
-        print("Error: at node_idx=%d: angle=%g°, trim is negative: %g" % (node_idx, math.degrees(alpha), trim), file=sys.stderr)
-        return sp
-
-      # a_len points to the previous node. There we can always allow max_trim_factor_single, as the trim was either already done,
-      # or will not be done. Only at b_len we need to reserve space for the next trim.
-      # FIXME: also allow max_trim_factor_single at b_len, when we find that the very next node will not be rounded.
-      #
-      available_len = min(max_trim_factor_single*a_len, self.max_trim_factor*b_len)
-      if trim > available_len:
-        if debug:
-          if trim > max_trim_factor_single*a_len:
-            print("Skipping where hlen_a %g * max_trim %g < needed_trim %g" % (a_len, max_trim_factor_single, trim), file=self.tty)
-          if trim > self.max_trim_factor*b_len:
-            print("Skipping where hlen_b %g * max_trim %g < needed_trim %g" % (b_len, self.max_trim_factor, trim), file=self.tty)
-          pprint.pprint(sn, stream=self.tty)
-        if self.skipped_small_len > available_len:
-          self.skipped_small_len = available_len
-        self.skipped_small_count += 1
-        return sp
-      trim_pt_p = [ sn['x'] + a[0] * trim / a_len, sn['y'] + a[1] * trim / a_len ]
-      trim_pt_n = [ sn['x'] + b[0] * trim / b_len, sn['y'] + b[1] * trim / b_len ]
-      sn['prev']['trim_pt'] = trim_pt_p
-      sn['next']['trim_pt'] = trim_pt_n
-
-      if debug:
-        pprint.pprint(sn, stream=self.tty)
-        pprint.pprint(self.cut, stream=self.tty)
-      # We replace the node_idx node by two nodes node_a, node_b.
-      # We need an extra middle node node_m if alpha < 90° -- alpha is the angle between the tangents,
-      # as the arc spans the remainder to complete 180° an arc with more than 90° needs the midpoint.
-
-      # We preserve the endpoints of the two outside handles if they are non-0-length.
-      # We know that such handles are long enough (because of the above max_trim_factor checks)
-      # to not flip around when applying the trim.
-      # But we move the endpoints of 0-length outside handles with the point when trimming,
-      # so that they don't end up on the inside.
-      prev_handle = sp_node_idx_[0][:]
-      next_handle = sp_node_idx_[2][:]
-      if self.very_close_xy(prev_handle, sp_node_idx_[1]): prev_handle = trim_pt_p[:]
-      if self.very_close_xy(next_handle, sp_node_idx_[1]): next_handle = trim_pt_n[:]
-
-      p1 = trim_pt_p[:]
-      p7 = trim_pt_n[:]
-      arc_c, p4 = self.arc_c_m_from_super_node(sn)
-      node_a = [ prev_handle, p1[:], p1[:] ]    # deep copy, as we may want to modify the second handle later
-      node_b = [ p7[:], p7[:], next_handle ]    # deep copy, as we may want to modify the first handle later
-
-      if alpha >= 0.5*math.pi or self.cut:
-        if self.cut == False:
-          # p3,p4,p5 do not exist, we need no midpoint
-          p2, p6 = self.arc_bezier_handles(p1, p7, arc_c)
-          node_a[2] = p2
-          node_b[0] = p6
-        if node_idx == 0:
-          # use prev idx to know about the extra skip. +1 for the node here, +1 for inclusive.
-          # CAUTION: Keep in sync below
-          sp = [node_a] + [node_b] + sp[1:sn['prev']['idx']+2]
-        else:
-          sp = sp[:node_idx] + [node_a] + [node_b] + sp[node_idx+1:]
-      else:
-        p2, p3 = self.arc_bezier_handles(p1, p4, arc_c)
-        p5, p6 = self.arc_bezier_handles(p4, p7, arc_c)
-        node_m = [ p3, p4, p5 ]
-        node_a[2] = p2
-        node_b[0] = p6
-        if node_idx == 0:
-          # use prev idx to know about the extra skip. +1 for the node here, +1 for inclusive.
-          # CAUTION: Keep in sync above
-          sp = [node_a] + [node_m] + [node_b] + sp[1:sn['prev']['idx']+2]
+      precision = self.options.precision
+      if precision >= 0:
+        if isinstance(s, LazySuperPath):
+          return s.path_data(lambda sp: format_path_compact([ sp ], precision))
+        return format_path_compact(s, precision)
+      if isinstance(s, LazySuperPath):
+        if hasattr(inkex, 'CubicSuperPath'):
+          return s.path_data(lambda sp: str(inkex.CubicSuperPath([ sp ]).to_path(curves_only=False)))
+        import cubicsuperpath
+        return s.path_data(lambda sp: cubicsuperpath.formatPath([ sp ]))
+      return str(s.to_path(curves_only=False))
+
+
+    def parsed_count(self, s):
+      """ (number of subpaths, number of nodes) of the superpath s that are parsed, for --timing """
+      parsed = s.parsed_subpaths() if isinstance(s, LazySuperPath) else s
+      return len(parsed), sum(len(sp) for sp in parsed)
+
+
+    def transformed_superpath(self, elem):
+      """ the superpath of elem with its own transform applied, as round_path() sees it. elem itself is not changed.
+      """
+      el = getattr(elem, 'element', elem)     # the lxml element, also with the 0.92 compatibility layer
+      original = list(el.attrib.items())
+      elem.apply_transform()                  # the radius is meant after the transform.
+      s = self.superpath(elem)
+      # all attributes back, in their order. Not with el.set(), inkex 1.x would normalize the values.
+      el.attrib.clear()
+      for name, value in original:
+        el.attrib[name] = value
+      return s
+
+
+    def analyze(self, path_ids):
+      """ --analyze: report the largest radius that fits each selected corner (see CornerRounder.max_radii()),
+          and the largest radius that fits all of them. Nothing is rounded.
+      """
+      t = time.time()
+      inf = float('inf')
+      ends = 0
+      for path_id in path_ids:
+        elem = self.svg.getElementById(path_id)
+        if elem is None:
+          for node_id in self.selection.node_ids(path_id):
+            print("selected_node %s not found in svg document" % node_id, file=sys.stderr)
+          continue
+        s = self.transformed_superpath(elem)
+        corners = self.selection.subpaths(path_id, s)
+        tables = self.rounder.corner_tables(s, corners)
+        for sp_idx in sorted(tables):
+          table = tables[sp_idx]
+          ends += table.skipped_ends
+          for i, (radius, limit) in enumerate(self.rounder.max_radii(table)):
+            alpha = table.angle(i)
+            self.analysis.append({ 'node': "%s:%d:%d" % (path_id, sp_idx, table.sns[i].idx), 'max_radius': radius, 'limit': limit,
+                                   'angle': math.degrees(alpha) if alpha == alpha else None })
+      self.timed('analyze', t)
+
+      fits = [ a for a in self.analysis if a['limit'] not in ('straight', 'degenerated') ]
+      print("Largest radius per corner:", file=sys.stderr)
+      for a in self.analysis:
+        if a['limit'] in ('straight', 'degenerated'):
+          print("  %-24s %s" % (a['node'], a['limit']), file=sys.stderr)
         else:
-          sp = sp[:node_idx] + [node_a] + [node_m] + [node_b] + sp[node_idx+1:]
+          print("  %-24s %10g   angle %5.1f°, limited by %s" % (a['node'], round_down(a['max_radius']), a['angle'], a['limit']), file=sys.stderr)
+      if fits:
+        tightest = min(fits, key=lambda a: a['max_radius'])
+        print("\n%s with a radius up to %g (%s is the tightest)." %
+              ("The corner fits" if len(fits) == 1 else "All %d corners fit" % len(fits),
+               round_down(tightest['max_radius']), tightest['node']), file=sys.stderr)
+        print("Radius %g fits %d of them." % (self.radius, len([ a for a in fits if a['max_radius'] >= self.radius ])), file=sys.stderr)
+      degenerated = len(self.analysis) - len(fits) - len([ a for a in self.analysis if a['limit'] == 'straight' ])
+      if degenerated + ends:
+        print("%d selected nodes cannot be rounded at all (180° turn or end of path)." % (degenerated + ends), file=sys.stderr)
+
+
+    def add_to_index(self, el):
+      """ the id index of the 0.92 compatibility layer learns about el, which the sweep added with a new id.
+          With inkex 1.x this does nothing, the new elements are never looked up by id.
+      """
+      if hasattr(self.svg, 'add_to_index'):
+        self.svg.add_to_index(el)
 
-      # A closed path is formed by making the last node indentical to the first node.
-      # So, if we trim at the first node, then duplicte that trim on the last node, to keep the loop closed.
-      if node_idx == 0:
-        sp[-1][0] = sp[0][0][:]
-        sp[-1][1] = sp[0][1][:]
-        sp[-1][2] = sp[0][2][:]
 
-      return sp
+    def unique_id(self, base):
+      """ base, or base with a number appended, so that no element in the document has it as id yet.
+          The ids of the document are collected with a single scan on the first call, new ones are added as they are handed out.
+      """
+      if self.used_ids is None:
+        self.used_ids = set(el.get('id') for el in self.svg.root.xpath('//*[@id]'))
+      new_id, n = base, 1
+      while new_id in self.used_ids:
+        n += 1
+        new_id = "%s-%d" % (base, n)
+      self.used_ids.add(new_id)
+      return new_id
+
+
+    def save(self, stream):     # document output
+      t = time.time()
+      inkex.EffectExtension.save(self, stream)       # no super(), 0.92 has old style classes in python2
+      self.timed('output', t)
+
+
+    def write_timing(self, filename):
+      """ dump phase_times and path_stats as JSON. """
+      import json
+
+      report = { 'version': __version__, 'radius': self.radius, 'radii': self.options.radii, 'method': self.options.method,
+                 'phases': self.phase_times, 'total': sum(self.phase_times.values()),
+                 'rounded': self.rounded_count, 'skipped_degenerated': self.skipped_degenerated,
+                 'skipped_small_count': self.skipped_small_count, 'paths': self.path_stats,
+                 'cache': self.cache.report() if self.cache else None }
+      if self.options.analyze:
+        report['analysis'] = self.analysis
+      if self.options.auto_fit:
+        report['clamped'] = self.clamped
+      if self.options.exact:
+        stats = self.rounder.stats
+        report['exact'] = { 'corners': stats['exact'], 'failed': stats['exact_failed'],
+                            'iterations': stats['exact_iterations'], 'max_iterations': stats['exact_max_iterations'],
+                            'seconds_per_corner': self.phase_times.get('exact', 0.0) / max(1, stats['exact'] + stats['exact_failed']) }
+      if filename == '-':
+        json.dump(report, sys.stderr, indent=1, sort_keys=True)
+        print("", file=sys.stderr)
+      else:
+        with open(filename, 'w') as f:
+          json.dump(report, f, indent=1, sort_keys=True)
 
 
     def clean_up(self):         # __fini__
-      if self.tty is not None:
-        self.tty.close()
-      super(RoundedCorners, self).clean_up()
+      if self.cache:
+        t = time.time()
+        self.cache.trim()
+        self.timed('cache', t)
+        if debug:
+          print("result cache: %(hits)d hits, %(misses)d misses (hit rate %(hit_rate).2f), %(seconds_saved).3f sec saved, "
+                "%(stores)d stored, %(evicted)d evicted in %(dir)s" % self.cache.report(), file=self.tty)
+      if getattr(getattr(self, 'options', None), 'timing', None):
+        self.write_timing(self.options.timing)
+      if debug and hasattr(self.svg, 'id_index_scans'):
+        print("getElementById: %d scans, %d hits, %d misses" %
+              (self.svg.id_index_scans, self.svg.id_index_hits, self.svg.id_index_misses), file=self.tty)
+      if self._tty is not None:
+        self._tty.close()
+      inkex.EffectExtension.clean_up(self)
       if self.skipped_degenerated:
         print("Warning: Skipped %d degenerated nodes (180° turn or end of path?).\n" % self.skipped_degenerated, file=sys.stderr)
+      if self.clamped:
+        print("Note: %d nodes have not enough space for the radius, they got the largest radius that fits:" % len(self.clamped), file=sys.stderr)
+        for c in self.clamped[:clamped_report_max]:
+          print("  %-24s %10g   (%g smaller)" % (c['node'], c['radius'], c['requested'] - c['radius']), file=sys.stderr)
+        if len(self.clamped) > clamped_report_max:
+          print("  ... and %d more." % (len(self.clamped) - clamped_report_max), file=sys.stderr)
+        print("", file=sys.stderr)
+      if self.rounder.stats['tolerance_missed']:
+        print("Warning: %d arcs deviate more than the tolerance %g, even with %d segments per quarter circle.\n" %
+              (self.rounder.stats['tolerance_missed'], self.rounder.tolerance, arc_max_segments), file=sys.stderr)
       if self.skipped_small_count:
         print("Warning: Skipped %d nodes with not enough space (Value %g is too small. Try again with a smaller radius or only one node selected).\n" % (self.skipped_small_count, self.skipped_small_len), file=sys.stderr)
 
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# coding=utf-8
+#
+# Copyright (C) 2020 Juergen Weigert, jnweiger@gmail.com
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+"""
+Round Corners, batch mode
+
+Run the round corners extension on many svg files, outside of inkscape.
+All corners of all paths in each file are rounded, as if the paths were selected in inkscape
+without selecting individual nodes (see RoundedCorners.find_roundable_nodes()).
+
+The files are spread over a pool of worker processes. Each worker imports inkex and round_corners once,
+and then processes many files. A summary line with rounded and skipped corners is printed per file.
+
+Usage:
+  round_corners_batch.py [--radius 2] [--method arc] [--tolerance 0.01] [--exact] [--precision 4] [--jobs N] [--output-dir DIR | --suffix .rounded | --in-place] FILE|DIR|GLOB ...
+
+This needs the inkex module of inkscape 1.x, e.g. PYTHONPATH=/usr/share/inkscape/extensions
+"""
+
+import os, sys, io, glob, time, argparse, multiprocessing
+
+import round_corners
+
+
+class BatchRoundedCorners(round_corners.RoundedCorners):
+    """ RoundedCorners with all path elements of the document selected """
+
+    def effect(self):
+        if not self.options.ids and not self.options.selected_nodes:
+          self.options.ids = [ el.get('id') for el in self.svg.xpath('//svg:path[@id]') ]
+        return round_corners.RoundedCorners.effect(self)
+
+    def has_changed(self, ret):
+        # inkex writes nothing when the document is unchanged. A batch run must still produce every output file.
+        return True
+
+
+def expand_inputs(inputs, suffix=None, output_dir=None):
+  """ turn a list of files, directories and glob patterns into a sorted list of svg files.
+      Directories and glob patterns leave out the results of an earlier run, so that a run can be repeated on the same inputs:
+      NAME.SUFFIX.svg files (with suffix) and everything in output_dir. Files named explicitly are always taken.
+  """
+  def earlier_result(name):
+    if suffix and os.path.splitext(name)[0].endswith(suffix):
+      return True
+    return output_dir is not None and os.path.dirname(os.path.realpath(name)) == os.path.realpath(output_dir)
+
+  files = []
+  for name in inputs:
+    if os.path.isdir(name):
+      files.extend(f for f in glob.glob(os.path.join(name, '*.svg')) if not earlier_result(f))
+    elif os.path.exists(name):
+      files.append(name)
+    else:
+      files.extend(f for f in glob.glob(name) if not earlier_result(f))
+  return sorted(set(files))
+
+
+def output_name(infile, output_dir=None, suffix='.rounded', in_place=False):
+  if in_place:
+    return infile
+  if output_dir:
+    return os.path.join(output_dir, os.path.basename(infile))
+  base, ext = os.path.splitext(infile)
+  return base + suffix + ext
+
+
+def round_file(job):
+  """ worker: round all corners in one file. Returns a summary dict. """
+  infile, outfile, args = job
+  summary = { 'file': infile, 'output': outfile, 'rounded': 0, 'skipped_degenerated': 0, 'skipped_small': 0, 'error': None }
+  ext = BatchRoundedCorners()
+  stderr = sys.stderr
+  sys.stderr = messages = io.StringIO()      # warnings of clean_up() go into the summary.
+  t0 = time.time()
+  try:
+    ext.run(args + [ infile ], output=outfile)
+  except SystemExit:                          # inkex exits on AbortExtension, e.g. when there are no paths at all.
+    summary['error'] = messages.getvalue().strip() or 'aborted'
+  except Exception as e:
+    summary['error'] = "%s: %s" % (type(e).__name__, e)
+  finally:
+    sys.stderr = stderr
+  summary['seconds'] = time.time() - t0
+  summary['rounded'] = ext.rounded_count
+  summary['skipped_degenerated'] = ext.skipped_degenerated
+  summary['skipped_small'] = ext.skipped_small_count
+  return summary
+
+
+def main(argv=None):
+  ap = argparse.ArgumentParser(description="Round all corners of all paths in many svg files.")
+  ap.add_argument('inputs', nargs='+', help="svg files, directories (all *.svg inside) or glob patterns")
+  ap.add_argument('--radius', type=float, default=2.0, help="Radius [mm] to round vertices. Default: 2")
+  ap.add_argument('--method', type=str, default='arc', help="operation: one of 'arc' (default), 'line'")
+  ap.add_argument('--tolerance', type=float, default=0.0, help="largest deviation of an arc from the circle [mm], with as few bezier segments as that allows. Default: 0, one segment per quarter circle")
+  ap.add_argument('--exact', action='store_true', help="fit the arcs to curved segments, instead of trimming along the tangents")
+  ap.add_argument('--precision', type=int, default=-1, help="write rounded paths with this many decimals, in short form. Default: all digits")
+  ap.add_argument('--jobs', '-j', type=int, default=0, help="number of worker processes. Default: number of CPUs")
+  out = ap.add_mutually_exclusive_group()
+  out.add_argument('--output-dir', '-o', help="write results into this directory, with the same file names")
+  out.add_argument('--suffix', default='.rounded', help="write results next to the input, as NAME.rounded.svg (default)")
+  out.add_argument('--in-place', action='store_true', help="overwrite the input files")
+  args = ap.parse_args(argv)
+
+  files = expand_inputs(args.inputs, args.suffix, args.output_dir)
+  if not files:
+    print("No svg files found.", file=sys.stderr)
+    return 1
+  if args.output_dir and not os.path.isdir(args.output_dir):
+    os.makedirs(args.output_dir)
+
+  ext_args = [ "--radius=%g" % args.radius, "--method=%s" % args.method, "--tolerance=%g" % args.tolerance, "--exact=%s" % args.exact, "--precision=%d" % args.precision, "--cache-mb=0" ]
+  jobs = [ (f, output_name(f, args.output_dir, args.suffix, args.in_place), ext_args) for f in files ]
+
+  t0 = time.time()
+  failed = 0
+  total = { 'rounded': 0, 'skipped_degenerated': 0, 'skipped_small': 0 }
+  pool = multiprocessing.Pool(args.jobs or None)
+  try:
+    for s in pool.imap_unordered(round_file, jobs):
+      if s['error']:
+        failed += 1
+        print("%s: FAILED: %s" % (s['file'], s['error']))
+        continue
+      for key in total:
+        total[key] += s[key]
+      print("%s: %d rounded, %d skipped (no room), %d skipped (degenerated), %.3f sec" %
+            (s['file'], s['rounded'], s['skipped_small'], s['skipped_degenerated'], s['seconds']))
+  finally:
+    pool.close()
+    pool.join()
+  print("%d files, %d failed: %d rounded, %d skipped (no room), %d skipped (degenerated), %.3f sec" %
+        (len(files), failed, total['rounded'], total['skipped_small'], total['skipped_degenerated'], time.time() - t0))
+  return 1 if failed else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
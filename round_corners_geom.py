@@ -0,0 +1,1860 @@
+#!/usr/bin/env python
+# coding=utf-8
+#
+# Copyright (C) 2020 Juergen Weigert, jnweiger@gmail.com
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+"""
+Round Corners, geometry
+
+The path geometry of the round corners extension, without inkex. This is what round_corners.py runs inside inkscape,
+and it can be used on its own, e.g. on a server that gets path data and has no inkscape installed:
+
+  import round_corners_geom
+  d, stats = round_corners_geom.round_path_d("M 0,0 L 10,0 L 10,10 Z", radius=2)
+  d, stats = round_corners_geom.round_path_d(d, radius=1, method='line', nodes=[ (0, 1) ])
+  for d, stats in round_corners_geom.round_path_d_sweep(d, round_corners_geom.parse_radii("0.5:3:0.5")): ...
+
+There is no global state: all settings and counters live in a CornerRounder object, and round_path_d() makes a new one
+for each call. Concurrent calls from several threads do not interfere.
+
+Paths are handled as superpaths (the cubicsuperpath format of inkex): a list of subpaths, each a list of nodes
+[ [prev_handle], [point], [next_handle] ] with absolute coordinates. A closed subpath repeats its first node at the end.
+parse_path() and format_path() convert from and to svg path data, following inkex.paths.CubicSuperPath.
+format_path_compact() writes shorter path data, with lines as h, v or l, relative coordinates and fewer decimals.
+tangent_circle() fits a circle to two curved segments, bezier_split() and bezier_segment() cut them, for CornerRounder.exact.
+LazySuperPath parses only the subpaths that are used, and writes back only those that changed. The others keep their text.
+"""
+
+# python2 compatibility:
+from __future__ import print_function
+
+import re, sys, math, time
+
+exact_max_iterations = 20       # newton steps per corner for CornerRounder.exact. Usually 2 or 3 are enough.
+arc_max_segments = 64           # bezier segments per quarter circle at most, see arc_segments(). That is within 4e-15 of the radius.
+max_trim_factor = 0.98          # a corner can eat up almost all of the room it has. Neighbours share a segment, see plan_corners().
+numpy_min_corners = 64          # corner_geometry() uses numpy for this many corners or more. Below that, the import does not pay off.
+numpy = None                    # optional, imported on demand by load_numpy(). False if not available.
+
+
+def load_numpy():
+  """ Import numpy on first use. Returns the module, or None if numpy is not available. """
+  global numpy
+  if numpy is None:
+    try:
+      import numpy as np
+      numpy = np
+    except ImportError:
+      numpy = False
+  return numpy or None
+
+
+def very_close(n1, n2):
+  "deep compare. all elements in sub arrays are compared for (very close) numerical equality"
+  return very_close_xy(n1[0], n2[0]) and very_close_xy(n1[1], n2[1]) and very_close_xy(n1[2], n2[2])
+
+
+def very_close_xy(p1, p2):
+  "one 2 element array is compared for (very close) numerical equality"
+  eps = 1e-9
+  return abs(p1[0]-p2[0]) < eps and abs(p1[1]-p2[1]) < eps
+
+
+def arc_bezier_handles(p1, p4, c):
+  """
+  Compute the control points p2 and p3 between points p1 and p4, so that the cubic bezier spline
+  defined by p1,p2,p3,p2 approximates an arc around center c
+
+  Algorithm based on Aleksas Riškus and Hans Muller. Sorry Pomax, saw your works too, but did not use any.
+  """
+  x1,y1 = p1
+  x4,y4 = p4
+  xc,yc = c
+
+  ax = x1 - xc
+  ay = y1 - yc
+  bx = x4 - xc
+  by = y4 - yc
+  q1 = ax * ax + ay * ay
+  q2 = q1 + ax * bx + ay * by
+  k2 = 4./3. * (math.sqrt(2 * q1 * q2) - q2) / (ax * by - ay * bx)
+
+  x2 = xc + ax - k2 * ay
+  y2 = yc + ay + k2 * ax
+  x3 = xc + bx + k2 * by
+  y3 = yc + by - k2 * bx
+
+  return ([x2, y2], [x3, y3])
+
+
+def arc_bezier_error(radius, angle):
+  """ the largest radial deviation of the bezier segment of arc_bezier_handles() from an arc of radius and angle [radians].
+      The segment runs outside of the circle and is furthest away in the middle: radius * 2 sin^6(angle/4) / (27 cos^2(angle/4)).
+      That is 0.027% of the radius for a quarter circle, and 1.9% for a half circle [Goldapp].
+  """
+  s = math.sin(0.25 * angle)
+  c = math.cos(0.25 * angle)
+  return radius * 2.0 * s**6 / (27.0 * c * c)
+
+
+def arc_segments(radius, angle, tolerance, max_segments=arc_max_segments):
+  """ the smallest number of bezier segments for an arc of radius and angle [radians], so that none of them deviates more
+      than tolerance from the circle, see arc_bezier_error(). Raises ValueError if tolerance is not positive.
+      At most max_segments per quarter circle: if even that does not meet the tolerance, the caller sees it in
+      arc_bezier_error(radius, angle / n).
+  """
+  if not tolerance > 0.0:
+    raise ValueError("tolerance must be positive: %r" % tolerance)
+  limit = max(1, int(math.ceil(max_segments * angle / (0.5 * math.pi))))
+  # sin^6(angle/4n) alone must not exceed 27 tolerance / 2 radius. That gives n, at most a step or two short
+  # for the cos^2 term of the error, which only matters for segments near a half circle.
+  k = 13.5 * tolerance / radius if radius > 0.0 else 1.0
+  step = math.asin(min(1.0, k ** (1.0 / 6)))     # the largest angle / 4n
+  n = limit if 0.25 * angle >= step * limit else max(1, int(math.ceil(0.25 * angle / step)))
+  while n < limit and arc_bezier_error(radius, angle / n) > tolerance:
+    n += 1
+  return min(n, limit)
+
+
+def bezier_point(b, t):
+  """ the point at t of the cubic bezier b = [ p0, p1, p2, p3 ] """
+  u = 1.0 - t
+  c0, c1, c2, c3 = u*u*u, 3.0*u*u*t, 3.0*u*t*t, t*t*t
+  return [ c0*b[0][0] + c1*b[1][0] + c2*b[2][0] + c3*b[3][0], c0*b[0][1] + c1*b[1][1] + c2*b[2][1] + c3*b[3][1] ]
+
+
+def bezier_split(b, t):
+  """ split the cubic bezier b at t into two, with de Casteljau's algorithm (like bezmisc.beziersplitatt()).
+      Returns ([ p0 ... ], [ ... p3 ]), the parts before and after t.
+  """
+  lerp = lambda p, q: [ p[0] + (q[0] - p[0]) * t, p[1] + (q[1] - p[1]) * t ]
+  m01, m12, m23 = lerp(b[0], b[1]), lerp(b[1], b[2]), lerp(b[2], b[3])
+  m012, m123 = lerp(m01, m12), lerp(m12, m23)
+  m = lerp(m012, m123)
+  return [ b[0][:], m01, m012, m ], [ m[:], m123, m23, b[3][:] ]
+
+
+def bezier_segment(b, t0, t1):
+  """ the part of the cubic bezier b from t0 to t1 (0 <= t0 < t1 <= 1), as a cubic bezier """
+  if t1 < 1.0:
+    b = bezier_split(b, t1)[0]
+  if t0 > 0.0:
+    b = bezier_split(b, t0 / t1)[1]
+  return b
+
+
+def _bezier_offset(b, t, r):
+  """ the point at distance r to the left of the cubic bezier b at t, and its derivative by t.
+      None where b has no direction at t.
+  """
+  u = 1.0 - t
+  d = [ 3.0 * (u*u*(b[1][j] - b[0][j]) + 2.0*u*t*(b[2][j] - b[1][j]) + t*t*(b[3][j] - b[2][j])) for j in (0, 1) ]
+  dd = [ 6.0 * (u*(b[2][j] - 2.0*b[1][j] + b[0][j]) + t*(b[3][j] - 2.0*b[2][j] + b[1][j])) for j in (0, 1) ]
+  q = d[0]*d[0] + d[1]*d[1]
+  if q < 1e-24:
+    return None
+  l = math.sqrt(q)
+  p = bezier_point(b, t)
+  # the unit normal is (-d.y, d.x) / |d|. Its derivative is (-dd.y, dd.x) / |d| - (-d.y, d.x) * (d . dd) / |d|^3
+  f = (d[0]*dd[0] + d[1]*dd[1]) / q
+  return ([ p[0] - r * d[1] / l, p[1] + r * d[0] / l ],
+          [ d[0] - r * (dd[1] - d[1] * f) / l, d[1] + r * (dd[0] - d[0] * f) / l ])
+
+
+def _chord_param(b, dist):
+  """ the t where the cubic bezier b is dist away from its start point, by bisection. None if its end is closer than that. """
+  lo, hi = 0.0, 1.0
+  if math.hypot(b[3][0] - b[0][0], b[3][1] - b[0][1]) <= dist:
+    return None
+  for i in range(12):
+    t = 0.5 * (lo + hi)
+    p = bezier_point(b, t)
+    if math.hypot(p[0] - b[0][0], p[1] - b[0][1]) < dist:
+      lo = t
+    else:
+      hi = t
+  return 0.5 * (lo + hi)
+
+
+def tangent_circle(side_a, side_b, radius, trim, turn, max_iterations=exact_max_iterations):
+  """ the circle of radius that touches the two cubic beziers side_a and side_b, which start together at a corner.
+      turn is 1.0 if side_b is counterclockwise from side_a at the corner, else -1.0 (see corner_geometry()),
+      trim is where the tangent approximation touches, as a distance from the corner.
+
+      The center lies on the curves that run parallel to both sides at distance radius, where they cross:
+      at s on side_a and t on side_b. Newton's method finds s and t, starting from the points at the distance trim
+      (found by bisection). A step that does not bring the parallel curves closer is halved. The number of steps is bounded.
+
+      Returns (s, t, center, iterations), or (None, None, None, iterations) if there is no solution with 0 < s, t < 1
+      within max_iterations.
+  """
+  fail = (None, None, None)
+  s = _chord_param(side_a, trim)
+  t = _chord_param(side_b, trim)
+  if s is None or t is None:
+    return fail + (0,)
+  ra, rb = turn * radius, -turn * radius      # the center is on the left of side_a if b turns counterclockwise.
+  eps = 1e-10 * max(1.0, radius, abs(side_a[0][0]) + abs(side_a[0][1]))
+  oa, ob = _bezier_offset(side_a, s, ra), _bezier_offset(side_b, t, rb)
+  if oa is None or ob is None:
+    return fail + (0,)
+  fx, fy = oa[0][0] - ob[0][0], oa[0][1] - ob[0][1]
+  err = math.hypot(fx, fy)
+  iterations = 0
+  while err > eps:
+    if iterations == max_iterations:
+      return fail + (iterations,)
+    iterations += 1
+    # solve [ oa' -ob' ] (ds, dt) = -(fx, fy)
+    ja, jb = oa[1], ob[1]
+    det = -ja[0] * jb[1] + ja[1] * jb[0]
+    if abs(det) < 1e-30:
+      return fail + (iterations,)
+    ds = (fx * jb[1] - fy * jb[0]) / det
+    dt = (ja[1] * fx - ja[0] * fy) / det
+    step = 1.0
+    for halving in range(30):
+      s1 = min(1.0, max(0.0, s + step * ds))
+      t1 = min(1.0, max(0.0, t + step * dt))
+      oa1, ob1 = _bezier_offset(side_a, s1, ra), _bezier_offset(side_b, t1, rb)
+      if oa1 is not None and ob1 is not None:
+        err1 = math.hypot(oa1[0][0] - ob1[0][0], oa1[0][1] - ob1[0][1])
+        if err1 < err:
+          break
+      step *= 0.5
+    else:
+      return fail + (iterations,)
+    s, t, oa, ob, err = s1, t1, oa1, ob1, err1
+    fx, fy = oa[0][0] - ob[0][0], oa[0][1] - ob[0][1]
+  if not (0.0 < s < 1.0 and 0.0 < t < 1.0):
+    return fail + (iterations,)
+  return s, t, [ 0.5 * (oa[0][0] + ob[0][0]), 0.5 * (oa[0][1] + ob[0][1]) ], iterations
+
+
+def corner_geometry_py(x, y, ax, ay, bx, by, eps=0.00001):
+  """
+  The radius independent part of the fillet geometry of many corners. All arguments except eps are sequences with one entry
+  per corner: the corner point x,y and the tangent vectors a (towards the previous node) and b (towards the next node).
+
+  Returns a dict of lists, one entry per corner: the arguments x ... by, and
+  - a_len, b_len:       lengths of the tangent vectors.
+  - sin_h, cos_h:       sine and cosine of alpha/2, where alpha is the angle between a and b.
+  - cot_h:              cos_h / sin_h. The trim is this times the radius.
+  - turn:               1.0 if b is counterclockwise from a (the sign of the cross product a x b), else -1.0.
+  - degenerate, straight: boolean masks. The path folds back on itself, or does not turn at all.
+
+  No angle is computed. The half angle comes from the dot and cross products, as
+  tan(alpha/2) = |a x b| / (|a||b| + a.b) = (|a||b| - a.b) / |a x b|. We use the form without cancellation:
+  the first one up to 90°, the second one above. Unlike acos() of the dot product, this stays accurate close to 0° and 180°.
+  corner_angle() has alpha for reports.
+
+  This is the scalar reference implementation. corner_geometry_numpy() computes the same with numpy arrays.
+  """
+  nan = float('nan')
+  sqrt = math.sqrt
+  eps_h = math.sin(0.5 * eps)         # alpha < eps, in terms of sin(alpha/2)
+  a_lens, b_lens, sin_hs, cos_hs, cot_hs, turns, degenerates, straights = [], [], [], [], [], [], [], []
+  for xa, ya, xb, yb in zip(ax, ay, bx, by):
+    a_len = sqrt(xa*xa + ya*ya)
+    b_len = sqrt(xb*xb + yb*yb)
+    ab = a_len * b_len
+    dot = xa*xb + ya*yb
+    cross = xa*yb - ya*xb
+    # s and c are proportional to sin(alpha/2) and cos(alpha/2)
+    if dot >= 0.0:
+      s, c = abs(cross), ab + dot
+    else:
+      s, c = ab - dot, abs(cross)
+    if ab > 0.0:
+      n = sqrt(s*s + c*c)
+      sin_h, cos_h = s / n, c / n
+    else:
+      # A zero length tangent has no direction. No space to apply a radius between the segments.
+      sin_h = cos_h = nan
+    degenerate = not sin_h >= eps_h   # nan, too.
+    a_lens.append(a_len)
+    b_lens.append(b_len)
+    sin_hs.append(sin_h)
+    cos_hs.append(cos_h)
+    cot_hs.append(nan if degenerate else c / s)
+    turns.append(1.0 if cross >= 0.0 else -1.0)
+    degenerates.append(degenerate)
+    straights.append(not degenerate and cos_h < eps_h)
+  return { 'x': x, 'y': y, 'ax': ax, 'ay': ay, 'bx': bx, 'by': by, 'a_len': a_lens, 'b_len': b_lens,
+           'sin_h': sin_hs, 'cos_h': cos_hs, 'cot_h': cot_hs, 'turn': turns, 'degenerate': degenerates, 'straight': straights }
+
+
+def corner_geometry_numpy(x, y, ax, ay, bx, by, eps=0.00001):
+  """ Vectorized version of corner_geometry_py(). Same arguments, returns a dict of numpy arrays. """
+  x, y, ax, ay, bx, by = [ numpy.asarray(v, dtype=float) for v in (x, y, ax, ay, bx, by) ]
+  eps_h = math.sin(0.5 * eps)
+  with numpy.errstate(all='ignore'):          # degenerate corners produce nan or inf.
+    a_len = numpy.sqrt(ax*ax + ay*ay)
+    b_len = numpy.sqrt(bx*bx + by*by)
+    ab = a_len * b_len
+    dot = ax*bx + ay*by
+    cross = ax*by - ay*bx
+    acute = dot >= 0.0
+    s = numpy.where(acute, numpy.abs(cross), ab - dot)
+    c = numpy.where(acute, ab + dot, numpy.abs(cross))
+    n = numpy.where(ab > 0.0, numpy.sqrt(s*s + c*c), numpy.nan)
+    sin_h = s / n
+    cos_h = c / n
+    degenerate = ~(sin_h >= eps_h)            # nan from a zero length tangent, too.
+    straight = ~degenerate & (cos_h < eps_h)
+    cot_h = numpy.where(degenerate, numpy.nan, c / s)
+    turn = numpy.where(cross >= 0.0, 1.0, -1.0)
+  return { 'x': x, 'y': y, 'ax': ax, 'ay': ay, 'bx': bx, 'by': by, 'a_len': a_len, 'b_len': b_len,
+           'sin_h': sin_h, 'cos_h': cos_h, 'cot_h': cot_h, 'turn': turn, 'degenerate': degenerate, 'straight': straight }
+
+
+def corner_geometry(x, y, ax, ay, bx, by, eps=0.00001):
+  """ Use corner_geometry_numpy() for larger batches if numpy is available, else corner_geometry_py().
+      fillet_kernel() then follows the same choice.
+  """
+  if len(x) >= numpy_min_corners and load_numpy():
+    return corner_geometry_numpy(x, y, ax, ay, bx, by, eps)
+  return corner_geometry_py(x, y, ax, ay, bx, by, eps)
+
+
+def corner_angle(sin_h, cos_h):
+  """ the angle alpha [radians] between the tangents of a corner, from sin_h and cos_h of corner_geometry(). nan if unknown. """
+  return 2.0 * math.atan2(sin_h, cos_h)
+
+
+def fillet_kernel_py(g, a_avail, b_avail, radius):
+  """
+  Compute the fillets of many corners for one radius. g is the corner geometry computed by corner_geometry_py(),
+  a_avail and b_avail are sequences with the lengths available for trimming on either side of each corner.
+
+  Returns a dict of lists, one entry per corner:
+  - degenerate, straight: as in g.
+  - trim:               the distance from x,y to the tangent points of the arc.
+  - tpx, tpy, tnx, tny: the tangent points (trim points) on the previous and next side.
+  - cx, cy, mx, my:     the arc center and the arc midpoint.
+  - one_segment:        boolean mask, alpha >= 90°. The arc is one bezier segment p1,p2,p6,p7.
+  - p2x ... p6y:        bezier handles. For one_segment p3, p5 are nan.
+                        Otherwise it is two segments p1,p2,p3,p4 and p4,p5,p6,p7 with p4 = m.
+  - too_short:          boolean mask, trim does not fit into a_avail or b_avail.
+  The geometry of degenerate or straight corners is nan.
+
+  Only sqrt is needed, everything follows from the half angle in g. The arc spans theta = 180° - alpha, a bezier segment
+  for an arc of theta has its handles 4/3 * tan(theta/4) * radius long, along the tangents at its ends [Riškus].
+  Here tan(theta/4) = cos_h / (1 + sin_h).
+
+  This is the scalar reference implementation. fillet_kernel_numpy() computes the same with numpy arrays.
+  """
+  nan = float('nan')
+  sqrt = math.sqrt
+  keys = ('trim', 'tpx', 'tpy', 'tnx', 'tny', 'cx', 'cy', 'mx', 'my',
+          'p2x', 'p2y', 'p3x', 'p3y', 'p5x', 'p5y', 'p6x', 'p6y', 'one_segment', 'too_short')
+  k = dict((key, []) for key in keys)
+  out = [ k[key].append for key in keys ]
+  skip = (nan,) * 17 + (False, False)
+  x, y, ax, ay, bx, by, a_len, b_len = [ g[key] for key in ('x', 'y', 'ax', 'ay', 'bx', 'by', 'a_len', 'b_len') ]
+  sin_hs, cos_hs, cot_hs, turn, degenerate, straight = [ g[key] for key in ('sin_h', 'cos_h', 'cot_h', 'turn', 'degenerate', 'straight') ]
+  for i in range(len(x)):
+    if degenerate[i] or straight[i]:
+      for append, v in zip(out, skip):
+        append(v)
+      continue
+    xi, yi, sin_h, cos_h = x[i], y[i], sin_hs[i], cos_hs[i]
+    uax, uay = ax[i] / a_len[i], ay[i] / a_len[i]
+    ubx, uby = bx[i] / b_len[i], by[i] / b_len[i]
+    # find the amount to trim back both sides so that a circle of radius would perfectly fit.
+    trim = radius * cot_hs[i]
+    p1x, p1y = xi + uax * trim, yi + uay * trim
+    p7x, p7y = xi + ubx * trim, yi + uby * trim
+
+    # The arc center c and midpoint m lie on the bisector w: ua turned by alpha/2 towards ub.
+    # c is radius / sin_h away from x,y, m is closer to x,y than c by exactly radius.
+    wx = uax * cos_h - turn[i] * uay * sin_h
+    wy = uay * cos_h + turn[i] * uax * sin_h
+    cdist = radius / sin_h
+    mx, my = xi + (cdist - radius) * wx, yi + (cdist - radius) * wy
+
+    # An arc of 90° or less is one bezier segment. Above that, we split at the midpoint.
+    t = cos_h / (1.0 + sin_h)
+    one = cos_h <= sin_h
+    if one:
+      p3x = p3y = p5x = p5y = nan
+    else:
+      t = t / (1.0 + sqrt(1.0 + t*t))   # tan(theta/8), half the arc per segment.
+      # At m the arc runs parallel to the chord p1 p7, which is w turned by 90° towards ub.
+      h = 4./3. * radius * t * turn[i]
+      p3x, p3y, p5x, p5y = mx + wy * h, my - wx * h, mx - wy * h, my + wx * h
+    h = 4./3. * radius * t
+    for append, v in zip(out, (trim, p1x, p1y, p7x, p7y, xi + cdist * wx, yi + cdist * wy, mx, my,
+                               p1x - uax * h, p1y - uay * h, p3x, p3y, p5x, p5y, p7x - ubx * h, p7y - uby * h,
+                               one, trim > min(a_avail[i], b_avail[i]))):
+      append(v)
+  k['degenerate'], k['straight'] = degenerate, straight
+  return k
+
+
+def fillet_kernel_numpy(g, a_avail, b_avail, radius):
+  """
+  Vectorized version of fillet_kernel_py(). g is computed by corner_geometry_numpy(), returns a dict of numpy arrays.
+  All corners are computed at once, results match fillet_kernel_py() within rounding errors.
+  """
+  x, y, ax, ay, bx, by, a_len, b_len = [ g[key] for key in ('x', 'y', 'ax', 'ay', 'bx', 'by', 'a_len', 'b_len') ]
+  sin_h, cos_h, turn = g['sin_h'], g['cos_h'], g['turn']
+  a_avail, b_avail = numpy.asarray(a_avail, dtype=float), numpy.asarray(b_avail, dtype=float)
+  with numpy.errstate(all='ignore'):          # degenerate corners produce nan or inf. They are masked below.
+    ok = ~g['degenerate'] & ~g['straight']
+    trim = numpy.where(ok, radius * g['cot_h'], numpy.nan)
+    too_short = ok & (trim > numpy.minimum(a_avail, b_avail))
+    uax, uay = ax / a_len, ay / a_len
+    ubx, uby = bx / b_len, by / b_len
+    tpx = x + uax * trim
+    tpy = y + uay * trim
+    tnx = x + ubx * trim
+    tny = y + uby * trim
+
+    wx = uax * cos_h - turn * uay * sin_h
+    wy = uay * cos_h + turn * uax * sin_h
+    cdist = numpy.where(ok, radius / sin_h, numpy.nan)
+    cx = x + cdist * wx
+    cy = y + cdist * wy
+    mx = x + (cdist - radius) * wx
+    my = y + (cdist - radius) * wy
+
+    one = ok & (cos_h <= sin_h)               # one bezier segment from p1 to p7, else two segments via m.
+    t = cos_h / (1.0 + sin_h)
+    t = numpy.where(one, t, t / (1.0 + numpy.sqrt(1.0 + t*t)))
+    h = 4./3. * radius * t
+    p2x = tpx - uax * h
+    p2y = tpy - uay * h
+    p6x = tnx - ubx * h
+    p6y = tny - uby * h
+    hm = numpy.where(one, numpy.nan, h * turn)
+    p3x, p3y, p5x, p5y = mx + wy * hm, my - wx * hm, mx - wy * hm, my + wx * hm
+
+  return { 'trim': trim, 'tpx': tpx, 'tpy': tpy, 'tnx': tnx, 'tny': tny,
+           'cx': cx, 'cy': cy, 'mx': mx, 'my': my, 'p2x': p2x, 'p2y': p2y, 'p3x': p3x, 'p3y': p3y,
+           'p5x': p5x, 'p5y': p5y, 'p6x': p6x, 'p6y': p6y, 'one_segment': one,
+           'degenerate': g['degenerate'], 'straight': g['straight'], 'too_short': too_short }
+
+
+def fillet_kernel(g, a_avail, b_avail, radius):
+  """ fillet_kernel_numpy() if g was computed with numpy, else fillet_kernel_py().
+      The result is a dict of numpy arrays or a dict of lists, respectively.
+  """
+  if hasattr(g['cot_h'], 'dtype'):
+    return fillet_kernel_numpy(g, a_avail, b_avail, radius)
+  return fillet_kernel_py(g, a_avail, b_avail, radius)
+
+
+class SuperNode(object):
+  """ Compact record of one corner, as computed by CornerRounder.super_node().
+      A plain object with __slots__ and flat float attributes: no per instance dict, no nested dicts, no copied nodes.
+      That is 12 allocations per corner instead of 28, the rest are the boxed floats (see test/bench_super_node.py).
+
+      - idx, x, y:              index and coordinates of the corner node itself.
+      - prev_idx, next_idx:     indices of the neighbour nodes (with wraparound on closed subpaths).
+      - ax, ay, bx, by:         tangent vectors towards the previous and the next node (rel coords).
+      - len_h1, len_h2:         lengths of these tangent vectors.
+      - dist1, dist2:           distances to the previous and next node (more exactly: to the end of their handle towards us).
+      - prev_moves, next_moves: True, if the neighbour has no handle towards us. Its end of the segment moves when it is rounded.
+      - prev_handle, next_handle: the nodes own handle points (absolute coords, shared with the subpath, do not modify).
+      - prev_node, next_node:   the neighbour nodes (shared with the subpath, do not modify). The segments towards them are
+                                needed to fit the arc to curved segments, see CornerRounder.exact.
+  """
+  __slots__ = ('idx', 'x', 'y', 'prev_idx', 'next_idx', 'ax', 'ay', 'bx', 'by', 'len_h1', 'len_h2',
+               'dist1', 'dist2', 'prev_moves', 'next_moves', 'prev_handle', 'next_handle', 'prev_node', 'next_node')
+
+  def __init__(self, idx, x, y, prev_idx, next_idx):
+    self.idx = idx
+    self.x = x
+    self.y = y
+    self.prev_idx = prev_idx
+    self.next_idx = next_idx
+
+  def __repr__(self):
+    return "SuperNode(%s)" % ", ".join("%s=%r" % (k, getattr(self, k, None)) for k in self.__slots__)
+
+
+class CornerTable(object):
+  """ The radius independent data of the selected corners of one subpath, computed by CornerRounder.corner_table().
+      Rounding with another radius, or another method, can start from here. Only fillet_kernel() and the
+      checks in corner_fits() are repeated.
+
+      - sns:            SuperNode records of the usable corners, in ascending order.
+      - geometry:       corner_geometry() of sns: tangent vectors and their lengths, the half angle and the degenerate/straight masks.
+      - cot_h, degenerate, straight: the same as plain lists, for fast indexing. cot_h is the trim per radius.
+      - a_room, b_room: the lengths on either side that can be trimmed away, if no neighbour needs them: the handle length,
+                        but not more than the distance to the neighbour.
+      - skipped_ends:   selected nodes at the end of an open subpath. They are counted as degenerated whenever the table is used.
+  """
+  __slots__ = ('sns', 'geometry', 'cot_h', 'degenerate', 'straight', 'a_room', 'b_room', 'skipped_ends')
+
+  def __init__(self, sns, geometry, skipped_ends):
+    self.sns = sns
+    self.geometry = geometry
+    self.skipped_ends = skipped_ends
+    for key in ('cot_h', 'degenerate', 'straight'):
+      v = geometry[key]
+      setattr(self, key, v.tolist() if hasattr(v, 'tolist') else list(v))
+    self.a_room = [ min(sn.len_h1, sn.dist1) for sn in sns ]
+    self.b_room = [ min(sn.len_h2, sn.dist2) for sn in sns ]
+
+  def angle(self, i):
+    """ the angle between the tangents at corner i [radians], nan if degenerated. Only for reports. """
+    return corner_angle(float(self.geometry['sin_h'][i]), float(self.geometry['cos_h'][i]))
+
+
+def roundable_span(sp):
+  """ the node indices of the subpath sp that can be rounded, as (first, stop), stop excluded. None if there are none.
+      Not included are
+      - the last (one or two) nodes of a closed path (which coindide with the first node)
+      - the first and last node of an open path (which cannot be smoothed)
+  """
+  if len(sp) < 3:
+    return None     # subpaths of 2 or less nodes are ignored
+  if very_close(sp[0], sp[-1]):
+    idx_s = 0       # closed paths count from 0 to either n-1 or n-2
+    idx_e = len(sp) - 1
+    if very_close_xy(sp[-2][1], sp[-1][1]):
+      idx_e = len(sp) - 2
+  else:
+    idx_s = 1       # open paths count from 1 to either n-1
+    idx_e = len(sp) - 1
+  return (idx_s, idx_e) if idx_e > idx_s else None
+
+
+def roundable_subpaths(csp):
+  """ select all nodes of all (sub)paths of the superpath csp that can be rounded, see roundable_span().
+      Returns a dict subpath_idx -> node indices, ascending.
+  """
+  ret = {}
+  for sp_idx in range(0, len(csp)):
+    span = roundable_span(csp[sp_idx])
+    if span:
+      ret[sp_idx] = range(*span)
+  return ret
+
+
+def check_nodes(csp, nodes):
+  """ raise ValueError if nodes (as round_path_d() takes them) names a subpath or node that the superpath csp does not have.
+      Negative indices are not allowed either, they would count from the end and round another corner than meant.
+  """
+  if hasattr(nodes, 'items'):
+    # a range is within bounds if both its ends are, there is no need to look at each node.
+    pairs = ((sp_idx, idx) for sp_idx in nodes for idx in
+             ((nodes[sp_idx][0], nodes[sp_idx][-1]) if hasattr(nodes[sp_idx], 'start') and len(nodes[sp_idx]) else nodes[sp_idx]))
+  else:
+    pairs = nodes
+  for sp_idx, idx in pairs:
+    if not 0 <= sp_idx < len(csp):
+      raise ValueError("no subpath %r, the path has %d" % (sp_idx, len(csp)))
+    if not 0 <= idx < len(csp[sp_idx]):
+      raise ValueError("no node %r in subpath %d, it has %d" % (idx, sp_idx, len(csp[sp_idx])))
+
+
+def roundable_nodes(csp):
+  """ roundable_subpaths() as a list of (subpath_idx, node_idx) tuples. """
+  subpaths = roundable_subpaths(csp)
+  return [ (sp_idx, idx) for sp_idx in sorted(subpaths) for idx in subpaths[sp_idx] ]
+
+
+class NodeSelection(object):
+  """ The selected nodes of many paths, as plain integers, grouped by path and subpath.
+
+      Each path has a dict subpath_idx -> list of entries. An entry is a node index, or a range (first, stop) with stop
+      excluded, where stop None means to the end. Subpath None applies to all subpaths. Ranges stay ranges until subpaths()
+      meets the parsed path, so that selecting all of a huge path costs nothing here. The text forms are
+        path_id                     all nodes of the path, as when the path is selected without selecting nodes.
+        path_id:subpath:index       one node, as inkscape passes it in --selected-nodes.
+        path_id:subpath:*           all nodes of the subpath.
+        path_id:subpath:first-last  nodes first to last, both included.
+      Ranges only select nodes that can be rounded (see roundable_span()), single nodes are taken as they are.
+  """
+  __slots__ = ('paths',)
+
+  def __init__(self):
+    self.paths = {}                   # path_id -> { subpath_idx or None: list of node_idx or (first, stop) }
+
+  def add(self, path_id, sp_idx, node_idx):
+    self.paths.setdefault(path_id, {}).setdefault(sp_idx, []).append(node_idx)
+
+  def add_range(self, path_id, sp_idx=None, first=0, stop=None):
+    """ add nodes first ... stop-1 of subpath sp_idx, or of all subpaths. stop None: up to the end. """
+    self.add(path_id, sp_idx, (first, stop))
+
+  def add_node_id(self, node_id):
+    """ add a node or a range of nodes in one of the text forms above. Raises ValueError. """
+    parts = node_id.rsplit(':', 2)
+    if len(parts) < 3:
+      if not node_id or ':' in node_id:
+        raise ValueError("not a path id or path_id:subpath:index: %r" % node_id)
+      return self.add_range(node_id)
+    path_id, sp_idx, node = parts
+    sp_idx = int(sp_idx)
+    if node == '*':
+      return self.add_range(path_id, sp_idx)
+    first, sep, last = node.partition('-')
+    if sep:
+      return self.add_range(path_id, sp_idx, int(first), int(last) + 1)
+    self.add(path_id, sp_idx, int(node))
+
+  def add_node_ids(self, lines):
+    """ add_node_id() for each line of e.g. an open file, one at a time. Empty lines and lines starting with # are skipped. """
+    for line in lines:
+      line = line.strip()
+      if line and not line.startswith('#'):
+        self.add_node_id(line)
+
+  def path_ids(self):
+    return sorted(self.paths)
+
+  def subpaths(self, path_id, csp):
+    """ the selected nodes of path_id, with csp the parsed superpath of that path.
+        Returns a dict subpath_idx -> node indices, ascending and without duplicates, as CornerRounder.corner_tables() takes it.
+        A subpath with nothing but one range gets a range object, no list is built.
+        Single nodes that the path does not have are skipped with a warning on stderr.
+    """
+    entries = {}
+    for sp_idx, items in self.paths.get(path_id, {}).items():
+      for i in (range(len(csp)) if sp_idx is None else [ sp_idx ]):
+        entries.setdefault(i, []).extend(items)
+    ret = {}
+    for sp_idx in entries:
+      size = len(csp[sp_idx]) if 0 <= sp_idx < len(csp) else 0
+      nodes = []
+      for n in entries[sp_idx]:
+        if isinstance(n, tuple):
+          pass
+        elif 0 <= n < size:
+          nodes.append(n)
+        else:
+          print("%s:%d:%d is not a node, skipped" % (path_id, sp_idx, n), file=sys.stderr)
+      span = roundable_span(csp[sp_idx]) if size else None
+      ranges = []
+      if span:
+        for first, stop in [ n for n in entries[sp_idx] if isinstance(n, tuple) ]:
+          first, stop = max(first, span[0]), min(span[1] if stop is None else stop, span[1])
+          if first < stop:
+            ranges.append(range(first, stop))
+      if len(ranges) == 1 and not nodes:
+        ret[sp_idx] = ranges[0]
+      elif ranges or nodes:
+        for r in ranges:
+          nodes.extend(r)
+        ret[sp_idx] = sorted(set(nodes))
+    return ret
+
+  def key(self, path_id):
+    """ the selection of path_id in a canonical form, e.g. for a cache key. The same selection gives the same key. """
+    def canonical(items):
+      return (sorted(n for n in items if not isinstance(n, tuple)),
+              sorted((n[0], -1 if n[1] is None else n[1]) for n in items if isinstance(n, tuple)))
+    path = self.paths.get(path_id, {})
+    return sorted((-1 if sp_idx is None else sp_idx, canonical(path[sp_idx])) for sp_idx in path)
+
+  def node_ids(self, path_id):
+    """ the selection of path_id in the text forms above, for messages """
+    ret = []
+    path = self.paths.get(path_id, {})
+    for sp_idx in sorted(path, key=lambda i: -1 if i is None else i):
+      for n in path[sp_idx]:
+        if sp_idx is None:
+          ret.append(path_id)
+        elif not isinstance(n, tuple):
+          ret.append("%s:%d:%d" % (path_id, sp_idx, n))
+        elif n == (0, None):
+          ret.append("%s:%d:*" % (path_id, sp_idx))
+        else:
+          ret.append("%s:%d:%d-%s" % (path_id, sp_idx, n[0], '' if n[1] is None else n[1] - 1))
+    return ret
+
+
+class CornerRounder(object):
+  """ The corner rounding engine. Holds the settings and the counters of one run, nothing else.
+      Use one CornerRounder per thread (or per request). round_path_d() does that for you.
+
+      - radius, method:   as the extension options. method 'line' cuts the corner with a straight line instead of an arc.
+      - max_trim_factor:  how much of its room a corner may use up: of a handle, or of what its neighbours leave of a segment.
+      - auto_fit:         corners without enough room for radius are rounded with the largest radius that fits, instead of
+                          being skipped. They are listed in clamped, as (subpath_idx, node_idx, radius).
+      - tolerance:        the largest deviation of an arc from the circle. Each arc gets as few bezier segments as that allows,
+                          see arc_nodes(). None: one segment up to a quarter circle, two above.
+      - exact:            at corners with a curved segment, fit the circle to the curve, instead of trimming along the tangent.
+                          The segments are cut where the circle touches them, and keep their shape. See exact_fillet().
+      - times:            a dict phase name -> seconds, where the time spent in super_node and fillet is added.
+      - log:              a stream for debug output, or None.
+      - stats:            counters, see new_stats().
+  """
+
+  def __init__(self, radius=None, method='arc', max_trim_factor=max_trim_factor, eps=0.00001, times=None, log=None, auto_fit=False,
+               tolerance=None, exact=False):
+    self.radius = radius
+    self.cut = method in ('line',)
+    self.max_trim_factor = max_trim_factor
+    self.auto_fit = auto_fit
+    self.tolerance = tolerance
+    self.exact = exact
+    self.clamped = []
+    self.eps = eps                    # avoid division by zero
+    self.times = {} if times is None else times
+    self.log = log
+    self.stats = self.new_stats()
+
+
+  @staticmethod
+  def new_stats():
+    return { 'rounded': 0,                      # corners actually rounded
+             'skipped_degenerated': 0,          # not a useful corner (e.g. 180deg corner)
+             'skipped_small_count': 0,          # not enough room for arc
+             'clamped': 0,                      # rounded with a smaller radius, see auto_fit
+             'exact': 0,                        # corners fitted to curved segments, see exact
+             'exact_failed': 0,                 # no exact fit found, rounded along the tangents instead
+             'exact_iterations': 0,             # newton steps of all exact fits
+             'exact_max_iterations': 0,         # ... and of the one that needed the most
+             'tolerance_missed': 0,             # arcs that deviate more than tolerance with arc_max_segments
+             'skipped_small_len': 1e99 }        # record the shortest handle (or segment) when skipping.
+
+
+  def timed(self, phase, t0):
+    """ add the time elapsed since t0 to the given phase. Returns the current time. """
+    t = time.time()
+    self.times[phase] = self.times.get(phase, 0.0) + t - t0
+    return t
+
+
+  def round_superpath(self, csp, nodes, tables=None):
+    """ round the corners given as (subpath_idx, node_idx) tuples, or as NodeSelection.subpaths(), in the superpath csp.
+        Each affected subpath of csp is replaced with a rounded copy. All indices refer to the original (unmodified) csp.
+        tables are the corner_tables() of csp and nodes, if they are known already. Returns csp.
+
+        To round the same corners with several radii, compute the tables once and round copies of the original csp:
+          tables = rounder.corner_tables(csp, nodes)
+          rounder.radius = 1.5
+          variant = rounder.round_superpath(list(csp), nodes, tables)
+    """
+    if tables is None:
+      tables = self.corner_tables(csp, nodes)
+    for sp_idx in sorted(tables):
+      ## call the actual path manipulator. It returns a new list of nodes.
+      csp[sp_idx] = self.round_corner_table(csp[sp_idx], tables[sp_idx], sp_idx)
+    return csp
+
+
+  def corner_tables(self, csp, nodes):
+    """ corner_table() for each subpath of csp with nodes in it. Returns a dict subpath_idx -> CornerTable
+        nodes is a list of (subpath_idx, node_idx) tuples, or a dict subpath_idx -> node indices in ascending order
+        without duplicates, as NodeSelection.subpaths() and roundable_subpaths() have it.
+    """
+    if hasattr(nodes, 'items'):
+      subpath_nodes = nodes
+    else:
+      subpath_nodes = {}
+      for sp_idx, node_idx in nodes:
+        subpath_nodes.setdefault(sp_idx, []).append(node_idx)
+      for sp_idx in subpath_nodes:
+        subpath_nodes[sp_idx] = sorted(set(subpath_nodes[sp_idx]))
+    return dict((sp_idx, self.corner_table(csp[sp_idx], subpath_nodes[sp_idx])) for sp_idx in subpath_nodes if subpath_nodes[sp_idx])
+
+
+  def corner_table(self, sp, node_idxs):
+    """ collect the radius independent data of the corners at node_idxs (ascending, no duplicates) of the subpath sp
+        in a CornerTable.
+    """
+    t = time.time()
+    sns = []
+    for node_idx in node_idxs:
+      sn = self.super_node(sp, node_idx)
+      if sn is not None: sns.append(sn)
+    geometry = corner_geometry([ sn.x for sn in sns ], [ sn.y for sn in sns ],
+                               [ sn.ax for sn in sns ], [ sn.ay for sn in sns ],
+                               [ sn.bx for sn in sns ], [ sn.by for sn in sns ], self.eps)
+    table = CornerTable(sns, geometry, len(node_idxs) - len(sns))
+    self.timed('super_node', t)
+    return table
+
+
+  def super_node(self, sp, node_idx):
+    """ In case of node_idx 0, we need to use either the last, the second-last or the third last node as a previous node.
+        For a closed subpath, the last node and the first node are identical. Then, the second last node may be still at the
+        same location if it has a handle. If so, we take the third last instead. Gah. It has a certain logic...
+
+        In case of the node_idx being the last node, we already know that the subpath is not closed,
+        we use 0 as the next node.
+
+        The direction sn.prev.dir does not really point to the coordinate of the previous node, but to the end of the
+        next-handle of the prvious node. This is the same when there are straight lines. The absence of handles is
+        denoted by having the same coordinates for handle and node.
+        Same for next.dir, it points to the next.prev handle.
+
+        The exact implementation here is:
+        - sn.next.handle is set to a relative vector that is the tangent of the curve towards the next point.
+          we implement four cases:
+          - if neither node nor next have handles, the connection is a straight line, and next.handle points
+            in the direction of the next node itself.
+          - if the curve between node and next is defined by two handles, then sn.next.handle is in the direction of the
+            nodes own handle,
+          - if the curve between node and next is defined one handle at the node itself, then sn.next.handle is in the
+            direction of the nodes own handle,
+          - if the curve between node and next is defined one handle at the next node, then sn.next.handle is in the
+            direction from the node to the end of that other handle.
+        - when trimming back later, we move along that tangent, instead of following the curve.
+          That is an approximation when the segment is curved, and exact when it is straight.
+          With CornerRounder.exact, the circle is fitted to the curves themselves, see exact_fillet().
+
+        Only the geometry is collected here. Whether there is enough room for the radius, is decided by corner_fits().
+        Returns None at the ends of an open subpath, the caller counts these as skipped_degenerated.
+    """
+
+    prev_idx = node_idx - 1
+    t = sp[node_idx]
+    prev_handle = t[0]                # if this wraps around, at node_idx=0, we may need to tweak the prev handle
+    if node_idx == 0:
+      prev_idx = len(sp) - 1
+      if very_close(t, sp[prev_idx]):
+        prev_idx = prev_idx - 1       # skip one node, it is the 'close marker'
+        if very_close_xy(t[1], sp[prev_idx][1]):
+          # still no distance, skip more. Needed for https://github.com/jnweiger/inkscape-round-corners/issues/2
+          prev_handle = sp[prev_idx][0]       # this node must act as if its prev handle is that one.
+          prev_idx = prev_idx - 1
+      else:
+        return None                   # path ends here.
+
+    if node_idx == len(sp)-1:
+      return None                     # path ends here. On a closed loop, we can never select the last point.
+
+    next_idx = node_idx + 1
+    if next_idx >= len(sp): next_idx = 0
+    p = sp[prev_idx]
+    n = sp[next_idx]
+    x = t[1][0]
+    y = t[1][1]
+    sn = SuperNode(node_idx, x, y, prev_idx, next_idx)
+    sn.prev_handle = prev_handle
+    sn.next_handle = t[2]
+    sn.prev_node = p
+    sn.next_node = n
+    sn.prev_moves = very_close_xy(p[2], p[1])
+    sn.next_moves = very_close_xy(n[0], n[1])
+
+    d1x = p[2][0] - x                                 # direction to the previous node (rel coords)
+    d1y = p[2][1] - y
+    d2x = n[0][0] - x                                 # direction to the next node (rel coords)
+    d2y = n[0][1] - y
+    sn.dist1 = math.sqrt(d1x*d1x + d1y*d1y)           # distance to the previous node
+    sn.dist2 = math.sqrt(d2x*d2x + d2y*d2y)           # distance to the next node
+
+    # handles towards previous and next node (rel coords). Without a handle, we point at the neighbour.
+    if very_close_xy(prev_handle, t[1]):
+      sn.ax, sn.ay = d1x, d1y
+    else:
+      sn.ax, sn.ay = prev_handle[0] - x, prev_handle[1] - y
+    if very_close_xy(t[2], t[1]):
+      sn.bx, sn.by = d2x, d2y
+    else:
+      sn.bx, sn.by = t[2][0] - x, t[2][1] - y
+    sn.len_h1 = math.sqrt(sn.ax*sn.ax + sn.ay*sn.ay)
+    sn.len_h2 = math.sqrt(sn.bx*sn.bx + sn.by*sn.by)
+
+    return sn
+
+
+  def subpath_round_corners(self, sp, node_idxs):
+    """ round the corners at all node_idxs of the subpath sp and return the new list of nodes.
+        All node_idxs refer to sp as given, sp itself is not modified.
+    """
+    return self.round_corner_table(sp, self.corner_table(sp, sorted(set(node_idxs))))
+
+
+  def round_corner_table(self, sp, table, sp_idx=None):
+    """ round the corners of the CornerTable of the subpath sp and return the new list of nodes. sp is not modified.
+        sp_idx is only used to record clamped corners.
+
+        This runs in four passes:
+        - corner_table() has collected the geometry of all corners with super_node(), and their angles,
+        - fillet_kernel() computes trims, arc centers and bezier handles for all corners at once,
+        - plan_corners() decides which corners are rounded, sharing the segments between neighbours,
+        - in ascending order, corner_fits() checks and counts each corner, and corner_nodes() builds the replacement nodes.
+          With exact, exact_fillet() fits the arc to curved segments first, and exact_nodes() builds the nodes.
+        Finally the new node list is assembled in one forward pass. split_segments() then cuts the curved segments
+        at the exact contact points.
+        No index offsets need to be tracked, and the cost is O(len(sp)), regardless of the number of corners.
+    """
+    t = time.time()
+    exact_seconds = self.times.get('exact', 0.0)
+    self.stats['skipped_degenerated'] += table.skipped_ends
+    sns = table.sns
+    if not sns:
+      return sp
+    k = self.fillet_corners(table)
+    radii, claim_a, claim_b = self.plan_corners(table, k)
+
+    replace = {}              # node_idx -> list of new nodes replacing the node at node_idx.
+    close_idx = None          # index of the node that closes the loop, if node 0 is rounded.
+    contacts = {}             # node_idx -> exact_fillet() of the corners fitted to curved segments.
+    after = {}                # the same, by the node_idx of the previous node.
+    for i in range(len(sns)):
+      sn = sns[i]
+      ki, j = k, i
+      if radii[i] is not None and radii[i] < self.radius:
+        # auto_fit has shrunk the radius. Only this corner is computed again.
+        ki, j = self.fillet_corner(table, i, radii[i]), 0
+      if not self.corner_fits(sn, ki, j, radii[i], claim_a[i], claim_b[i]):
+        continue
+      if ki is not k:
+        self.stats['clamped'] += 1
+        self.clamped.append((sp_idx, sn.idx, radii[i]))
+      fit = None
+      if self.exact and not all(self.corner_segments(sn)[2:]):
+        fit = self.exact_fillet(sn, radii[i], ki['trim'][j], contacts.get(sn.prev_idx), after.get(sn.idx))
+      if fit is None:
+        replace[sn.idx] = self.corner_nodes(sn, ki, j)
+      else:
+        contacts[sn.idx] = after[sn.prev_idx] = fit
+        replace[sn.idx] = self.exact_nodes(fit)
+      if sn.idx == 0:
+        # The node after sn.prev_idx closes the loop. It coincides with node 0 and must follow its trim.
+        close_idx = sn.prev_idx + 1
+
+    self.stats['rounded'] += len(replace)
+    t += self.times.get('exact', 0.0) - exact_seconds       # that was counted as 'exact', not as 'fillet'.
+    if not replace:
+      self.timed('fillet', t)
+      return sp
+
+    new_sp = []
+    pos = {}                  # node_idx -> first and last index of its nodes in new_sp. Only needed for split_segments().
+    for idx in range(len(sp) if close_idx is None else close_idx):
+      if contacts:
+        pos[idx] = (len(new_sp), len(new_sp) + len(replace.get(idx, ())) - (idx in replace))
+      if idx in replace:
+        new_sp.extend(replace[idx])
+      else:
+        new_sp.append(sp[idx])
+    if contacts:
+      self.split_segments(sp, new_sp, pos, replace, contacts, after)
+
+    # A closed path is formed by making the last node indentical to the first node.
+    # So, if we trim at the first node, then duplicte that trim on the last node, to keep the loop closed.
+    # Nodes after close_idx (extra 'close markers' skipped by super_node()) are dropped.
+    if close_idx is not None:
+      new_sp.append([ new_sp[0][0][:], new_sp[0][1][:], new_sp[0][2][:] ])
+
+    self.timed('fillet', t)
+    return new_sp
+
+
+  def fillet_corners(self, table):
+    """ run fillet_kernel() on a CornerTable with our radius. Returns a dict of lists, indexed like table.sns.
+        The available lengths passed in for the too_short mask do not know about neighbour trims,
+        plan_corners() takes care of these.
+    """
+    k = fillet_kernel(table.geometry,
+                      [ self.max_trim_factor * room for room in table.a_room ],
+                      [ self.max_trim_factor * room for room in table.b_room ],
+                      self.radius)
+    for key in k:
+      if hasattr(k[key], 'tolist'):   # numpy arrays. Indexing lists is much faster.
+        k[key] = k[key].tolist()
+    k['degenerate'], k['straight'] = table.degenerate, table.straight
+    return k
+
+
+  def fillet_corner(self, table, i, radius):
+    """ fillet_kernel() for the single corner i of the CornerTable, with its own radius. Returns a dict of lists of length 1.
+    """
+    g = dict((key, [ float(table.geometry[key][i]) ]) for key in ('x', 'y', 'ax', 'ay', 'bx', 'by', 'a_len', 'b_len', 'sin_h', 'cos_h', 'turn'))
+    for key in ('cot_h', 'degenerate', 'straight'):
+      g[key] = [ getattr(table, key)[i] ]
+    return fillet_kernel_py(g, [ table.a_room[i] ], [ table.b_room[i] ], radius)
+
+
+  def neighbours(self, table):
+    """ the neighbour corners in a CornerTable: corners on adjacent nodes, that can both be rounded.
+        Returns (prev, nxt), lists indexed like table.sns with the index of the neighbour corner, or None.
+        On a closed subpath, the last corner and the one at node 0 are neighbours, too.
+    """
+    sns = table.sns
+    n = len(sns)
+    usable = [ not (table.degenerate[i] or table.straight[i]) for i in range(n) ]
+    prev = [ None ] * n
+    nxt = [ None ] * n
+    for i in range(1, n):
+      if sns[i-1].idx == sns[i].prev_idx and usable[i-1] and usable[i]:
+        prev[i] = i - 1
+        nxt[i-1] = i
+    if n > 1 and sns[0].idx == 0 and sns[-1].idx == sns[0].prev_idx and usable[0] and usable[-1]:
+      prev[0] = n - 1
+      nxt[n-1] = 0
+    return prev, nxt
+
+
+  def plan_corners(self, table, k):
+    """ decide which corners of the CornerTable are rounded, and with which radius, knowing all of them at once.
+
+        Neighbour corners share the segment between them. If a corner has no handle towards its neighbour, the trim of the
+        neighbour moves that end of the segment, and the corner can only use what is left. A corner may take max_trim_factor
+        of its room: with no rounded neighbour on a segment, that is almost all of it.
+
+        Without auto_fit, the corners are taken in ascending order, each one if it fits next to the ones already taken.
+        Corners only conflict with their neighbours, so this rounds as many corners as possible. On a closed subpath the first
+        and the last corner are neighbours too: if both are taken but do not fit together, we run again without the one or
+        the other, and keep the better result.
+        With auto_fit, all corners are rounded. A corner that has no room for our radius, even with unrounded neighbours,
+        gets the largest radius that fits. Two neighbours that do not fit together are shrunk by the same factor.
+
+        Returns (radii, claim_a, claim_b), lists indexed like table.sns: the radius of each corner, None if it is skipped,
+        and the trims that its rounded neighbours take from the segments towards them. O(len(table.sns)).
+    """
+    sns = table.sns
+    n = len(sns)
+    radius = self.radius
+    trim = k['trim']
+    prev, nxt = self.neighbours(table)
+
+    if self.auto_fit and radius > 0:
+      u = table.cot_h                 # trim per radius
+      radii = [ None ] * n
+      for i in range(n):
+        if not (k['degenerate'][i] or k['straight'][i]):
+          radii[i] = min(radius, self.radius_limit(sns[i], u[i])[0])
+      for i in range(n):
+        j = prev[i]
+        if j is not None:
+          f = self.pair_factor(sns[j], sns[i], u[j], u[i])
+          if f < 1.0:
+            radii[i] = min(radii[i], f * radius)
+            radii[j] = min(radii[j], f * radius)
+      for i in range(n):
+        if radii[i] is not None:
+          if radii[i] <= 0.0:
+            radii[i] = None
+          elif radii[i] < radius:
+            radii[i] *= 1 - 1e-9          # a rounding error must not make it fail after all.
+      trims = [ u[i] * radii[i] if radii[i] is not None else 0.0 for i in range(n) ]
+    else:
+      taken = self.take_corners(table, k, range(n), prev)
+      if n > 1 and prev[0] == n - 1 and taken[0] and taken[n-1] and not self.fit_together(table, k, n - 1, 0, taken, prev, nxt):
+        without_first = self.take_corners(table, k, range(1, n), prev)
+        without_last = self.take_corners(table, k, range(n - 1), prev)
+        taken = without_first if sum(without_first) > sum(without_last) else without_last
+      radii = [ radius if taken[i] else None for i in range(n) ]
+      trims = [ trim[i] if taken[i] else 0.0 for i in range(n) ]
+
+    claim_a = [ trims[prev[i]] if prev[i] is not None and sns[i].prev_moves else 0.0 for i in range(n) ]
+    claim_b = [ trims[nxt[i]] if nxt[i] is not None and sns[i].next_moves else 0.0 for i in range(n) ]
+    return radii, claim_a, claim_b
+
+
+  def take_corners(self, table, k, order, prev):
+    """ plan_corners() without auto_fit: walk the corners in order, and take each one that fits next to the one taken before.
+        Returns a list of booleans, indexed like table.sns.
+    """
+    sns = table.sns
+    trim = k['trim']
+    taken = [ False ] * len(sns)
+    claim_a = [ 0.0 ] * len(sns)
+    for i in order:
+      if k['degenerate'][i] or k['straight'][i]:
+        continue
+      j = prev[i]
+      if j is not None and not taken[j]:
+        j = None
+      claim_a[i] = trim[j] if j is not None and sns[i].prev_moves else 0.0
+      if self.room_check(sns[i], trim[i], self.radius, claim_a[i], 0.0):
+        continue
+      if j is not None and sns[j].next_moves and self.room_check(sns[j], trim[j], self.radius, claim_a[j], trim[i]):
+        continue
+      taken[i] = True
+    return taken
+
+
+  def fit_together(self, table, k, j, i, taken, prev, nxt):
+    """ True if the taken corners j and i (j before i) both fit, with the trims of all their taken neighbours. """
+    sns = table.sns
+    trim = k['trim']
+    for c in (j, i):
+      a = prev[c] if prev[c] is not None and taken[prev[c]] and sns[c].prev_moves else None
+      b = nxt[c] if nxt[c] is not None and taken[nxt[c]] and sns[c].next_moves else None
+      if self.room_check(sns[c], trim[c], self.radius, trim[a] if a is not None else 0.0, trim[b] if b is not None else 0.0):
+        return False
+    return True
+
+
+  def room_check(self, sn, trim, radius, claim_a=0.0, claim_b=0.0):
+    """ check if a fillet with trim and radius fits at the corner sn, when the neighbours take claim_a and claim_b
+        from the segments towards them. Returns None if it fits, else (what, length) of the first check that fails.
+    """
+    for what, length in (("dist to prev", sn.dist1), ("dist to next", sn.dist2), ("handle to prev", sn.len_h1), ("handle to next", sn.len_h2)):
+      if length < radius:
+        return what, length
+    # Handles longer than the segment are shortened to the segment, to avoid overshooting the point.
+    # Two corners share a segment, together they leave a small rest of it.
+    mtf = self.max_trim_factor
+    available_len = min(mtf * sn.len_h1, mtf * sn.dist1 - claim_a, mtf * sn.len_h2, mtf * sn.dist2 - claim_b)
+    if trim > available_len:
+      return "room for trim", available_len
+    return None
+
+
+  def corner_fits(self, sn, k, i, radius, claim_a=0.0, claim_b=0.0):
+    """ check if there is enough room to round the corner sn with radius, with the fillet k[...][i] computed by fillet_corners().
+        claim_a and claim_b are taken by the rounded neighbours, see plan_corners(). radius None means that plan_corners()
+        skips the corner, then we only find out why.
+        Returns False for corners that must be skipped, and counts them.
+    """
+    stats = self.stats
+    fail = self.room_check(sn, k['trim'][i], self.radius if radius is None else radius, claim_a, claim_b)
+    if fail is None:
+      if k['degenerate'][i]:
+        # path folds back on itself here. No space to apply a radius between the segments.
+        stats['skipped_degenerated'] += 1
+        return False
+      if k['straight'][i]:
+        # stretched. radius won't be visible, that is just fine. No need to warn about that.
+        return False
+      if radius is not None:
+        return True
+      # fits on its own, but not next to a neighbour that is rounded.
+      fail = "room left by neighbours", min(sn.dist1 - claim_a, sn.dist2 - claim_b)
+    what, length = fail
+    if self.log:
+      print("subpath node_idx=%d skipped, %s is too small: %g (radius %g, trim %g)" %
+            (sn.idx, what, length, self.radius if radius is None else radius, k['trim'][i]), file=self.log)
+      print(sn, file=self.log)
+    if stats['skipped_small_len'] > length: stats['skipped_small_len'] = length
+    stats['skipped_small_count'] += 1
+    return False
+
+
+  def radius_limit(self, sn, u, p=0.0, q=0.0):
+    """ the largest radius that room_check() accepts at the corner sn, where the trim is u times the radius,
+        and the rounded neighbours take p and q times the radius from the segments towards them.
+        All checks are linear in the radius, so each one gives an upper bound in closed form.
+        Returns (radius, limit), limit names the check that rules out a larger radius.
+    """
+    mtf = self.max_trim_factor
+    return min((sn.dist1, 'dist to prev'),
+               (sn.dist2, 'dist to next'),
+               (sn.len_h1, 'handle to prev'),
+               (sn.len_h2, 'handle to next'),
+               (mtf * sn.len_h1 / u, 'trim to prev'),
+               (mtf * sn.dist1 / (u + p), 'trim to prev'),
+               (mtf * sn.len_h2 / u, 'trim to next'),
+               (mtf * sn.dist2 / (u + q), 'trim to next'))
+
+
+  def pair_factor(self, snj, sni, uj, ui):
+    """ the factor by which the neighbours snj and sni (snj before sni) must shrink our radius to fit together on the segment
+        between them. uj and ui are their trims per radius. 1.0 or more, if they fit with our radius.
+    """
+    mtf = self.max_trim_factor
+    radius = self.radius
+    f = float('inf')
+    if sni.prev_moves:        # the trim of snj eats into the segment of sni.
+      f = min(f, mtf * sni.dist1 / (radius * (ui + uj)))
+    if snj.next_moves:
+      f = min(f, mtf * snj.dist2 / (radius * (uj + ui)))
+    return f
+
+
+  def max_radii(self, table):
+    """ the largest radius that each corner of the CornerTable can be rounded with, under the same rules as plan_corners().
+        Returns a list of (radius, limit), indexed like table.sns. limit names the check that rules out a larger radius.
+
+        The trim grows linearly with the radius, trim = radius * cot_h, and so do all the checks in room_check().
+        Each check thus gives an upper bound in closed form (see radius_limit()), and the radius of a corner is the
+        smallest of them. The neighbours, if selected, are assumed to be rounded with the same radius. That holds in a run
+        with the smallest radius of all corners, so that one fits all corners at once.
+        Degenerated corners get 0.0, straight ones (nothing to round) get inf.
+    """
+    inf = float('inf')
+    prev, nxt = self.neighbours(table)
+    u = table.cot_h
+    ret = []
+    for i in range(len(table.sns)):
+      sn = table.sns[i]
+      if table.degenerate[i]:
+        ret.append((0.0, 'degenerated'))
+      elif table.straight[i]:
+        ret.append((inf, 'straight'))
+      else:
+        p = u[prev[i]] if prev[i] is not None and sn.prev_moves else 0.0
+        q = u[nxt[i]] if nxt[i] is not None and sn.next_moves else 0.0
+        ret.append(self.radius_limit(sn, u[i], p, q))
+    return ret
+
+
+  def corner_nodes(self, sn, k, i):
+    """ build the list of nodes that replace the corner node sn, from the fillet k[...][i] computed by fillet_corners().
+    """
+    if self.log:
+      print(sn, dict((key, k[key][i]) for key in k), file=self.log)
+      print("cut:", self.cut, file=self.log)
+    # We replace the node_idx node by two nodes node_a, node_b.
+    # We need an extra middle node node_m if alpha < 90° -- alpha is the angle between the tangents,
+    # as the arc spans the remainder to complete 180° an arc with more than 90° needs the midpoint.
+
+    # We preserve the endpoints of the two outside handles if they are non-0-length.
+    # We know that such handles are long enough (because of the max_trim_factor checks in room_check())
+    # to not flip around when applying the trim.
+    # But we move the endpoints of 0-length outside handles with the point when trimming,
+    # so that they don't end up on the inside.
+    p1 = [ k['tpx'][i], k['tpy'][i] ]
+    p7 = [ k['tnx'][i], k['tny'][i] ]
+    prev_handle = sn.prev_handle[:]
+    next_handle = sn.next_handle[:]
+    if very_close_xy(prev_handle, [ sn.x, sn.y ]): prev_handle = p1[:]
+    if very_close_xy(next_handle, [ sn.x, sn.y ]): next_handle = p7[:]
+
+    node_a = [ prev_handle, p1, p1[:] ]       # copy, as we may want to modify the second handle later
+    node_b = [ p7[:], p7, next_handle ]       # copy, as we may want to modify the first handle later
+
+    if self.tolerance and not self.cut:
+      return self.arc_nodes(node_a, node_b, [ k['cx'][i], k['cy'][i] ])
+
+    if k['one_segment'][i] or self.cut:
+      if self.cut == False:
+        # p3,p4,p5 do not exist, we need no midpoint
+        node_a[2] = [ k['p2x'][i], k['p2y'][i] ]
+        node_b[0] = [ k['p6x'][i], k['p6y'][i] ]
+      return [node_a, node_b]
+
+    node_a[2] = [ k['p2x'][i], k['p2y'][i] ]
+    node_m = [ [ k['p3x'][i], k['p3y'][i] ], [ k['mx'][i], k['my'][i] ], [ k['p5x'][i], k['p5y'][i] ] ]
+    node_b[0] = [ k['p6x'][i], k['p6y'][i] ]
+    return [node_a, node_m, node_b]
+
+
+  def arc_nodes(self, node_a, node_b, c):
+    """ the nodes of the arc around c from node_a to node_b, with as few bezier segments as keep it within self.tolerance
+        of the circle, see arc_segments(). Without a tolerance, one segment up to a quarter circle and two above, as in
+        fillet_kernel(). The inner handles of node_a and node_b are set here, the nodes in between are new.
+    """
+    ax, ay = node_a[1][0] - c[0], node_a[1][1] - c[1]
+    bx, by = node_b[1][0] - c[0], node_b[1][1] - c[1]
+    cross = ax*by - ay*bx
+    angle = math.atan2(abs(cross), ax*bx + ay*by)
+    if self.tolerance:
+      radius = math.sqrt(ax*ax + ay*ay)
+      n = arc_segments(radius, angle, self.tolerance)
+      if arc_bezier_error(radius, angle / n) > self.tolerance:
+        self.stats['tolerance_missed'] += 1
+    else:
+      n = 1 if angle <= 0.5 * math.pi else 2
+    step = math.copysign(angle / n, cross)
+    nodes = [ node_a ]
+    for j in range(1, n):
+      cos_j, sin_j = math.cos(j * step), math.sin(j * step)
+      p = [ c[0] + ax * cos_j - ay * sin_j, c[1] + ax * sin_j + ay * cos_j ]
+      nodes.append([ p[:], p, p[:] ])
+    nodes.append(node_b)
+    for n1, n2 in zip(nodes, nodes[1:]):
+      n1[2], n2[0] = arc_bezier_handles(n1[1], n2[1], c)
+    return nodes
+
+
+  def corner_segments(self, sn):
+    """ the segments from the previous node to the corner sn and from sn to the next node, as cubic beziers.
+        Returns (seg_a, seg_b, line_a, line_b). A segment without handles is a line, line_a or line_b is True.
+        Its control points are then spread evenly, so that its parameter runs in proportion to the length.
+    """
+    x = [ sn.x, sn.y ]
+    p, n = sn.prev_node, sn.next_node
+    segs = []
+    for b in ([ p[1], p[2], sn.prev_handle, x ], [ x, sn.next_handle, n[0], n[1] ]):
+      line = very_close_xy(b[0], b[1]) and very_close_xy(b[2], b[3])
+      if line:
+        dx, dy = (b[3][0] - b[0][0]) / 3.0, (b[3][1] - b[0][1]) / 3.0
+        b = [ b[0], [ b[0][0] + dx, b[0][1] + dy ], [ b[3][0] - dx, b[3][1] - dy ], b[3] ]
+      segs.append((b, line))
+    return segs[0][0], segs[1][0], segs[0][1], segs[1][1]
+
+
+  def exact_fillet(self, sn, radius, trim, before=None, after=None):
+    """ fit the circle of radius to the segments at the corner sn, see tangent_circle(). trim is where the tangent
+        approximation touches, the search starts there. before and after are the exact_fillet() of the rounded neighbours
+        on the segments towards them, if any: the contacts must not pass theirs.
+
+        Returns (sn, u, v, pa, pb, center): pa is the contact point at u on the segment from the previous node, pb at v on
+        the segment to the next node (see corner_segments()). None if there is no such circle. Then the corner is rounded
+        along the tangents, and counted as exact_failed.
+    """
+    t = time.time()
+    seg_a, seg_b = self.corner_segments(sn)[:2]
+    side_a = seg_a[::-1]                      # both sides start at the corner.
+    turn = 1.0 if sn.ax * sn.by - sn.ay * sn.bx >= 0.0 else -1.0
+    s, v, c, iterations = tangent_circle(side_a, seg_b, radius, trim, turn, exact_max_iterations)
+    stats = self.stats
+    stats['exact_iterations'] += iterations
+    stats['exact_max_iterations'] = max(stats['exact_max_iterations'], iterations)
+    fit = None
+    if s is not None and not (before and 1.0 - s <= before[2]) and not (after and v >= after[1]):
+      fit = (sn, 1.0 - s, v, bezier_point(side_a, s), bezier_point(seg_b, v), c)
+    stats['exact' if fit else 'exact_failed'] += 1
+    if self.log:
+      print("exact fit node_idx=%d: %s after %d iterations, %.1f usec" %
+            (sn.idx, "ok" if fit else "failed", iterations, (time.time() - t) * 1e6), file=self.log)
+    self.timed('exact', t)
+    return fit
+
+
+  def exact_nodes(self, fit):
+    """ the nodes that replace the corner of an exact_fillet(): the arc, or the cut, between the contact points.
+        The handles towards the neighbours are set later, by split_segments().
+    """
+    sn, u, v, pa, pb, c = fit
+    node_a = [ pa[:], pa, pa[:] ]
+    node_b = [ pb[:], pb, pb[:] ]
+    if self.cut:
+      return [ node_a, node_b ]
+    return self.arc_nodes(node_a, node_b, c)
+
+
+  def split_segments(self, sp, new_sp, pos, replace, contacts, after):
+    """ cut the curved segments at the contact points of the exact_fillet() corners in contacts, so that they keep their
+        shape (de Casteljau). A segment between two such corners keeps the part between both contacts. Its handles are set
+        in new_sp, pos maps a node_idx of sp to the first and last index of its nodes in new_sp. Nodes of sp are copied
+        before they are changed. Corners rounded along the tangents keep their handles. after maps the node_idx of a
+        previous node to its exact corner.
+        On a closed subpath, node 0 and the last node coincide. A handle of one is copied to the other, so they still do.
+    """
+    last = len(sp) - 1
+    closed = very_close(sp[0], sp[-1])
+
+    def ends(idx, first):
+      """ the nodes in new_sp at the start (first) or the end of the node idx of sp, that take a new handle. """
+      nodes = []
+      for i in ((idx, last - idx) if closed and idx in (0, last) else (idx,)):
+        if i in pos and (i not in replace or i in contacts):
+          j = pos[i][0 if first else 1]
+          if new_sp[j] is sp[i]:
+            new_sp[j] = [ sp[i][0][:], sp[i][1][:], sp[i][2][:] ]
+          nodes.append(new_sp[j])
+      return nodes
+
+    for idx in contacts:
+      sn, u, v, pa, pb, c = contacts[idx]
+      seg_a, seg_b, line_a, line_b = self.corner_segments(sn)
+      if not line_a:
+        before = contacts.get(sn.prev_idx)
+        b = bezier_segment(seg_a, before[2] if before else 0.0, u)
+        new_sp[pos[idx][0]][0] = b[2]
+        for node in ends(sn.prev_idx, False):
+          node[2] = b[1][:]
+      if not line_b:
+        nxt = after.get(idx)
+        b = bezier_segment(seg_b, v, nxt[1] if nxt else 1.0)
+        new_sp[pos[idx][1]][2] = b[1]
+        for node in ends(sn.next_idx, True):
+          node[0] = b[2][:]
+
+
+_path_token_re = re.compile(r'\s*,?\s*([MmZzLlHhVvCcSsQqTtAa]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+_path_flag_re = re.compile(r'\s*,?\s*([01])')
+_path_nargs = { 'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0 }
+
+
+def _path_commands(d):
+  """ tokenize svg path data. Yields (letter, [ args ]) with one command per set of arguments, as written (relative or absolute).
+      Implicit repetitions are yielded as separate commands, an implicit lineto after a moveto as 'L' or 'l'.
+  """
+  pos = 0
+  cmd = None
+  end = len(d.rstrip())
+  while pos < end:
+    m = _path_token_re.match(d, pos)
+    if m is None:
+      raise ValueError("bad path data at position %d: %r" % (pos, d[pos:pos+20]))
+    tok = m.group(1)
+    if tok.isalpha():
+      cmd = tok
+      pos = m.end()
+      if cmd in 'Zz':
+        yield cmd, []
+        continue
+    elif cmd is None or cmd in 'Zz':
+      raise ValueError("bad path data at position %d: number without a command" % pos)
+    args = []
+    for n in range(_path_nargs[cmd.upper()]):
+      if cmd in 'Aa' and n in (3, 4):
+        m = _path_flag_re.match(d, pos)       # arc flags need no separator: "a1 1 0 0110 10"
+      else:
+        m = _path_token_re.match(d, pos)
+      if m is None or m.group(1).isalpha():
+        raise ValueError("bad path data at position %d: %r needs %d numbers" % (pos, cmd, _path_nargs[cmd.upper()]))
+      args.append(float(m.group(1)))
+      pos = m.end()
+    yield cmd, args
+    if cmd in 'Mm':
+      cmd = 'l' if cmd == 'm' else 'L'
+
+
+def _arc_curves(x1, y1, rx, ry, phi, large_arc, sweep, x2, y2):
+  """ an svg elliptical arc from x1,y1 to x2,y2 as a list of cubic bezier segments (c1, c2, end), at most 90° each.
+      See https://www.w3.org/TR/SVG/implnote.html#ArcImplementationNotes
+  """
+  if x1 == x2 and y1 == y2:
+    return []
+  rx = abs(rx)
+  ry = abs(ry)
+  if rx == 0 or ry == 0:
+    return [ ([x1, y1], [x2, y2], [x2, y2]) ]
+  cos_phi = math.cos(math.radians(phi))
+  sin_phi = math.sin(math.radians(phi))
+  dx = (x1 - x2) / 2.
+  dy = (y1 - y2) / 2.
+  x1p = cos_phi * dx + sin_phi * dy
+  y1p = -sin_phi * dx + cos_phi * dy
+  lam = (x1p * x1p) / (rx * rx) + (y1p * y1p) / (ry * ry)
+  if lam > 1:                                 # radii too small, scale up until the arc just fits.
+    rx *= math.sqrt(lam)
+    ry *= math.sqrt(lam)
+  num = rx*rx*ry*ry - rx*rx*y1p*y1p - ry*ry*x1p*x1p
+  den = rx*rx*y1p*y1p + ry*ry*x1p*x1p
+  co = math.sqrt(max(0.0, num / den))
+  if bool(large_arc) == bool(sweep):
+    co = -co
+  cxp = co * rx * y1p / ry
+  cyp = -co * ry * x1p / rx
+  cx = cos_phi * cxp - sin_phi * cyp + (x1 + x2) / 2.
+  cy = sin_phi * cxp + cos_phi * cyp + (y1 + y2) / 2.
+  theta1 = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+  dtheta = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx) - theta1
+  if sweep and dtheta < 0:
+    dtheta += 2 * math.pi
+  elif not sweep and dtheta > 0:
+    dtheta -= 2 * math.pi
+
+  def point(a):
+    return [ cx + rx * math.cos(a) * cos_phi - ry * math.sin(a) * sin_phi,
+             cy + rx * math.cos(a) * sin_phi + ry * math.sin(a) * cos_phi ]
+
+  def tangent(a, f):
+    return [ f * (-rx * math.sin(a) * cos_phi - ry * math.cos(a) * sin_phi),
+             f * (-rx * math.sin(a) * sin_phi + ry * math.cos(a) * cos_phi) ]
+
+  segs = max(1, int(math.ceil(abs(dtheta) / (0.5 * math.pi) - 1e-9)))
+  delta = dtheta / segs
+  f = 4. / 3. * math.tan(delta / 4.)
+  curves = []
+  for i in range(segs):
+    a1 = theta1 + i * delta
+    a2 = a1 + delta
+    p1, t1 = point(a1), tangent(a1, f)
+    p2, t2 = point(a2), tangent(a2, f)
+    if i == segs - 1:
+      p2 = [ x2, y2 ]
+    curves.append(([ p1[0] + t1[0], p1[1] + t1[1] ], [ p2[0] - t2[0], p2[1] - t2[1] ], p2))
+  return curves
+
+
+def parse_path(d):
+  """ convert svg path data into a superpath, like inkex.paths.CubicSuperPath does.
+      All commands are supported. Lines get retracted handles, quadratic beziers and arcs are converted to cubic beziers.
+      z appends a copy of the first node of the subpath.
+  """
+  csp = []
+  sp = None
+  cur = [ 0.0, 0.0 ]          # current point
+  first = [ 0.0, 0.0 ]        # start of the current subpath
+  ctrl = None                 # last control point for S / T reflection, and the command letter that set it.
+  ctrl_cmd = None
+  for cmd, args in _path_commands(d):
+    up = cmd.upper()
+    if cmd != up and up not in 'HVZ':
+      # relative coordinates. All arguments are x,y pairs, except the radii, rotation and flags of A.
+      if up == 'A':
+        args[5] += cur[0]
+        args[6] += cur[1]
+      else:
+        for j in range(0, len(args), 2):
+          args[j] += cur[0]
+          args[j+1] += cur[1]
+
+    if up == 'M':
+      cur = args[0:2]
+      first = cur[:]
+      sp = [ [ cur[:], cur[:], cur[:] ] ]
+      csp.append(sp)
+      ctrl_cmd = up
+      continue
+    if up == 'Z':
+      if sp:
+        sp.append([ sp[0][0][:], sp[0][1][:], sp[0][2][:] ])
+      sp = None
+      cur = first[:]
+      ctrl_cmd = up
+      continue
+    if sp is None:
+      # drawing after z (or without m) starts a new subpath at the current point
+      sp = [ [ cur[:], cur[:], cur[:] ] ]
+      csp.append(sp)
+
+    if up in 'LHV':
+      if up == 'H':
+        end = [ args[0] + (cur[0] if cmd == 'h' else 0.0), cur[1] ]
+      elif up == 'V':
+        end = [ cur[0], args[0] + (cur[1] if cmd == 'v' else 0.0) ]
+      else:
+        end = args[0:2]
+      curves = [ (cur[:], end[:], end) ]
+    elif up == 'C':
+      curves = [ (args[0:2], args[2:4], args[4:6]) ]
+    elif up == 'S':
+      c1 = [ 2*cur[0] - ctrl[0], 2*cur[1] - ctrl[1] ] if ctrl_cmd in ('C', 'S') else cur[:]
+      curves = [ (c1, args[0:2], args[2:4]) ]
+    elif up in 'QT':
+      if up == 'Q':
+        q = args[0:2]
+        end = args[2:4]
+      else:
+        q = [ 2*cur[0] - ctrl[0], 2*cur[1] - ctrl[1] ] if ctrl_cmd in ('Q', 'T') else cur[:]
+        end = args[0:2]
+      curves = [ ([ cur[0] + 2./3. * (q[0] - cur[0]), cur[1] + 2./3. * (q[1] - cur[1]) ],
+                  [ end[0] + 2./3. * (q[0] - end[0]), end[1] + 2./3. * (q[1] - end[1]) ], end) ]
+    else:
+      curves = _arc_curves(cur[0], cur[1], *args)
+
+    for c1, c2, end in curves:
+      sp[-1][2] = c1[:]
+      sp.append([ c2[:], end[:], end[:] ])
+    if curves:
+      cur = curves[-1][2][:]
+    ctrl = q if up in 'QT' else (curves[-1][1] if curves else cur)
+    ctrl_cmd = up
+  return csp
+
+
+def _fmt(v):
+  """ shortest exact representation of a float, without a trailing .0 """
+  s = repr(float(v))
+  return s[:-2] if s.endswith('.0') else s
+
+
+def format_path(csp):
+  """ convert a superpath into svg path data with absolute coordinates.
+      Segments with retracted handles are written as lines, like inkex.paths.CubicSuperPath.to_path(curves_only=False).
+      A line back to the first node is written as z.
+  """
+  d = []
+  for sp in csp:
+    prev = None
+    for node in sp:
+      if prev is None:
+        d.append("M %s %s" % (_fmt(node[1][0]), _fmt(node[1][1])))
+      elif very_close_xy(prev[1], prev[2]) and very_close_xy(node[0], node[1]):
+        if node is sp[-1] and very_close_xy(node[1], sp[0][1]):
+          d.append("Z")
+        else:
+          d.append("L %s %s" % (_fmt(node[1][0]), _fmt(node[1][1])))
+      else:
+        d.append("C %s" % " ".join(_fmt(v) for v in (prev[2][0], prev[2][1], node[0][0], node[0][1], node[1][0], node[1][1])))
+      prev = node
+  return " ".join(d)
+
+
+def _fmt_fixed(n, precision):
+  """ the integer n / 10**precision, as short as possible: no trailing zeros, no leading zero before the point """
+  s = str(abs(n))
+  if precision:
+    s = s.rjust(precision + 1, '0')
+    s = (s[:-precision] + '.' + s[-precision:]).rstrip('0').rstrip('.')
+    if s.startswith('0.'):
+      s = s[1:]
+  return '-' + s if n < 0 else s
+
+
+def format_path_compact(csp, precision=4):
+  """ convert a superpath into short svg path data, with precision decimals.
+      Segments whose handles are retracted at that precision are written as lines, h or v where they are level, else l.
+      Each segment is written relative or absolute, whichever is shorter, and a repeated command letter is left out.
+      A line back to the first node is written as z, like format_path().
+
+      All coordinates are rounded to the grid of precision first, relative coordinates are differences on that grid.
+      So they do not add up rounding errors, each node is within half a unit of the last decimal, as in absolute form.
+      Each subpath starts with an absolute moveto, so it can stand alone, e.g. in LazySuperPath.path_data().
+  """
+  scale = 10.0 ** precision
+  grid = lambda p: (int(math.floor(p[0] * scale + 0.5)), int(math.floor(p[1] * scale + 0.5)))
+  num = lambda n: _fmt_fixed(n, precision)
+  out = []
+  cmd = None
+  for sp in csp:
+    start = cur = grid(sp[0][1])
+    out.append("M" + num(cur[0]) + " " + num(cur[1]))
+    cmd = 'M'
+    prev_out = grid(sp[0][2])
+    for i in range(1, len(sp)):
+      h1 = prev_out
+      h2, pt, prev_out = grid(sp[i][0]), grid(sp[i][1]), grid(sp[i][2])
+      if h1 == cur and h2 == pt:
+        if i == len(sp) - 1 and pt == start:
+          out.append("z")
+          cmd = 'z'
+          break
+        if pt[1] == cur[1]:
+          forms = (('H', [ pt[0] ]), ('h', [ pt[0] - cur[0] ]))
+        elif pt[0] == cur[0]:
+          forms = (('V', [ pt[1] ]), ('v', [ pt[1] - cur[1] ]))
+        else:
+          forms = (('L', pt), ('l', (pt[0] - cur[0], pt[1] - cur[1])))
+      else:
+        forms = (('C', h1 + h2 + pt),
+                 ('c', (h1[0] - cur[0], h1[1] - cur[1], h2[0] - cur[0], h2[1] - cur[1], pt[0] - cur[0], pt[1] - cur[1])))
+      best = None
+      for letter, args in forms:
+        text = ""
+        for n in args:
+          s = num(n)
+          text += s if not text or s[0] == '-' else " " + s
+        if letter != cmd:
+          text = letter + text
+        elif text[0] != '-':
+          text = " " + text
+        if best is None or len(text) < len(best):
+          best, best_cmd = text, letter
+      out.append(best)
+      cmd = best_cmd
+      cur = pt
+  return "".join(out)
+
+
+_path_moveto_re = re.compile(r'[Mm]')
+_path_after_close_re = re.compile(r'[Zz]\s*(?=[^\sMm])')
+
+
+def split_path_d(d):
+  """ split svg path data at each moveto, into the text of each subpath, as written. Joined together they give d again.
+      Returns None if the texts would not line up with the subpaths of the parsed path: when d does not start with a moveto,
+      or when drawing continues after a z without a moveto (inkex and parse_path() disagree there).
+  """
+  starts = [ m.start() for m in _path_moveto_re.finditer(d) ]
+  if not starts or d[:starts[0]].strip() or _path_after_close_re.search(d):
+    return None
+  starts[0] = 0
+  return [ d[a:b] for a, b in zip(starts, starts[1:] + [ len(d) ]) ]
+
+
+def _absolute_moveto(text, point):
+  """ the subpath text with its relative moveto replaced by an absolute moveto to point. Coordinate pairs that follow
+      the moveto are relative linetos, they get an explicit l.
+  """
+  m = _path_token_re.match(text)
+  pos = m.end()
+  for n in range(2):
+    pos = _path_token_re.match(text, pos).end()
+  rest = text[pos:]
+  m = _path_token_re.match(rest)
+  if m and not m.group(1).isalpha():
+    rest = " l " + rest.lstrip(" \t\r\n,")
+  return "M %s %s%s" % (_fmt(point[0]), _fmt(point[1]), rest)
+
+
+class LazySuperPath(object):
+  """ A superpath that parses each subpath only when it is used, so that a selection in a few subpaths of a large path
+      costs only these few. parts is the path data split into subpaths, see split_path_d(). parse_subpath(text) turns the
+      text of one subpath, starting with an absolute moveto, into a subpath. Default is parse_path(), the extension
+      passes the inkex parser.
+
+      It is used like a list of subpaths: len(), [i] parses subpath i on first use, [i] = sp replaces it.
+      path_data() writes the path data back. Only the replaced subpaths are formatted, all others keep their text.
+      copy() gives another view of the same path, which shares the parsed subpaths, e.g. to round it with another radius.
+      If all of the path is parsed already, pass its subpaths as parsed. Then only the writing back is lazy.
+  """
+  __slots__ = ('parts', 'parsed', 'replaced', 'parse_subpath', 'starts')
+
+  def __init__(self, parts, parse_subpath=None, parsed=None):
+    self.parts = parts
+    self.parsed = list(parsed or [ None ] * len(parts))  # the original subpaths, as far as they are parsed. Shared with copies.
+    self.replaced = {}                        # subpath_idx -> new subpath
+    self.parse_subpath = parse_subpath or (lambda text: parse_path(text)[0])
+    self.starts = None                        # absolute start point of each subpath, see start()
+
+  def __len__(self):
+    return len(self.parts)
+
+  def __getitem__(self, i):
+    sp = self.replaced.get(i)
+    return self.original(i) if sp is None else sp
+
+  def __setitem__(self, i, sp):
+    if sp is self.parsed[i]:
+      self.replaced.pop(i, None)
+    else:
+      self.replaced[i] = sp
+
+  def __iter__(self):
+    for i in range(len(self.parts)):
+      yield self[i]
+
+  def copy(self):
+    other = LazySuperPath(self.parts, self.parse_subpath)
+    other.parsed = self.parsed
+    other.replaced = dict(self.replaced)
+    other.starts = self.starts
+    return other
+
+  def original(self, i):
+    """ subpath i as it is in the path data, parsed on first use """
+    sp = self.parsed[i]
+    if sp is None:
+      text = self.parts[i].lstrip()
+      if i and text.startswith('m'):
+        text = _absolute_moveto(text, self.start(i))
+      sp = self.parsed[i] = self.parse_subpath(text)
+    return sp
+
+  def parsed_subpaths(self):
+    """ the original subpaths that are parsed so far """
+    return [ sp for sp in self.parsed if sp is not None ]
+
+  def start(self, i):
+    """ the absolute start point of subpath i. A relative moveto starts where the previous subpath ends: after a z at the
+        start of that subpath, else at its last node. For that an open subpath before a relative moveto is parsed, so that
+        the point is exactly the one the parser has when it parses all of the path. All starts are found in one pass.
+    """
+    if self.parsed[i] is not None:
+      return tuple(self.parsed[i][0][1])
+    if self.starts is None:
+      self.starts = []
+      end = (0.0, 0.0)
+      for j, text in enumerate(self.parts):
+        cmd, args = next(_path_commands(text))
+        start = (end[0] + args[0], end[1] + args[1]) if cmd == 'm' else (args[0], args[1])
+        self.starts.append(start)
+        if j + 1 < len(self.parts) and self.parts[j + 1].lstrip().startswith('m'):
+          end = start if text.rstrip()[-1] in 'Zz' else tuple(self.original(j)[-1][1])
+    return self.starts[i]
+
+  def path_data(self, format_subpath=None):
+    """ the path data, with format_subpath(subpath) for the replaced subpaths. Default is format_path().
+        A relative moveto after a replaced subpath becomes absolute, as that subpath may end elsewhere now.
+        Without replaced subpaths, this is the original path data.
+    """
+    if format_subpath is None:
+      format_subpath = lambda sp: format_path([ sp ])
+    d = []
+    changed = False
+    for i in range(len(self.parts)):
+      if i in self.replaced:
+        text = format_subpath(self.replaced[i])
+        if i + 1 < len(self.parts):
+          text += " "
+        changed = True
+      else:
+        text = self.parts[i]
+        if changed and text.lstrip().startswith('m'):
+          text = _absolute_moveto(text.lstrip(), self.start(i))
+        changed = False
+      d.append(text)
+    return "".join(d)
+
+
+def round_down(v, digits=4):
+  """ v rounded down to digits significant digits. For printing a radius that is meant to fit:
+      "%g" % round_down(v) never ends up above v.
+  """
+  if not 0.0 < v < float('inf'):
+    return v
+  e = 10.0 ** (math.floor(math.log10(v)) - digits + 1)
+  n = math.floor(v / e + 1e-6)
+  while float("%.*g" % (digits, n * e)) > v:
+    n -= 1
+  return float("%.*g" % (digits, n * e))
+
+
+def parse_radii(text):
+  """ a list of radii from text like "0.5,1,2" or "0.5:3:0.5" (start:stop:step, stop included), or a mix of both.
+      Raises ValueError on anything else.
+  """
+  radii = []
+  for part in text.split(','):
+    part = part.strip()
+    if not part:
+      continue
+    if ':' in part:
+      r = [ float(v) for v in part.split(':') ]
+      if len(r) != 3 or r[2] <= 0:
+        raise ValueError("radius range must be start:stop:step, with a positive step: %r" % part)
+      n = int(math.floor((r[1] - r[0]) / r[2] + 1e-9))
+      radii.extend(round(r[0] + i * r[2], 10) for i in range(n + 1))
+    else:
+      radii.append(float(part))
+  if not radii:
+    raise ValueError("no radius in %r" % text)
+  return radii
+
+
+def round_path_d(d, radius, method='arc', nodes=None, auto_fit=False, precision=None, tolerance=None, exact=False):
+  """ round corners of the svg path data d. Returns the new path data and a dict with statistics.
+
+      - radius:   radius of the arcs, in the units of d.
+      - method:   'arc' (default) or 'line'.
+      - nodes:    a list of (subpath_idx, node_idx) tuples, counting as inkscape does in --selected-nodes,
+                  or a dict subpath_idx -> node indices (ascending, no duplicates).
+                  None selects all corners, as the extension does when a path is selected without selecting nodes.
+                  Raises ValueError if a subpath or node does not exist in d, see check_nodes().
+      - auto_fit: round corners that have no room for radius with the largest radius that fits, instead of skipping them.
+                  stats['clamped_nodes'] lists them as (subpath_idx, node_idx, radius).
+      - precision: write the new subpaths with this many decimals, in the short form of format_path_compact().
+                  None (default) writes them with all digits and absolute coordinates, see format_path().
+      - tolerance: the largest deviation of the arcs from a true circle, in the units of d. Each arc gets as few bezier
+                  segments as that allows. None (default): one segment up to a quarter circle, two above.
+      - exact:    fit the arcs to curved segments, which are cut where the arc touches them and keep their shape.
+                  Default is to trim along the tangents, which changes the shape of curved segments a little.
+                  stats['exact'] counts the fitted corners, stats['exact_failed'] those without a fit, rounded along the tangents.
+
+      Neighbouring corners share the segment between them, a corner without rounded neighbours may use up almost all of it.
+      Subpaths without a rounded corner keep their text as it is in d, so if no corner is rounded, d is returned unchanged.
+  """
+  return round_path_d_sweep(d, [ radius ], method, nodes, auto_fit, precision, tolerance, exact)[0]
+
+
+def round_path_d_sweep(d, radii, method='arc', nodes=None, auto_fit=False, precision=None, tolerance=None, exact=False):
+  """ round_path_d() for each of the radii. Returns a list of (d, stats), in the order of radii.
+      d is parsed only once (only the subpaths with selected nodes, see LazySuperPath), and the radius independent corner data is computed only once. Each variant
+      starts from the original path, the variants do not build on each other.
+      stats['seconds'] of the first variant includes the parsing.
+  """
+  t0 = time.time()
+  parts = split_path_d(d)
+  csp = LazySuperPath(parts) if parts else parse_path(d)
+  if nodes is None:
+    nodes = roundable_subpaths(csp)
+  else:
+    check_nodes(csp, nodes)
+  selected = sum(len(idxs) for idxs in nodes.values()) if hasattr(nodes, 'items') else len(nodes)
+  rounder = CornerRounder(None, method, auto_fit=auto_fit, tolerance=tolerance, exact=exact)
+  tables = rounder.corner_tables(csp, nodes)
+  if precision is None:
+    format_subpath, format_all = None, format_path
+  else:
+    format_subpath = lambda sp: format_path_compact([ sp ], precision)
+    format_all = lambda csp: format_path_compact(csp, precision)
+  results = []
+  for radius in radii:
+    rounder.radius = math.fabs(radius)
+    rounder.stats = stats = rounder.new_stats()
+    rounder.clamped = stats['clamped_nodes'] = []
+    variant = rounder.round_superpath(csp.copy() if parts else list(csp), nodes, tables)
+    stats['radius'] = rounder.radius
+    stats['subpaths'] = len(csp)
+    stats['selected'] = selected
+    results.append(((variant.path_data(format_subpath) if parts else format_all(variant)) if stats['rounded'] else d, stats))
+    t = time.time()
+    stats['seconds'] = t - t0
+    t0 = t
+  return results
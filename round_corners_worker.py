@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# coding=utf-8
+#
+# Copyright (C) 2020 Juergen Weigert, jnweiger@gmail.com
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+"""
+Round Corners, resident worker
+
+Inkscape starts a new interpreter for every Apply and every live preview refresh. For small selections, most of that time
+is spent starting python and importing inkex. A resident worker does these once, and then serves many runs:
+
+  env PYTHONPATH=/usr/share/inkscape/extensions python3 round_corners_worker.py &
+
+round_corners.py calls forward() before it imports inkex. If a worker is listening on the socket, the document, the
+options and the working directory are sent there, and the worker's output is passed on to inkscape.
+If no worker is running (or anything goes wrong on the way), forward() returns None and round_corners.py does the work itself.
+
+The socket is $ROUND_CORNERS_SOCKET, or round_corners-UID.sock in $XDG_RUNTIME_DIR. Without $XDG_RUNTIME_DIR,
+it is worker.sock in /tmp/round_corners-UID, a directory that only we may use (mode 0700).
+Set ROUND_CORNERS_SOCKET to an empty string to never use a worker.
+A socket that is not owned by us is never connected to.
+
+Other commands:
+  round_corners_worker.py --status      # is a worker running?
+  round_corners_worker.py --stop        # stop it.
+
+The worker runs one request at a time. It exits after --idle-timeout seconds without requests,
+and restarts itself when round_corners.py or round_corners_geom.py change on disk, so that it never runs stale code.
+
+forward() is python2 compatible, the worker itself needs python3 and inkex 1.x.
+"""
+
+# python2 compatibility:
+from __future__ import print_function
+
+import os, sys, json, stat, socket
+
+client_timeout = 300.0          # seconds to wait for the worker to finish a run. A live preview can always be cancelled.
+connect_timeout = 0.5
+
+
+def socket_path():
+  """ where the worker listens. None, if workers are disabled or not possible here. """
+  path = os.environ.get('ROUND_CORNERS_SOCKET')
+  if path is not None:
+    return path or None
+  if not hasattr(socket, 'AF_UNIX') or not hasattr(os, 'getuid'):
+    return None                 # windows
+  if os.environ.get('XDG_RUNTIME_DIR'):
+    return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'round_corners-%d.sock' % os.getuid())
+  return os.path.join(fallback_dir(), 'worker.sock')
+
+
+def fallback_dir():
+  """ private directory for the socket, where there is no $XDG_RUNTIME_DIR. """
+  return '/tmp/round_corners-%d' % os.getuid()
+
+
+def make_private_dir(path):
+  """ create the directory path with mode 0700, or check that an existing one is ours and private.
+      Raises OSError otherwise: anybody who could write there could replace the socket.
+  """
+  try:
+    os.mkdir(path, 0o700)
+  except OSError:
+    if not os.path.isdir(path):
+      raise
+  st = os.lstat(path)
+  if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+    raise OSError("%s is not a private directory of ours" % path)
+
+
+def own_socket(path):
+  """ True if path is a Unix socket that belongs to us. Others could have put anything on a predictable path. """
+  try:
+    st = os.stat(path)
+  except OSError:
+    return False
+  return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def inkex_location():
+  """ the file that 'import inkex' would load here, without importing it. None if there is no inkex. """
+  try:
+    import importlib.util
+  except ImportError:           # python2
+    import imp
+    try:
+      f, pathname, desc = imp.find_module('inkex')
+    except ImportError:
+      return None
+    if f: f.close()
+    return pathname
+  spec = importlib.util.find_spec('inkex')
+  return spec and spec.origin
+
+
+def request(header, payload=b'', path=None, timeout=client_timeout):
+  """ send one request to the worker. Returns (response header dict, response payload bytes).
+      Raises socket.error (OSError) or ValueError if there is no worker, or it does not answer properly.
+  """
+  path = path or socket_path()
+  if not path:
+    raise ValueError("no worker socket")
+  if os.path.lexists(path) and not own_socket(path):
+    raise ValueError("%s is not our socket" % path)
+  header = dict(header, length=len(payload))
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.settimeout(connect_timeout)
+    sock.connect(path)
+    sock.settimeout(timeout)
+    sock.sendall(json.dumps(header).encode('utf-8') + b'\n' + payload)
+    sock.shutdown(socket.SHUT_WR)
+    chunks = []
+    while True:
+      chunk = sock.recv(65536)
+      if not chunk:
+        break
+      chunks.append(chunk)
+  finally:
+    sock.close()
+  data = b''.join(chunks)
+  line, sep, payload = data.partition(b'\n')
+  if not sep:
+    raise ValueError("incomplete response from worker")
+  return json.loads(line.decode('utf-8')), payload
+
+
+def forward(args):
+  """ run the extension with the command line args in a worker, if one is running.
+      Returns the exit status, or None if the caller should do the work itself.
+  """
+  path = socket_path()
+  if not path or not own_socket(path):
+    return None
+  # inkscape passes the document as a file name at the end. Without one, we would have to consume stdin,
+  # and could not fall back afterwards.
+  if not args or args[-1].startswith('-') or not os.path.isfile(args[-1]):
+    return None
+  try:
+    with open(args[-1], 'rb') as f:
+      document = f.read()
+    header, output = request({ 'cmd': 'run', 'args': args[:-1], 'input': os.path.abspath(args[-1]), 'cwd': os.getcwd(),
+                               'inkex': inkex_location() }, document, path)
+  except (socket.error, ValueError, IOError, OSError):
+    return None
+  if header.get('status') is None:
+    return None                 # the worker refused, e.g. because it is restarting, or it uses another inkex.
+  if header.get('stderr'):
+    sys.stderr.write(header['stderr'])
+  out = getattr(sys.stdout, 'buffer', sys.stdout)
+  out.write(output)
+  out.flush()
+  return header['status']
+
+
+def source_mtimes():
+  """ modification times of the extension code loaded by the worker """
+  import round_corners, round_corners_geom
+  return dict((m.__file__, os.path.getmtime(m.__file__)) for m in (round_corners, round_corners_geom))
+
+
+def run_extension(args, document, cwd, input_path=None):
+  """ run RoundedCorners on the document (bytes), as round_corners.py would with args. Returns (status, stderr, output) """
+  import io
+  import round_corners
+
+  class WorkerRoundedCorners(round_corners.RoundedCorners):
+    """ RoundedCorners with the document from memory instead of a file """
+    def load_raw(self):
+      self.document = self.load(io.BytesIO(document))
+
+  ext = WorkerRoundedCorners()
+  output = io.BytesIO()
+  stderr = sys.stderr
+  sys.stderr = messages = io.StringIO()
+  old_cwd = os.getcwd()
+  old_document_path = os.environ.get('DOCUMENT_PATH')
+  status = 0
+  try:
+    os.chdir(cwd)               # relative paths in the options, e.g. --timing, are relative to the client.
+    if input_path:
+      os.environ['DOCUMENT_PATH'] = input_path
+    ext.run(args, output=output)
+  except SystemExit as e:       # inkex exits on AbortExtension
+    status = e.code if isinstance(e.code, int) else 1
+  except Exception:
+    import traceback
+    traceback.print_exc()
+    status = 1
+  finally:
+    sys.stderr = stderr
+    os.chdir(old_cwd)
+    if old_document_path is None:
+      os.environ.pop('DOCUMENT_PATH', None)
+    else:
+      os.environ['DOCUMENT_PATH'] = old_document_path
+  return status, messages.getvalue(), output.getvalue()
+
+
+def serve(path, idle_timeout=3600):
+  """ listen on path and run requests, one at a time. Returns True if the worker should restart itself. """
+  import socketserver, time
+
+  import inkex
+
+  mtimes = source_mtimes()
+  own_inkex = os.path.realpath(inkex.__file__)
+  state = { 'running': True, 'restart': False, 'runs': 0, 'started': time.time() }
+
+  class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+      header = json.loads(self.rfile.readline().decode('utf-8'))
+      payload = self.rfile.read(header.get('length', 0))
+      cmd = header.get('cmd')
+      if cmd == 'run':
+        if not header.get('inkex') or os.path.realpath(header['inkex']) != own_inkex:
+          # e.g. inkscape 0.92 with its own inkex. The client does the work itself, with the inkex it would use anyway.
+          response, output = { 'status': None, 'error': 'inkex differs' }, b''
+        elif source_mtimes() != mtimes:
+          # stale code. The client falls back to running in process, we come back fresh.
+          response, output = { 'status': None, 'error': 'restarting' }, b''
+          state['running'] = False
+          state['restart'] = True
+        else:
+          status, stderr, output = run_extension(header['args'], payload, header['cwd'], header.get('input'))
+          response = { 'status': status, 'stderr': stderr }
+          state['runs'] += 1
+      elif cmd == 'stop':
+        response, output = { 'status': 0 }, b''
+        state['running'] = False
+      else:
+        response, output = { 'status': 0, 'pid': os.getpid(), 'runs': state['runs'],
+                             'uptime': time.time() - state['started'] }, b''
+      self.wfile.write(json.dumps(response).encode('utf-8') + b'\n' + output)
+
+  class Server(socketserver.UnixStreamServer):
+    timeout = idle_timeout
+    def handle_timeout(self):
+      state['running'] = False
+
+  old_umask = os.umask(0o077)   # only we may talk to the worker.
+  try:
+    server = Server(path, Handler)
+  finally:
+    os.umask(old_umask)
+  try:
+    while state['running']:
+      server.handle_request()
+  finally:
+    server.server_close()
+    os.unlink(path)
+  return state['restart']
+
+
+def main(argv=None):
+  import argparse
+
+  ap = argparse.ArgumentParser(description="Resident worker for the round corners extension.")
+  ap.add_argument('--socket', default=socket_path(), help="Unix socket to listen on. Default: %(default)s")
+  ap.add_argument('--idle-timeout', type=float, default=3600, help="exit after this many seconds without requests. Default: 3600")
+  ap.add_argument('--status', action='store_true', help="check whether a worker is running")
+  ap.add_argument('--stop', action='store_true', help="stop a running worker")
+  args = ap.parse_args(argv)
+  if not args.socket:
+    print("No socket. Workers are disabled by ROUND_CORNERS_SOCKET, or not supported here.", file=sys.stderr)
+    return 2
+
+  if os.path.lexists(args.socket) and not own_socket(args.socket):
+    print("%s exists, but is not a socket of ours." % args.socket, file=sys.stderr)
+    return 2
+  if args.status or args.stop or os.path.exists(args.socket):
+    try:
+      header, payload = request({ 'cmd': 'stop' if args.stop else 'status' }, path=args.socket, timeout=10)
+    except (socket.error, ValueError) as e:
+      if args.status or args.stop:
+        print("No worker on %s: %s" % (args.socket, e))
+        return 1
+      os.unlink(args.socket)    # stale socket of a worker that died.
+    else:
+      if args.stop:
+        print("Worker on %s stopped." % args.socket)
+      else:
+        print("Worker on %s: pid %d, %d runs, up %.0f sec" % (args.socket, header['pid'], header['runs'], header['uptime']))
+        if not args.status:
+          return 1              # already running
+      return 0
+
+  if os.path.dirname(args.socket) == fallback_dir():
+    try:
+      make_private_dir(fallback_dir())
+    except OSError as e:
+      print("Cannot use %s: %s" % (fallback_dir(), e), file=sys.stderr)
+      return 2
+  sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+  if serve(args.socket, args.idle_timeout):
+    os.execv(sys.executable, [ sys.executable, os.path.abspath(__file__) ] + (argv if argv is not None else sys.argv[1:]))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
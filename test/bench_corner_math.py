@@ -0,0 +1,210 @@
+#! /usr/bin/python3
+#
+# Precision and speed of the trig free corner math in corner_geometry() and fillet_kernel(), against the previous
+# implementation with acos() of the dot product and tan() of the half angle, which is kept here as acos_kernel_*().
+#
+# - agreement: on random corners, both must produce the same masks, and points within 1e-9 (relative to the coordinates).
+#   acos() loses digits close to 0° and 180°, so points are only compared where the trim is between 1e-3 and 1e3 times
+#   the radius. The conditioning test shows which one is right beyond that.
+# - conditioning: corners close to 0° (folded back) and close to 180° (almost straight). The trim of each corner is compared
+#   against an exact evaluation of the same float inputs with 60 digits (decimal module).
+# - throughput: geometry and fillet of all corners, with the scalar code and with numpy (if available).
+#
+# Usage:
+#  python3 test/bench_corner_math.py [corners]
+#
+
+from __future__ import print_function
+
+import os, sys, math, time, random, decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import round_corners_geom
+from round_corners_geom import arc_bezier_handles
+from bench_fillet_kernel import random_corners
+
+points = ('trim', 'tpx', 'tpy', 'tnx', 'tny', 'cx', 'cy', 'mx', 'my', 'p2x', 'p2y', 'p3x', 'p3y', 'p5x', 'p5y', 'p6x', 'p6y')
+
+
+def acos_kernel_py(x, y, ax, ay, bx, by, a_avail, b_avail, radius, eps=0.00001):
+  """ the previous corner_geometry_py() and fillet_kernel_py() in one. Returns a dict of lists. """
+  nan = float('nan')
+  k = dict((key, []) for key in points + ('degenerate', 'straight', 'too_short'))
+  for i in range(len(x)):
+    r = dict((key, nan) for key in points)
+    a_len = math.sqrt(ax[i]*ax[i] + ay[i]*ay[i])
+    b_len = math.sqrt(bx[i]*bx[i] + by[i]*by[i])
+    try:
+      alpha = math.acos( (ax[i]*bx[i]+ay[i]*by[i]) / (a_len * b_len) )
+    except:
+      alpha = nan
+    r['degenerate'] = not alpha >= eps
+    r['straight'] = not r['degenerate'] and abs(alpha - math.pi) < eps
+    r['too_short'] = False
+    if not (r['degenerate'] or r['straight']):
+      trim = radius / math.tan(0.5 * alpha)
+      r['trim'] = trim
+      r['too_short'] = trim > min(a_avail[i], b_avail[i])
+      p1 = [ x[i] + ax[i] * trim / a_len, y[i] + ay[i] * trim / a_len ]
+      p7 = [ x[i] + bx[i] * trim / b_len, y[i] + by[i] * trim / b_len ]
+      r['tpx'], r['tpy'] = p1
+      r['tnx'], r['tny'] = p7
+      c_m_x = (p1[0] - x[i]) + (p7[0] - x[i])
+      c_m_y = (p1[1] - y[i]) + (p7[1] - y[i])
+      l = math.sqrt( c_m_x*c_m_x + c_m_y*c_m_y )
+      cdist = math.sqrt( radius*radius + trim*trim )
+      c = [ x[i] + cdist * c_m_x / l, y[i] + cdist * c_m_y / l ]
+      m = [ x[i] + (cdist-radius) * c_m_x / l, y[i] + (cdist-radius) * c_m_y / l ]
+      r['cx'], r['cy'] = c
+      r['mx'], r['my'] = m
+      if alpha >= 0.5*math.pi:
+        p2, p6 = arc_bezier_handles(p1, p7, c)
+      else:
+        p2, p3 = arc_bezier_handles(p1, m, c)
+        p5, p6 = arc_bezier_handles(m, p7, c)
+        r['p3x'], r['p3y'] = p3
+        r['p5x'], r['p5y'] = p5
+      r['p2x'], r['p2y'] = p2
+      r['p6x'], r['p6y'] = p6
+    for key in k:
+      k[key].append(r[key])
+  return k
+
+
+def acos_kernel_numpy(x, y, ax, ay, bx, by, a_avail, b_avail, radius, eps=0.00001):
+  """ the previous corner_geometry_numpy() and fillet_kernel_numpy() in one. Returns a dict of numpy arrays. """
+  numpy = round_corners_geom.numpy
+  def handles(x1, y1, x4, y4, xc, yc):
+    ax, ay, bx, by = x1 - xc, y1 - yc, x4 - xc, y4 - yc
+    q1 = ax * ax + ay * ay
+    q2 = q1 + ax * bx + ay * by
+    k2 = 4./3. * (numpy.sqrt(2 * q1 * q2) - q2) / (ax * by - ay * bx)
+    return xc + ax - k2 * ay, yc + ay + k2 * ax, xc + bx + k2 * by, yc + by - k2 * bx
+  x, y, ax, ay, bx, by = [ numpy.asarray(v, dtype=float) for v in (x, y, ax, ay, bx, by) ]
+  with numpy.errstate(all='ignore'):
+    a_len = numpy.sqrt(ax*ax + ay*ay)
+    b_len = numpy.sqrt(bx*bx + by*by)
+    alpha = numpy.arccos( (ax*bx + ay*by) / (a_len * b_len) )
+    degenerate = ~(alpha >= eps)
+    straight = ~degenerate & (numpy.abs(alpha - math.pi) < eps)
+    ok = ~degenerate & ~straight
+    trim = numpy.where(ok, radius / numpy.tan(0.5 * alpha), numpy.nan)
+    too_short = ok & (trim > numpy.minimum(a_avail, b_avail))
+    tpx, tpy = x + ax * trim / a_len, y + ay * trim / a_len
+    tnx, tny = x + bx * trim / b_len, y + by * trim / b_len
+    c_m_x = (tpx - x) + (tnx - x)
+    c_m_y = (tpy - y) + (tny - y)
+    l = numpy.sqrt( c_m_x*c_m_x + c_m_y*c_m_y )
+    cdist = numpy.sqrt( radius*radius + trim*trim )
+    cx, cy = x + cdist * c_m_x / l, y + cdist * c_m_y / l
+    mx, my = x + (cdist-radius) * c_m_x / l, y + (cdist-radius) * c_m_y / l
+    one = alpha >= 0.5*math.pi
+    p2x, p2y, p3x, p3y = handles(tpx, tpy, numpy.where(one, tnx, mx), numpy.where(one, tny, my), cx, cy)
+    p5x, p5y, p6x, p6y = handles(mx, my, tnx, tny, cx, cy)
+    p6x, p6y = numpy.where(one, p3x, p6x), numpy.where(one, p3y, p6y)
+    p3x, p3y = numpy.where(one, numpy.nan, p3x), numpy.where(one, numpy.nan, p3y)
+    p5x, p5y = numpy.where(one, numpy.nan, p5x), numpy.where(one, numpy.nan, p5y)
+  return { 'trim': trim, 'tpx': tpx, 'tpy': tpy, 'tnx': tnx, 'tny': tny, 'cx': cx, 'cy': cy, 'mx': mx, 'my': my,
+           'p2x': p2x, 'p2y': p2y, 'p3x': p3x, 'p3y': p3y, 'p5x': p5x, 'p5y': p5y, 'p6x': p6x, 'p6y': p6y,
+           'degenerate': degenerate, 'straight': straight, 'too_short': too_short }
+
+
+def half_angle_kernel(kernel_mod, x, y, ax, ay, bx, by, a_avail, b_avail, radius):
+  """ the current corner_geometry_*() and fillet_kernel_*(), kernel_mod is 'py' or 'numpy' """
+  g = getattr(round_corners_geom, 'corner_geometry_' + kernel_mod)(x, y, ax, ay, bx, by)
+  return getattr(round_corners_geom, 'fillet_kernel_' + kernel_mod)(g, a_avail, b_avail, radius)
+
+
+def compare(ka, kb, radius, tol=1e-9):
+  """ largest relative deviation between the acos/tan result ka and the half angle result kb, and the number of corners
+      where acos() failed on straight corners: the cosine rounds to just below -1, and they count as degenerated.
+      All other masks must be identical. Points are compared on well conditioned corners only.
+  """
+  worst = 0.0
+  misread = [ bool(ka['degenerate'][i]) and bool(kb['straight'][i]) for i in range(len(ka['trim'])) ]
+  for key in ('degenerate', 'straight', 'too_short'):
+    for i in range(len(misread)):
+      if not misread[i] and bool(ka[key][i]) != bool(kb[key][i]):
+        raise ValueError("mask %s differs at corner %d: %r != %r" % (key, i, ka[key][i], kb[key][i]))
+  ill = [ not 1e-3 < t / radius < 1e3 for t in list(kb['trim']) ]
+  for key in points:
+    a, b = list(ka[key]), list(kb[key])
+    for i in range(len(a)):
+      if ill[i]:
+        continue
+      if math.isnan(a[i]) or math.isnan(b[i]):
+        if not (math.isnan(a[i]) and math.isnan(b[i])):
+          raise ValueError("%s differs at corner %d: %r != %r" % (key, i, a[i], b[i]))
+        continue
+      err = abs(a[i] - b[i]) / max(1.0, abs(a[i]))
+      worst = max(worst, err)
+      if err > tol:
+        raise ValueError("%s differs at corner %d: %r != %r" % (key, i, a[i], b[i]))
+  return worst, sum(misread)
+
+
+def exact_trim_per_radius(ax, ay, bx, by):
+  """ cot(alpha/2) of the float tangent vectors, with 60 digits """
+  D = decimal.Decimal
+  ax, ay, bx, by = D(ax), D(ay), D(bx), D(by)
+  a_len = (ax*ax + ay*ay).sqrt()
+  b_len = (bx*bx + by*by).sqrt()
+  sx, sy = ax / a_len + bx / b_len, ay / a_len + by / b_len
+  dx, dy = ax / a_len - bx / b_len, ay / a_len - by / b_len
+  return float((sx*sx + sy*sy).sqrt() / (dx*dx + dy*dy).sqrt())
+
+
+def conditioning(radius=1.0, samples=200, seed=7):
+  """ largest relative error of the trim of both kernels for corners close to 0° and 180° """
+  rnd = random.Random(seed)
+  print("%-24s %14s %14s" % ('relative error of trim', 'acos/tan', 'half angle'))
+  for name, angle in (('alpha = 1e-2', 1e-2), ('alpha = 1e-4', 1e-4), ('alpha = 90°', 0.5*math.pi),
+                      ('alpha = 180° - 1e-2', math.pi - 1e-2), ('alpha = 180° - 1e-3', math.pi - 1e-3),
+                      ('alpha = 180° - 1e-4', math.pi - 1e-4)):
+    x, y, ax, ay, bx, by = [], [], [], [], [], []
+    for i in range(samples):
+      phi = rnd.uniform(0, 2*math.pi)
+      la, lb = rnd.uniform(1, 50), rnd.uniform(1, 50)
+      x.append(0.0); y.append(0.0)
+      ax.append(la * math.cos(phi)); ay.append(la * math.sin(phi))
+      bx.append(lb * math.cos(phi + angle)); by.append(lb * math.sin(phi + angle))
+    big = [ 1e99 ] * samples
+    errs = []
+    for k in (acos_kernel_py(x, y, ax, ay, bx, by, big, big, radius), half_angle_kernel('py', x, y, ax, ay, bx, by, big, big, radius)):
+      worst = 0.0
+      for i in range(samples):
+        exact = radius * exact_trim_per_radius(ax[i], ay[i], bx[i], by[i])
+        worst = max(worst, abs(k['trim'][i] - exact) / exact)
+      errs.append(worst)
+    print("%-24s %14.2e %14.2e" % ((name,) + tuple(errs)))
+
+
+def timed(func, *args):
+  t0 = time.time()
+  k = func(*args)
+  return time.time() - t0, k
+
+
+if __name__ == '__main__':
+  decimal.getcontext().prec = 60
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+  radius = 2.0
+  args = random_corners(count) + (radius,)
+
+  t_old, k_old = timed(acos_kernel_py, *args)
+  t_new, k_new = timed(half_angle_kernel, 'py', *args)
+  worst, misread = compare(k_old, k_new, radius)
+  print("%d corners, %d degenerate, %d straight, %d too short" %
+        (count, sum(k_new['degenerate']), sum(k_new['straight']), sum(k_new['too_short'])))
+  print("largest relative deviation from acos/tan: %g" % worst)
+  print("straight corners that acos/tan took as degenerated: %d" % misread)
+  print()
+  print("%-8s %14s %14s %10s" % ('', 'acos/tan', 'half angle', 'speedup'))
+  print("%-8s %10.3f sec %10.3f sec %9.2fx   (%.2f us per corner)" % ('python', t_old, t_new, t_old / t_new, t_new / count * 1e6))
+  if round_corners_geom.load_numpy():
+    t_old, k_old = timed(acos_kernel_numpy, *args)
+    t_new, k_new = timed(half_angle_kernel, 'numpy', *args)
+    compare(k_old, k_new, radius)
+    print("%-8s %10.3f sec %10.3f sec %9.2fx   (%.3f us per corner)" % ('numpy', t_old, t_new, t_old / t_new, t_new / count * 1e6))
+  print()
+  conditioning()
@@ -0,0 +1,82 @@
+#! /usr/bin/python3
+#
+# Cost of fitting the arcs to curved segments (CornerRounder.exact) over trimming along the tangents.
+#
+# Closed subpaths with curved segments are generated, and all their corners are rounded both ways.
+# Reported are the time per run, the time per exact fit and the newton steps they needed,
+# and how many corners found no fit (they are rounded along the tangents instead).
+#
+# Usage:
+#  python3 test/bench_exact.py [--subpaths 500] [--radius 1] [--runs 3]
+#
+
+from __future__ import print_function
+
+import os, sys, math, time, random, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from round_corners_geom import CornerRounder, parse_path, roundable_subpaths
+
+
+def curved_polygons(subpaths, corners=6, seed=1):
+  """ path data of closed subpaths with corners nodes each. Most segments are curved, some are lines. """
+  rnd = random.Random(seed)
+  d = []
+  for i in range(subpaths):
+    cx, cy = 100.0 * (i % 30), 100.0 * (i // 30)
+    pts = []
+    for k in range(corners):
+      a = 2 * math.pi * k / corners + rnd.uniform(-0.3, 0.3)
+      r = rnd.uniform(20, 40)
+      pts.append((cx + r * math.cos(a), cy + r * math.sin(a)))
+    s = "M %r %r" % pts[0]
+    prev = pts[0]
+    for q in pts[1:] + pts[:1]:
+      if rnd.random() < 0.8:
+        h1 = (prev[0] + (q[0] - prev[0]) / 3 + rnd.uniform(-6, 6), prev[1] + (q[1] - prev[1]) / 3 + rnd.uniform(-6, 6))
+        h2 = (prev[0] + 2 * (q[0] - prev[0]) / 3 + rnd.uniform(-6, 6), prev[1] + 2 * (q[1] - prev[1]) / 3 + rnd.uniform(-6, 6))
+        s += " C %r %r %r %r %r %r" % (h1 + h2 + q)
+      else:
+        s += " L %r %r" % q
+      prev = q
+    d.append(s + " Z")
+  return " ".join(d)
+
+
+def run(csp, nodes, radius, exact, runs):
+  """ best time of runs, and the CornerRounder of the last run """
+  best = None
+  for i in range(runs):
+    rounder = CornerRounder(radius, exact=exact)
+    tables = rounder.corner_tables(csp, nodes)
+    t0 = time.time()
+    rounder.round_superpath(list(csp), nodes, tables)
+    t = time.time() - t0
+    best = t if best is None else min(best, t)
+  return best, rounder
+
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description="Exact arcs on curved segments vs the tangent approximation")
+  ap.add_argument('--subpaths', type=int, default=500)
+  ap.add_argument('--radius', type=float, default=1.0)
+  ap.add_argument('--runs', type=int, default=3)
+  args = ap.parse_args()
+
+  csp = parse_path(curved_polygons(args.subpaths))
+  nodes = roundable_subpaths(csp)
+  corners = sum(len(v) for v in nodes.values())
+
+  t_tangent, r_tangent = run(csp, nodes, args.radius, False, args.runs)
+  t_exact, r_exact = run(csp, nodes, args.radius, True, args.runs)
+  st = r_exact.stats
+  fits = st['exact'] + st['exact_failed']
+
+  print("%d subpaths, %d corners, radius %g" % (args.subpaths, corners, args.radius))
+  print("%-10s %10s %12s %10s" % ('', 'rounded', 'seconds', 'per corner'))
+  for name, t, r in (('tangent', t_tangent, r_tangent), ('exact', t_exact, r_exact)):
+    print("%-10s %10d %11.3fs %8.1fus" % (name, r.stats['rounded'], t, t * 1e6 / max(1, r.stats['rounded'])))
+  print("exact costs %.1fx the tangent approximation" % (t_exact / t_tangent))
+  print("exact fits: %d on curved segments, %d failed (%.2f%%), %.2f newton steps on average, at most %d, %.1fus per fit" %
+        (st['exact'], st['exact_failed'], 100.0 * st['exact_failed'] / max(1, fits),
+         float(st['exact_iterations']) / max(1, fits), st['exact_max_iterations'], r_exact.times.get('exact', 0.0) * 1e6 / max(1, fits)))
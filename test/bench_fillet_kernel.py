@@ -0,0 +1,95 @@
+#! /usr/bin/python3
+#
+# Compare the numpy kernels corner_geometry_numpy() and fillet_kernel_numpy() against the scalar reference
+# implementations corner_geometry_py() and fillet_kernel_py(), and time them.
+#
+# Random corners are generated, with a few degenerate (folded back, zero length) and straight ones mixed in.
+# All outputs must agree within 1e-9 (relative to the coordinate magnitude), masks must be identical.
+# corner_geometry() runs once per path, fillet_kernel() once per radius. Both are timed separately.
+#
+# Usage:
+#  python3 test/bench_fillet_kernel.py [corners]
+#
+
+from __future__ import print_function
+
+import os, sys, math, time, random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import round_corners_geom
+
+
+def random_corners(count, seed=42):
+  rnd = random.Random(seed)
+  x, y, ax, ay, bx, by, a_avail, b_avail = [], [], [], [], [], [], [], []
+  for i in range(count):
+    x.append(rnd.uniform(-500, 500))
+    y.append(rnd.uniform(-500, 500))
+    phi = rnd.uniform(0, 2*math.pi)
+    a = [ math.cos(phi) * rnd.uniform(1, 50), math.sin(phi) * rnd.uniform(1, 50) ]
+    kind = i % 50
+    if kind == 0:   b = [ 0.0, 0.0 ]                            # zero length handle
+    elif kind == 1: b = [ 2*a[0], 2*a[1] ]                      # folded back onto itself
+    elif kind == 2: b = [ -3*a[0], -3*a[1] ]                    # straight, no corner
+    else:
+      psi = phi + rnd.uniform(0.01, 2*math.pi - 0.01)
+      b = [ math.cos(psi) * rnd.uniform(1, 50), math.sin(psi) * rnd.uniform(1, 50) ]
+    ax.append(a[0]); ay.append(a[1]); bx.append(b[0]); by.append(b[1])
+    a_avail.append(0.98 * math.sqrt(a[0]*a[0] + a[1]*a[1]))
+    b_avail.append(0.90 * math.sqrt(b[0]*b[0] + b[1]*b[1]))
+  return x, y, ax, ay, bx, by, a_avail, b_avail
+
+
+def compare(kp, kn, tol=1e-9):
+  worst = 0.0
+  for key in kp:
+    vn = kn[key].tolist()
+    if not isinstance(kp[key], list):
+      continue                                  # the inputs passed through corner_geometry()
+    for i in range(len(kp[key])):
+      vp = kp[key][i]
+      if isinstance(vp, bool):
+        if vp != vn[i]:
+          raise ValueError("mask %s differs at corner %d: %r != %r" % (key, i, vp, vn[i]))
+      elif math.isnan(vp) or math.isnan(vn[i]):
+        if not (math.isnan(vp) and math.isnan(vn[i])):
+          raise ValueError("%s differs at corner %d: %r != %r" % (key, i, vp, vn[i]))
+      else:
+        err = abs(vp - vn[i]) / max(1.0, abs(vp))
+        worst = max(worst, err)
+        if err > tol:
+          raise ValueError("%s differs at corner %d: %r != %r" % (key, i, vp, vn[i]))
+  return worst
+
+
+if __name__ == '__main__':
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+  radius = 2.0
+  args = random_corners(count)
+
+  x, y, ax, ay, bx, by, a_avail, b_avail = args
+
+  t0 = time.time()
+  gp = round_corners_geom.corner_geometry_py(x, y, ax, ay, bx, by)
+  t1 = time.time()
+  kp = round_corners_geom.fillet_kernel_py(gp, a_avail, b_avail, radius)
+  t_py = (t1 - t0, time.time() - t1)
+
+  if round_corners_geom.load_numpy() is None:
+    print("numpy not available, only the scalar kernels were run: %d corners in %.3f + %.3f sec" % ((count,) + t_py))
+    sys.exit(0)
+
+  t0 = time.time()
+  gn = round_corners_geom.corner_geometry_numpy(x, y, ax, ay, bx, by)
+  t1 = time.time()
+  kn = round_corners_geom.fillet_kernel_numpy(gn, a_avail, b_avail, radius)
+  t_np = (t1 - t0, time.time() - t1)
+
+  worst = max(compare(gp, gn), compare(kp, kn))
+  print("%d corners, %d degenerate, %d straight, %d too short" %
+        (count, sum(kp['degenerate']), sum(kp['straight']), sum(kp['too_short'])))
+  print("%-8s %18s %18s" % ('', 'corner_geometry', 'fillet_kernel'))
+  print("%-8s %9.3f sec      %9.3f sec" % (('python',) + t_py))
+  print("%-8s %9.3f sec      %9.3f sec" % (('numpy',) + t_np))
+  print("%-8s %12.1fx      %12.1fx" % ('speedup', t_py[0] / t_np[0], t_py[1] / t_np[1]))
+  print("largest relative deviation: %g" % worst)
@@ -0,0 +1,78 @@
+#! /usr/bin/python3
+#
+# Size and parse time of the path data that rounding writes, with all digits (format_path()) and
+# in the short form of --precision (format_path_compact()).
+#
+# A path with many subpaths (polygons with straight segments, like text outlines or laser cut parts) is
+# rounded completely, with arcs and with --method line. The output is then parsed again, with parse_path()
+# and, if inkex can be imported, with inkex.Path, as the next tool in the chain would do.
+# The largest deviation of a node from the full precision output is reported as well.
+#
+# Usage:
+#  env PYTHONPATH=/usr/share/inkscape/extensions python3 test/bench_output.py [--subpaths 2000] [--precision 2,3,4]
+#
+
+from __future__ import print_function
+
+import os, sys, math, time, random, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from round_corners_geom import round_path_d, parse_path
+
+try:
+  import inkex
+except ImportError:
+  inkex = None
+
+
+def polygons(subpaths, corners=8, seed=1):
+  """ path data of closed polygons with straight segments, in absolute coordinates as inkscape writes them """
+  rnd = random.Random(seed)
+  d = []
+  for i in range(subpaths):
+    cx, cy = 40.0 * (i % 50), 40.0 * (i // 50)
+    pts = []
+    for k in range(corners):
+      a = 2 * math.pi * k / corners
+      r = rnd.uniform(8, 16)
+      pts.append("%.6g,%.6g" % (cx + r * math.cos(a), cy + r * math.sin(a)))
+    d.append("M " + " L ".join(pts) + " Z")
+  return " ".join(d)
+
+
+def best_time(fn, runs):
+  t = []
+  for i in range(runs):
+    t0 = time.time()
+    fn()
+    t.append(time.time() - t0)
+  return min(t)
+
+
+def max_deviation(d1, d2):
+  dev = 0.0
+  for sp1, sp2 in zip(parse_path(d1), parse_path(d2)):
+    for n1, n2 in zip(sp1, sp2):
+      dev = max(dev, abs(n1[1][0] - n2[1][0]), abs(n1[1][1] - n2[1][1]))
+  return dev
+
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description="Size and parse time of rounded path data, full and compact")
+  ap.add_argument('--subpaths', type=int, default=2000)
+  ap.add_argument('--precision', default='2,3,4', help="comma separated list of decimals to compare")
+  ap.add_argument('--runs', type=int, default=3)
+  args = ap.parse_args()
+
+  d = polygons(args.subpaths)
+  print("input: %d subpaths, %d bytes" % (args.subpaths, len(d)))
+  print("%-6s %-10s %10s %8s %14s %14s %10s" % ('method', 'precision', 'bytes', 'ratio', 'parse_path', 'inkex.Path', 'deviation'))
+  for method in ('arc', 'line'):
+    full = round_path_d(d, 2.0, method)[0]
+    for precision in [ None ] + [ int(p) for p in args.precision.split(',') ]:
+      out = full if precision is None else round_path_d(d, 2.0, method, precision=precision)[0]
+      t_geom = best_time(lambda: parse_path(out), args.runs)
+      t_inkex = best_time(lambda: inkex.Path(out).to_superpath(), args.runs) if inkex else None
+      print("%-6s %-10s %10d %7.2fx %12.1fms %14s %10.2g" %
+            (method, 'all' if precision is None else precision, len(out), float(len(full)) / len(out), t_geom * 1000,
+             '-' if t_inkex is None else "%.1fms" % (t_inkex * 1000), max_deviation(full, out)))
@@ -0,0 +1,224 @@
+#! /usr/bin/python3
+#
+# Throughput benchmark for round_corners.py on synthetic paths.
+#
+# SVG files are generated with a parameterised number of nodes per subpath, number of subpaths,
+# a mix of sharp (acute) and blunt corners, a ratio of curved to straight segments, and closed or open subpaths.
+# Each case runs RoundedCorners in a fresh interpreter (so that peak memory is per case) with all corners selected,
+# and reports corners/second, peak RSS, and how the time splits into
+#  - options: the command line, with the selected nodes
+#  - load:    reading the svg document
+#  - parse:   path data to superpaths
+#  - compute: selecting and rounding the corners (corners/second is based on this)
+#  - serial:  superpaths back to path data
+#  - save:    writing the svg document
+# All but options and load come from the phases that the extension reports itself with --timing.
+#
+# Both APIs are covered:
+#  - new: inkscape 1.x inkex, found via PYTHONPATH (default /usr/share/inkscape/extensions) or site-packages.
+#  - old: the bundled test/inkex-0.92.4 compatibility path, run with --python2 (default python2).
+#
+# Usage:
+#  python3 test/bench_round_corners.py                          # predefined cases, both APIs
+#  python3 test/bench_round_corners.py --api new --quick        # smaller predefined cases
+#  python3 test/bench_round_corners.py --nodes 5000 --subpaths 4 --sharp 0.3 --curved 0.5 --open
+#  python3 test/bench_round_corners.py --api new --select-by file   # selected nodes via --selected-nodes-file, not argv
+#
+
+from __future__ import print_function
+
+import os, sys, math, time, json, random, shutil, subprocess, tempfile, argparse
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+TOPDIR = os.path.join(TESTDIR, '..')
+
+# name, nodes per subpath, subpaths, sharp ratio, curved ratio, closed
+CASES = [
+  ('polygon-1k',      1000,   1, 0.3, 0.0, True),
+  ('polygon-10k',    10000,   1, 0.3, 0.0, True),
+  ('holes-200x50',      50, 200, 0.3, 0.0, True),
+  ('curvy-2k',        2000,   1, 0.3, 0.5, True),
+  ('zigzag-open-5k',  5000,   1, 1.0, 0.0, False),
+  ('blunt-5k',        5000,   1, 0.0, 0.2, True),
+]
+
+
+def subpath_d(nodes, sharp, curved, closed, cx, cy, rnd, seg_len=10.0):
+  """ one subpath around a circle, every node a corner. A sharp node is pulled inwards, making an acute corner. """
+  r = nodes * seg_len / (2 * math.pi)
+  pts = []
+  for i in range(nodes):
+    phi = 2 * math.pi * i / nodes
+    rr = r - (0.8 * seg_len if rnd.random() < sharp else 0.0)
+    pts.append((cx + rr * math.cos(phi), cy + rr * math.sin(phi)))
+  d = [ "M %.4f,%.4f" % pts[0] ]
+  segs = nodes if closed else nodes - 1
+  for i in range(segs):
+    p = pts[i]
+    n = pts[(i + 1) % nodes]
+    if rnd.random() < curved:
+      # control points at 1/3 and 2/3 of the chord, pushed sideways by 20% of the chord length.
+      nx, ny = -(n[1] - p[1]) * 0.2, (n[0] - p[0]) * 0.2
+      d.append("C %.4f,%.4f %.4f,%.4f %.4f,%.4f" % (p[0] + (n[0]-p[0])/3. + nx, p[1] + (n[1]-p[1])/3. + ny,
+                                                    p[0] + 2*(n[0]-p[0])/3. + nx, p[1] + 2*(n[1]-p[1])/3. + ny, n[0], n[1]))
+    else:
+      d.append("L %.4f,%.4f" % n)
+  if closed:
+    d.append("Z")
+  return " ".join(d)
+
+
+def make_svg(filename, nodes, subpaths, sharp, curved, closed, seed=1):
+  """ write the svg, return the list of selected node ids (all corners) """
+  rnd = random.Random(seed)
+  cols = int(math.ceil(math.sqrt(subpaths)))
+  size = 2.5 * nodes * 10.0 / (2 * math.pi) + 20
+  ds = []
+  selected = []
+  for j in range(subpaths):
+    ds.append(subpath_d(nodes, sharp, curved, closed, size * (j % cols + 0.5), size * (j // cols + 0.5), rnd))
+    for idx in (range(nodes) if closed else range(1, nodes - 1)):
+      selected.append("path1:%d:%d" % (j, idx))
+  with open(filename, 'w') as f:
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" xmlns:svg="http://www.w3.org/2000/svg"\n'
+            '     xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"\n'
+            '     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"\n'
+            '     width="%dmm" height="%dmm" viewBox="0 0 %d %d">\n'
+            ' <g id="layer1" inkscape:groupmode="layer">\n'
+            '  <path id="path1" style="fill:none;stroke:#000000;stroke-width:0.1" d="%s"/>\n'
+            ' </g>\n</svg>\n' % (size * cols, size * cols, size * cols, size * cols, " ".join(ds)))
+  return selected
+
+
+def run_one(svg_file, selected_file, radius, method, select_by):
+  """ child process: run the extension once, print a json line with the timings. """
+  import resource
+  sys.path.insert(0, TOPDIR)
+  import round_corners
+
+  selected = open(selected_file).read().split()
+  args = [ "--radius=%g" % radius, "--method=%s" % method ]
+  if select_by == 'file':
+    args.append("--selected-nodes-file=%s" % selected_file)
+  else:
+    args += [ "--selected-nodes=%s" % n for n in selected ]
+  timing_file = os.path.splitext(svg_file)[0] + '.timing.json'
+  args += [ "--timing=%s" % timing_file, svg_file ]
+  rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+  ext = round_corners.RoundedCorners()
+  times = { 'options': 0.0, 'load': 0.0 }
+
+  def timed(phase, fn):
+    def wrapper(*a, **kw):
+      t0 = time.time()
+      try:
+        return fn(*a, **kw)
+      finally:
+        times[phase] += time.time() - t0
+    return wrapper
+
+  # inkex 1.x: parse_arguments(), load_raw(). inkex 0.92: getoptions(), parse().
+  # Paths are parsed and written inside effect(), the extension times these phases itself.
+  for phase, names in (('options', ('parse_arguments', 'getoptions')), ('load', ('load_raw', 'parse'))):
+    for name in names:
+      if hasattr(ext, name):
+        setattr(ext, name, timed(phase, getattr(ext, name)))
+        break
+
+  stdout = sys.stdout
+  sys.stdout = open(os.devnull, 'w')
+  t0 = time.time()
+  try:
+    ext.run(args)
+  finally:
+    sys.stdout.close()
+    sys.stdout = stdout
+  times['total'] = time.time() - t0
+  with open(timing_file) as f:
+    phases = json.load(f)['phases']
+  times['parse'] = phases.pop('parse', 0.0)
+  times['serialize'] = phases.pop('serialize', 0.0)
+  times['save'] = phases.pop('output', 0.0)
+  times['compute'] = sum(phases.values())      # select, super_node, fillet, ...
+  times['corners'] = len(selected)
+  times['rss_before_kb'] = rss_before
+  times['rss_peak_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  print(json.dumps(times))
+
+
+def bench_case(api, interpreter, name, nodes, subpaths, sharp, curved, closed, radius, method, select_by, tmpdir):
+  svg_file = os.path.join(tmpdir, name + '.svg')
+  selected_file = os.path.join(tmpdir, name + '.sel')
+  selected = make_svg(svg_file, nodes, subpaths, sharp, curved, closed)
+  with open(selected_file, 'w') as f:
+    f.write("\n".join(selected))
+
+  env = dict(os.environ)
+  if api == 'old':
+    env['PYTHONPATH'] = os.path.join(TESTDIR, 'inkex-0.92.4')
+  else:
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (env.get('PYTHONPATH'), '/usr/share/inkscape/extensions') if p)
+  cmd = [ interpreter, os.path.abspath(__file__), '--one', svg_file, selected_file, '--radius', str(radius), '--method', method,
+          '--select-by', select_by ]
+  try:
+    p = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  except OSError as e:
+    print("%-4s %-16s skipped: %s: %s" % (api, name, interpreter, e))
+    return None
+  out, err = p.communicate()
+  if p.returncode != 0:
+    print("%-4s %-16s failed:\n%s" % (api, name, err.decode('utf-8', 'replace')))
+    return None
+  r = json.loads(out.decode('utf-8').strip().splitlines()[-1])
+  print("%-4s %-16s %8d %9.0f %8.3f %8.3f %8.3f %8.3f %8.3f %8.3f %9.1f" %
+        (api, name, r['corners'], r['corners'] / max(r['compute'], 1e-9),
+         r['options'], r['load'], r['parse'], r['compute'], r['serialize'], r['save'], r['rss_peak_kb'] / 1024.))
+  return r
+
+
+def main():
+  ap = argparse.ArgumentParser(description="Benchmark round_corners.py on generated paths.")
+  ap.add_argument('--api', choices=('new', 'old', 'both'), default='both', help="inkex 1.x (new) or bundled 0.92.4 (old)")
+  ap.add_argument('--python2', default='python2', help="interpreter for the old API. Default: python2")
+  ap.add_argument('--radius', type=float, default=1.0)
+  ap.add_argument('--method', default='arc')
+  ap.add_argument('--quick', action='store_true', help="predefined cases with 10x fewer nodes")
+  ap.add_argument('--nodes', type=int, help="custom case: nodes per subpath")
+  ap.add_argument('--subpaths', type=int, default=1, help="custom case: number of subpaths")
+  ap.add_argument('--sharp', type=float, default=0.3, help="custom case: ratio of acute corners")
+  ap.add_argument('--curved', type=float, default=0.0, help="custom case: ratio of curved segments")
+  ap.add_argument('--open', action='store_true', help="custom case: open subpaths")
+  ap.add_argument('--select-by', choices=('argv', 'file'), default='argv',
+                  help="pass the selected nodes as one --selected-nodes each, as inkscape does (argv), or with --selected-nodes-file")
+  ap.add_argument('--one', nargs=2, metavar=('SVG', 'SELECTED'), help=argparse.SUPPRESS)
+  args = ap.parse_args()
+
+  if args.one:
+    return run_one(args.one[0], args.one[1], args.radius, args.method, args.select_by)
+
+  if args.nodes:
+    cases = [ ('custom', args.nodes, args.subpaths, args.sharp, args.curved, not args.open) ]
+  elif args.quick:
+    cases = [ (c[0], max(10, c[1] // 10)) + c[2:] for c in CASES ]
+  else:
+    cases = CASES
+
+  apis = [ ('new', sys.executable), ('old', args.python2) ]
+  if args.api != 'both':
+    apis = [ a for a in apis if a[0] == args.api ]
+
+  tmpdir = tempfile.mkdtemp(prefix='bench_round_corners_')
+  print("%-4s %-16s %8s %9s %8s %8s %8s %8s %8s %8s %9s" %
+        ('api', 'case', 'corners', 'corners/s', 'options', 'load', 'parse', 'compute', 'serial', 'save', 'peak MiB'))
+  try:
+    for api, interpreter in apis:
+      for case in cases:
+        bench_case(api, interpreter, *case, radius=args.radius, method=args.method, select_by=args.select_by, tmpdir=tmpdir)
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,91 @@
+#! /usr/bin/python3
+#
+# Cold start benchmark for round_corners.py
+#
+# Inkscape starts a new interpreter for every run of the extension, and for every live preview refresh.
+# This reports
+#  - the import time of round_corners and its slowest imports, from 'python -X importtime'
+#  - the wall clock time of complete cold runs on test/zigzag.svg, compared to a bare interpreter start.
+#
+# Usage:
+#  env PYTHONPATH=/usr/share/inkscape/extensions python3 test/bench_startup.py [--runs 10] [--max-ms 500]
+#
+# With --max-ms the exit code is 1 if a cold run takes longer than that (median), so that this can guard
+# against startup regressions.
+#
+
+from __future__ import print_function
+
+import os, sys, time, subprocess, argparse
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+TOPDIR = os.path.abspath(os.path.join(TESTDIR, '..'))
+
+
+def env():
+  e = dict(os.environ)
+  e['PYTHONPATH'] = os.pathsep.join(p for p in (TOPDIR, e.get('PYTHONPATH'), '/usr/share/inkscape/extensions') if p)
+  return e
+
+
+def import_times(top=10):
+  """ returns (cumulative usec of round_corners, [ (cumulative usec, module), ... ] of its slowest direct imports) """
+  p = subprocess.Popen([ sys.executable, '-X', 'importtime', '-c', 'import round_corners' ],
+                       env=env(), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  out, err = p.communicate()
+  own = None
+  children = []
+  for line in err.decode('utf-8', 'replace').splitlines():
+    # import time: self [us] | cumulative | imported package
+    # Children are listed before their parent, indented by two more spaces.
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    fields = line[len('import time:'):].split('|')
+    cumulative = int(fields[1])
+    name = fields[2][1:].rstrip()
+    level = (len(name) - len(name.lstrip())) // 2
+    if level == 0:
+      if name == 'round_corners':
+        own = cumulative
+        break
+      children = []
+    elif level == 1:
+      children.append((cumulative, name.strip()))
+  children.sort(reverse=True)
+  return own, children[:top]
+
+
+def median_run(cmd, runs):
+  times = []
+  with open(os.devnull, 'w') as devnull:
+    for i in range(runs):
+      t0 = time.time()
+      subprocess.call(cmd, env=env(), stdout=devnull, stderr=devnull, cwd=TOPDIR)
+      times.append(time.time() - t0)
+  times.sort()
+  return times[len(times) // 2]
+
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description="Cold start benchmark for round_corners.py")
+  ap.add_argument('--runs', type=int, default=10)
+  ap.add_argument('--max-ms', type=float, default=None, help="fail if the median cold run takes longer")
+  args = ap.parse_args()
+
+  own, mods = import_times()
+  if own is None:
+    print("import round_corners failed. Is inkex on the PYTHONPATH?")
+    sys.exit(2)
+  print("import round_corners: %8.1f ms (cumulative)" % (own / 1000.))
+  for cumulative, name in mods:
+    print("  %-30s %8.1f ms" % (name, cumulative / 1000.))
+
+  bare = median_run([ sys.executable, '-c', 'pass' ], args.runs)
+  cold = median_run([ sys.executable, os.path.join(TOPDIR, 'round_corners.py'),
+                      '--selected-nodes=path1684:0:2', os.path.join(TESTDIR, 'zigzag.svg') ], args.runs)
+  print("bare interpreter:     %8.1f ms (median of %d)" % (bare * 1000, args.runs))
+  print("cold run, one corner: %8.1f ms (median of %d)" % (cold * 1000, args.runs))
+
+  if args.max_ms is not None and cold * 1000 > args.max_ms:
+    print("FAIL: cold run takes more than %g ms" % args.max_ms)
+    sys.exit(1)
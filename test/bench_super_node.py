@@ -0,0 +1,78 @@
+#! /usr/bin/python3
+#
+# Memory benchmark for the per corner records built by super_node().
+#
+# Compares the SuperNode __slots__ record against the nested dicts (plus a deepcopy of the node)
+# that super_node() used to build. A zigzag subpath with straight segments is generated, and
+# a record for every corner is computed and kept alive, as subpath_round_corners() does.
+#
+# The record is a single allocation, the remaining blocks are its boxed floats: about 12 blocks per corner
+# instead of 28, a bit more than half of the memory saved. That is what a __slots__ record can do. A cut by
+# an order of magnitude would need unboxed storage, e.g. one array('d') per table with index based access
+# throughout the engine.
+#
+# Usage:
+#  python3 test/bench_super_node.py [corners]
+#
+
+from __future__ import print_function
+
+import os, sys, math, copy, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from round_corners_geom import CornerRounder
+
+
+def zigzag_subpath(corners):
+  """ an open subpath with straight segments and corners+2 nodes """
+  sp = []
+  for i in range(corners+2):
+    pt = [ 10.0 * i, 10.0 * (i % 2) ]
+    sp.append([ pt[:], pt[:], pt[:] ])
+  return sp
+
+
+def legacy_super_node(sp, node_idx):
+  """ the nested dict layout of super_node() up to v1.5, without the skip checks """
+  prev_idx = node_idx - 1
+  next_idx = node_idx + 1
+  t = copy.deepcopy(sp[node_idx])
+  p = sp[prev_idx]
+  n = sp[next_idx]
+  dir1 = [ p[2][0] - t[1][0], p[2][1] - t[1][1] ]
+  dir2 = [ n[0][0] - t[1][0], n[0][1] - t[1][1] ]
+  handle1 = [ t[0][0] - t[1][0], t[0][1] - t[1][1] ]
+  handle2 = [ t[2][0] - t[1][0], t[2][1] - t[1][1] ]
+  if abs(handle1[0]) < 1e-9 and abs(handle1[1]) < 1e-9: handle1 = dir1
+  if abs(handle2[0]) < 1e-9 and abs(handle2[1]) < 1e-9: handle2 = dir2
+  prev = { 'idx': prev_idx, 'dir':dir1, 'handle':handle1 }
+  next = { 'idx': next_idx, 'dir':dir2, 'handle':handle2 }
+  sn = { 'idx': node_idx, 'prev': prev, 'next': next, 'x': t[1][0], 'y': t[1][1] }
+  prev['hlen'] = math.sqrt(handle1[0]*handle1[0] + handle1[1]*handle1[1])
+  next['hlen'] = math.sqrt(handle2[0]*handle2[0] + handle2[1]*handle2[1])
+  return sn, t
+
+
+def measure(name, fn, sp, corners):
+  tracemalloc.start()
+  t0 = time.time()
+  keep = [ fn(sp, idx) for idx in range(1, corners+1) ]
+  dt = time.time() - t0
+  current, peak = tracemalloc.get_traced_memory()
+  blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+  tracemalloc.stop()
+  print("%-12s %8d corners  %10.1f KiB retained  %10.1f KiB peak  %6.1f bytes/corner  %5.1f blocks/corner  %7.3f sec" %
+        (name, len(keep), current/1024., peak/1024., float(current)/corners, float(blocks)/corners, dt))
+  return current, blocks
+
+
+if __name__ == '__main__':
+  corners = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+  sp = zigzag_subpath(corners)
+
+  rc = CornerRounder(radius=1.0)
+
+  legacy, legacy_blocks = measure("dict+copy", legacy_super_node, sp, corners)
+  slots, slots_blocks = measure("SuperNode", rc.super_node, sp, corners)
+  print("SuperNode uses %.1f%% of the memory of the dict layout, %.1fx fewer allocations" %
+        (100. * slots / legacy, float(legacy_blocks) / slots_blocks))
@@ -0,0 +1,84 @@
+#! /usr/bin/python3
+#
+# Cost of a radius sweep (--radii) compared to rounding with one radius.
+#
+# A drawing with many small paths is generated, and all of them are rounded once with --radius and once with --radii.
+# A sweep parses each path once and writes one copy per radius, so its time per radius should stay close to a
+# single run. Reported are the total time and the phases of both runs (from --timing).
+#
+# Usage:
+#  env PYTHONPATH=/usr/share/inkscape/extensions python3 test/bench_sweep.py [--paths 2000] [--radii 0.5,1,1.5,2,2.5]
+#
+# With --max-ratio the exit code is 1 if the sweep takes longer per radius than that many single runs,
+# so that this can guard against a sweep that grows faster than the document.
+#
+
+from __future__ import print_function
+
+import os, sys, json, math, time, random, shutil, tempfile, argparse
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTDIR, '..'))
+import round_corners
+
+
+def make_svg(filename, paths, corners=6, seed=1):
+  """ write an svg with paths closed polygons, each with its own id """
+  rnd = random.Random(seed)
+  cols = int(math.ceil(math.sqrt(paths)))
+  els = []
+  for i in range(paths):
+    cx, cy = 40.0 * (i % cols), 40.0 * (i // cols)
+    pts = []
+    for k in range(corners):
+      a = 2 * math.pi * k / corners
+      r = rnd.uniform(10, 16)
+      pts.append("%.4f,%.4f" % (cx + r * math.cos(a), cy + r * math.sin(a)))
+    els.append('  <path id="path%d" style="fill:none;stroke:#000000;stroke-width:0.1" d="M %s Z"/>' % (i + 1, " L ".join(pts)))
+  with open(filename, 'w') as f:
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" xmlns:svg="http://www.w3.org/2000/svg"\n'
+            '     xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"\n'
+            '     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"\n'
+            '     width="%dmm" height="%dmm" viewBox="0 0 %d %d">\n'
+            ' <g id="layer1" inkscape:groupmode="layer">\n%s\n </g>\n</svg>\n' % ((40 * cols,) * 4 + ("\n".join(els),)))
+
+
+def run(svg_file, args, timing_file):
+  """ run the extension on svg_file with all paths selected. Returns (seconds, phases dict) """
+  ext = round_corners.RoundedCorners()
+  t0 = time.time()
+  ext.run(args + [ "--timing=%s" % timing_file, svg_file ], output=os.path.splitext(timing_file)[0] + '.svg')
+  t = time.time() - t0
+  with open(timing_file) as f:
+    return t, json.load(f)['phases']
+
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description="Radius sweep vs a single radius on many paths")
+  ap.add_argument('--paths', type=int, default=2000)
+  ap.add_argument('--radii', default='0.5,1,1.5,2,2.5')
+  ap.add_argument('--max-ratio', type=float, help="fail if the sweep takes longer per radius than this many single runs")
+  args = ap.parse_args()
+
+  tmpdir = tempfile.mkdtemp(prefix='bench_sweep_')
+  try:
+    svg_file = os.path.join(tmpdir, 'paths.svg')
+    make_svg(svg_file, args.paths)
+    ids = [ "--id=path%d" % (i + 1) for i in range(args.paths) ]
+    n_radii = len(round_corners.parse_radii(args.radii))
+    t_single, p_single = run(svg_file, [ "--radius=1" ] + ids, os.path.join(tmpdir, 'single.json'))
+    t_sweep, p_sweep = run(svg_file, [ "--radii=%s" % args.radii ] + ids, os.path.join(tmpdir, 'sweep.json'))
+  finally:
+    shutil.rmtree(tmpdir)
+
+  phases = sorted(set(p_single) | set(p_sweep))
+  print("%d paths, %d radii" % (args.paths, n_radii))
+  print("%-8s %9s " % ('', 'total') + " ".join("%9s" % p for p in phases))
+  for name, t, p in (('single', t_single, p_single), ('sweep', t_sweep, p_sweep)):
+    print("%-8s %8.3fs " % (name, t) + " ".join("%8.3fs" % p.get(phase, 0.0) for phase in phases))
+  ratio = t_sweep / n_radii / t_single
+  print("sweep per radius: %.2f single runs" % ratio)
+  if args.max_ratio is not None and ratio > args.max_ratio:
+    print("FAIL: more than %g" % args.max_ratio)
+    sys.exit(1)
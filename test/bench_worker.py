@@ -0,0 +1,71 @@
+#! /usr/bin/python3
+#
+# Latency of round_corners.py with and without a resident worker (round_corners_worker.py).
+#
+# Both runs start a fresh interpreter, as inkscape does. The cold run does everything itself,
+# the warm run forwards the document to a worker that is started here on a temporary socket.
+# The outputs of both must be identical.
+#
+# Usage:
+#  env PYTHONPATH=/usr/share/inkscape/extensions python3 test/bench_worker.py [--runs 10] [--selected-nodes path1684:0:2] [svg]
+#
+
+from __future__ import print_function
+
+import os, sys, time, tempfile, subprocess, argparse
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+TOPDIR = os.path.abspath(os.path.join(TESTDIR, '..'))
+
+
+def env(sock):
+  e = dict(os.environ)
+  e['PYTHONPATH'] = os.pathsep.join(p for p in (TOPDIR, e.get('PYTHONPATH'), '/usr/share/inkscape/extensions') if p)
+  e['ROUND_CORNERS_SOCKET'] = sock
+  return e
+
+
+def timed_runs(cmd, sock, runs):
+  """ returns (sorted list of seconds, output of the last run) """
+  times = []
+  for i in range(runs):
+    t0 = time.time()
+    p = subprocess.Popen(cmd, env=env(sock), stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=TOPDIR)
+    out, err = p.communicate()
+    times.append(time.time() - t0)
+  times.sort()
+  return times, out
+
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description="Cold vs warm (resident worker) latency of round_corners.py")
+  ap.add_argument('--runs', type=int, default=10)
+  ap.add_argument('--selected-nodes', default='path1684:0:2')
+  ap.add_argument('svg', nargs='?', default=os.path.join(TESTDIR, 'zigzag.svg'))
+  args = ap.parse_args()
+
+  cmd = [ sys.executable, os.path.join(TOPDIR, 'round_corners.py'), '--selected-nodes=' + args.selected_nodes, args.svg ]
+  sock = os.path.join(tempfile.mkdtemp(prefix='bench_worker_'), 'worker.sock')
+  worker = subprocess.Popen([ sys.executable, os.path.join(TOPDIR, 'round_corners_worker.py'), '--socket', sock ], env=env(sock))
+  try:
+    for i in range(100):
+      if os.path.exists(sock):
+        break
+      time.sleep(0.05)
+    else:
+      print("worker did not start")
+      sys.exit(2)
+
+    cold, cold_out = timed_runs(cmd, '', args.runs)
+    warm, warm_out = timed_runs(cmd, sock, args.runs)
+  finally:
+    subprocess.call([ sys.executable, os.path.join(TOPDIR, 'round_corners_worker.py'), '--socket', sock, '--stop' ], env=env(sock))
+    worker.wait()
+
+  print("%-28s %8s %8s %8s" % ('', 'min', 'median', 'max'))
+  for name, t in (('cold (in process)', cold), ('warm (resident worker)', warm)):
+    print("%-28s %6.1fms %6.1fms %6.1fms" % (name, t[0] * 1000, t[len(t) // 2] * 1000, t[-1] * 1000))
+  print("speedup (median): %.1fx" % (cold[len(cold) // 2] / warm[len(warm) // 2]))
+  if cold_out != warm_out:
+    print("FAIL: outputs differ")
+    sys.exit(1)
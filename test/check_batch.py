@@ -0,0 +1,60 @@
+#! /usr/bin/python3
+#
+# Check that round_corners_batch.py can run twice on the same directory.
+#
+# The second run must process the same inputs as the first, and not the NAME.rounded.svg files
+# (or the files in --output-dir) that the first run wrote. Every input gets an output file,
+# also one without anything to round.
+#
+# Usage:
+#  env PYTHONPATH=/usr/share/inkscape/extensions python3 test/check_batch.py
+#
+# The exit code is 1 if a check fails.
+#
+
+from __future__ import print_function
+
+import os, sys, shutil, tempfile
+
+TESTDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTDIR, '..'))
+import round_corners_batch
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">'
+       '<path id="p1" d="%s"/></svg>\n')
+
+
+def check(what, got, expected):
+  ok = got == expected
+  print("%-4s %s: %r" % ('ok' if ok else 'FAIL', what, got))
+  return ok
+
+
+if __name__ == '__main__':
+  tmpdir = tempfile.mkdtemp(prefix='check_batch_')
+  ok = True
+  try:
+    for name, d in (('a.svg', "M 10,10 L 90,10 L 90,90 Z"), ('b.svg', "M 10,10 L 90,10")):
+      with open(os.path.join(tmpdir, name), 'w') as f:
+        f.write(SVG % d)
+    out = os.path.join(tmpdir, 'out')
+
+    for run in (1, 2):
+      ok &= check("run %d, suffix: inputs" % run, round_corners_batch.expand_inputs([ tmpdir ], '.rounded'),
+                  [ os.path.join(tmpdir, 'a.svg'), os.path.join(tmpdir, 'b.svg') ])
+      ok &= check("run %d, suffix: exit code" % run, round_corners_batch.main([ '--jobs', '1', tmpdir ]), 0)
+    ok &= check("suffix: files", sorted(os.listdir(tmpdir)), [ 'a.rounded.svg', 'a.svg', 'b.rounded.svg', 'b.svg' ])
+
+    # an output directory inside the input directory, given as a glob pattern.
+    pattern = os.path.join(tmpdir, '*', '*.svg')
+    os.mkdir(out)
+    shutil.copy(os.path.join(tmpdir, 'a.svg'), os.path.join(out, 'x.svg'))
+    ok &= check("output dir: inputs", round_corners_batch.expand_inputs([ pattern ], None, out), [])
+    ok &= check("named file: inputs", round_corners_batch.expand_inputs([ os.path.join(tmpdir, 'a.rounded.svg') ], '.rounded'),
+                [ os.path.join(tmpdir, 'a.rounded.svg') ])
+    for run in (1, 2):
+      round_corners_batch.main([ '--jobs', '1', '--output-dir', out, tmpdir, os.path.join(out, '*.svg') ])
+    ok &= check("output dir: files", sorted(os.listdir(out)), [ 'a.svg', 'b.svg', 'x.svg' ])
+  finally:
+    shutil.rmtree(tmpdir)
+  sys.exit(0 if ok else 1)
@@ -0,0 +1,156 @@
+#! /usr/bin/python3
+#
+# Randomized check of the lazy path handling (LazySuperPath, split_path_d()) against parsing everything at once.
+#
+#  - parse: random path data with all path commands, relative and absolute subpaths, implicit linetos and z.
+#    Each subpath that LazySuperPath parses on its own must be identical to the same subpath of parse_path(d),
+#    and, if inkex can be imported, to inkex.CubicSuperPath(d) with the inkex parser.
+#  - round: random polygons with lines and curves, random selected corners. round_path_d(), which parses and
+#    writes back only the selected subpaths, must give the same nodes as rounding the whole parse_path(d)
+#    with CornerRounder.round_superpath().
+#
+# Usage:
+#  env PYTHONPATH=/usr/share/inkscape/extensions python3 test/check_lazy_parse.py [--trials 300] [--seed 5]
+#
+# The exit code is 1 if a check fails.
+#
+
+from __future__ import print_function
+
+import os, sys, math, random, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from round_corners_geom import CornerRounder, LazySuperPath, parse_path, split_path_d, round_path_d
+
+try:
+  import inkex
+except ImportError:
+  inkex = None
+
+
+def random_path_d(rnd):
+  """ path data of 1 to 6 subpaths with any path command, relative or absolute """
+  def num():
+    return "%.3f" % rnd.uniform(-20, 20)
+  subpaths = []
+  for i in range(rnd.randint(1, 6)):
+    out = [ rnd.choice('Mm'), num(), num() ]
+    for k in range(rnd.randint(0, 3)):
+      out += [ num(), num() ]                 # implicit linetos
+    for k in range(rnd.randint(1, 6)):
+      c = rnd.choice('LlHhVvCcSsQqTtAa')
+      if c in 'Aa':
+        out += [ c, "%.2f" % rnd.uniform(1, 9), "%.2f" % rnd.uniform(1, 9), num(), rnd.choice('01'), rnd.choice('01'), num(), num() ]
+      else:
+        out += [ c ] + [ num() for n in range({ 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2 }[c.upper()]) ]
+    if rnd.random() < 0.5:
+      out.append(rnd.choice('zZ'))
+    subpaths.append(" ".join(out))
+  return " ".join(subpaths)
+
+
+def random_polygons_d(rnd):
+  """ path data of 1 to 8 polygons with lines and curves, closed or open, with relative or absolute coordinates """
+  subpaths = []
+  for i in range(rnd.randint(1, 8)):
+    cx, cy = rnd.uniform(-100, 100), rnd.uniform(-100, 100)
+    corners = rnd.randint(3, 9)
+    pts = []
+    for k in range(corners):
+      a = 2 * math.pi * k / corners + rnd.uniform(-0.2, 0.2)
+      r = rnd.uniform(10, 30)
+      pts.append((cx + r * math.cos(a), cy + r * math.sin(a)))
+    closed = rnd.random() < 0.7
+    rel = rnd.random() < 0.5
+    out = [ "%s %.4f,%.4f" % ('m' if rel and i else 'M', pts[0][0], pts[0][1]) ] if not rel or not i else []
+    if rel and i:
+      # relative to the end of the previous subpath: its start after a z, else its last point.
+      prev = last_start if last_closed else last_end
+      out = [ "m %.4f,%.4f" % (pts[0][0] - prev[0], pts[0][1] - prev[1]) ]
+    prev = pts[0]
+    for q in pts[1:] + (pts[:1] if closed else []):
+      if rnd.random() < 0.3:
+        h1 = (prev[0] + (q[0] - prev[0]) / 3 + rnd.uniform(-3, 3), prev[1] + (q[1] - prev[1]) / 3 + rnd.uniform(-3, 3))
+        h2 = (prev[0] + 2 * (q[0] - prev[0]) / 3 + rnd.uniform(-3, 3), prev[1] + 2 * (q[1] - prev[1]) / 3 + rnd.uniform(-3, 3))
+        out.append("C %.4f,%.4f %.4f,%.4f %.4f,%.4f" % (h1 + h2 + q))
+      elif rel:
+        out.append("l %.4f,%.4f" % (q[0] - prev[0], q[1] - prev[1]))
+      else:
+        out.append("L %.4f,%.4f" % q)
+      prev = q
+    if closed:
+      out.append("z")
+    subpaths.append(" ".join(out))
+    last_start, last_end, last_closed = pts[0], prev, closed
+  return " ".join(subpaths)
+
+
+def nodes_list(sp):
+  return [ [ list(p) for p in n ] for n in sp ]
+
+
+def check_parse(rnd, trials):
+  """ lazily parsed subpaths vs a full parse. Returns the number of differences. """
+  bad = 0
+  for trial in range(trials):
+    d = random_path_d(rnd)
+    parts = split_path_d(d)
+    if parts is None:
+      continue
+    refs = [ (None, parse_path(d)) ]
+    if inkex:
+      refs.append((lambda text: inkex.CubicSuperPath(text)[0], inkex.CubicSuperPath(d)))
+    for parser, ref in refs:
+      lazy = LazySuperPath(parts, parser)
+      if len(lazy) != len(ref):
+        bad += 1
+        print("parse: %d subpaths instead of %d: %s" % (len(lazy), len(ref), d))
+        continue
+      for i in rnd.sample(range(len(ref)), len(ref)):     # in any order, a subpath must not depend on the ones parsed before.
+        if nodes_list(lazy[i]) != nodes_list(ref[i]):
+          bad += 1
+          print("parse: subpath %d differs%s: %s" % (i, ' (inkex)' if parser else '', d))
+          break
+  return bad
+
+
+def check_round(rnd, trials, eps=1e-9):
+  """ round_path_d() vs rounding the whole parsed path. Returns (number of differences, largest deviation). """
+  bad = 0
+  worst = 0.0
+  for trial in range(trials):
+    d = random_polygons_d(rnd)
+    csp = parse_path(d)
+    nodes = sorted(set((i, rnd.randrange(1, len(csp[i]) - 1)) for i in range(len(csp)) for k in range(rnd.randint(0, 3))
+                       if rnd.random() < 0.5))
+    radius = rnd.uniform(0.5, 6)
+    new_d, stats = round_path_d(d, radius, nodes=nodes)
+    old = CornerRounder(radius).round_superpath(list(csp), nodes)
+    new = parse_path(new_d)
+    dev = 0.0
+    if len(new) != len(old) or any(len(a) != len(b) for a, b in zip(new, old)):
+      dev = float('inf')
+    else:
+      for sp_new, sp_old in zip(new, old):
+        for n_new, n_old in zip(sp_new, sp_old):
+          for p_new, p_old in zip(n_new, n_old):
+            dev = max(dev, abs(p_new[0] - p_old[0]), abs(p_new[1] - p_old[1]))
+    worst = max(worst, dev)
+    if dev > eps:
+      bad += 1
+      print("round: deviation %g, radius %g, nodes %r: %s" % (dev, radius, nodes, d))
+  return bad, worst
+
+
+if __name__ == '__main__':
+  ap = argparse.ArgumentParser(description="Lazy parsing and writing back vs parsing the whole path")
+  ap.add_argument('--trials', type=int, default=300)
+  ap.add_argument('--seed', type=int, default=5)
+  args = ap.parse_args()
+
+  rnd = random.Random(args.seed)
+  bad_parse = check_parse(rnd, args.trials)
+  print("parse: %d of %d paths differ%s" % (bad_parse, args.trials, '' if inkex else " (without inkex)"))
+  bad_round, worst = check_round(rnd, args.trials)
+  print("round: %d of %d paths differ, largest deviation %g" % (bad_round, args.trials, worst))
+  sys.exit(1 if bad_parse or bad_round else 0)